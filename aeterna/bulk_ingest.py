@@ -0,0 +1,156 @@
+# aeterna/bulk_ingest.py
+# Ingesta masiva de directorios sobre las primitivas de seal_file
+#
+# Uso:
+#   python -m aeterna.bulk_ingest ingesta/cliente_x --declared-by Client --purpose "Entrega Q1"
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from aeterna.ingest_file import (
+    REPORTS_DIR,
+    build_event,
+    compute_sha3_512,
+    generate_pdf,
+    get_store,
+)
+
+DEFAULT_HASH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def iter_files(root: Path) -> Iterator[Path]:
+    """Recorre el árbol en orden determinista (sin seguir enlaces simbólicos)."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = Path(dirpath) / name
+            if path.is_file() and not path.is_symlink():
+                yield path
+
+
+def _hash_entry(path: Path) -> tuple:
+    return path, path.stat().st_size, compute_sha3_512(path)
+
+
+def bounded_map(executor, fn, items: Iterable, window: int) -> Iterator:
+    """Como executor.map, pero con como máximo `window` tareas en vuelo."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def write_manifest(manifest_path: Path, root: Path, entries: list) -> str:
+    manifest = {
+        "root": str(root),
+        "created_at": datetime.datetime.utcnow().isoformat() + "Z",
+        "hash_algorithm": "SHA3-512",
+        "count": len(entries),
+        "files": entries,
+    }
+    body = json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8")
+    manifest_path.write_bytes(body)
+    return hashlib.sha3_512(body).hexdigest()
+
+
+def seal_directory(root: Path, declared_by: str, purpose: str,
+                   hash_workers: int = DEFAULT_HASH_WORKERS,
+                   pdf_workers: Optional[int] = None,
+                   render_pdfs: bool = True,
+                   manifest_path: Optional[Path] = None) -> dict:
+    """
+    Sella todos los archivos de un directorio:
+    hash concurrente, un único guardado de eventos, PDFs en paralelo y manifiesto.
+    """
+    root = Path(root)
+    if not root.is_dir():
+        raise NotADirectoryError(f"{root} no es un directorio")
+
+    store = get_store()
+    next_id = store.last_id() + 1
+    new_events = []
+    entries = []
+
+    with ThreadPoolExecutor(max_workers=hash_workers) as pool:
+        for path, size, hash_val in bounded_map(
+            pool, _hash_entry, iter_files(root), hash_workers * 4
+        ):
+            event = build_event(str(next_id), path, hash_val, declared_by, purpose)
+            event["source_path"] = path.relative_to(root).as_posix()
+            next_id += 1
+            new_events.append(event)
+            entries.append({
+                "path": event["source_path"],
+                "event_id": event["id"],
+                "size": size,
+                "sha3_512": hash_val,
+            })
+
+    # Un solo lote append-only con un único fsync
+    store.append_many(new_events)
+
+    if render_pdfs and new_events:
+        workers = pdf_workers or os.cpu_count() or 1
+        chunksize = max(1, len(new_events) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(generate_pdf, new_events, chunksize=chunksize):
+                pass
+
+    if manifest_path is None:
+        stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        manifest_path = REPORTS_DIR / f"manifest_{root.name}_{stamp}.json"
+    manifest_hash = write_manifest(Path(manifest_path), root, entries)
+
+    return {
+        "count": len(new_events),
+        "manifest": str(manifest_path),
+        "manifest_hash": manifest_hash,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m aeterna.bulk_ingest",
+        description="Sella en bloque todos los archivos de un directorio.",
+    )
+    parser.add_argument("root", help="Directorio a ingerir (p. ej. ingesta/cliente_x)")
+    parser.add_argument("--declared-by", required=True)
+    parser.add_argument("--purpose", required=True)
+    parser.add_argument("--hash-workers", type=int, default=DEFAULT_HASH_WORKERS)
+    parser.add_argument("--pdf-workers", type=int, default=None)
+    parser.add_argument("--no-pdf", action="store_true", help="No generar certificados PDF")
+    parser.add_argument("--manifest", default=None, help="Ruta del manifiesto de salida")
+    args = parser.parse_args(argv)
+
+    try:
+        result = seal_directory(
+            Path(args.root),
+            args.declared_by,
+            args.purpose,
+            hash_workers=args.hash_workers,
+            pdf_workers=args.pdf_workers,
+            render_pdfs=not args.no_pdf,
+            manifest_path=Path(args.manifest) if args.manifest else None,
+        )
+    except NotADirectoryError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"✅ {result['count']} archivos sellados.")
+    print(f"Manifiesto: {result['manifest']}")
+    print(f"SHA3-512 del manifiesto: {result['manifest_hash']}")
+
+
+if __name__ == "__main__":
+    main()
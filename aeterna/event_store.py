@@ -0,0 +1,222 @@
+# aeterna/event_store.py
+# Registro de eventos append-only (JSON Lines) para AETERNA-FS
+#
+# Cada evento ocupa una línea. Añadir es O(1) y un fallo a mitad de escritura
+# sólo puede dejar incompleta la última línea, que se descarta al reabrir.
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class EventStore:
+    def __init__(self, path: Path, fsync_batch: int = 256):
+        self.path = Path(path)
+        self.fsync_batch = fsync_batch
+        self._fh = None
+        self._pending = 0
+        self._last_id: Optional[int] = None
+
+    # -----------------------------
+    # Escritura
+    # -----------------------------
+    def _open(self):
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._repair_tail()
+            self._fh = open(self.path, "ab")
+        return self._fh
+
+    def _repair_tail(self):
+        """Trunca una última línea incompleta (escritura interrumpida)."""
+        if not self.path.exists():
+            return
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+            cut = self._last_newline_before(f, end)
+            f.truncate(cut)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _last_newline_before(f, end: int) -> int:
+        pos = end
+        while pos > 0:
+            step = min(READ_CHUNK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            idx = block.rfind(b"\n")
+            if idx != -1:
+                return pos + idx + 1
+        return 0
+
+    def append(self, event: dict, sync: bool = False):
+        fh = self._open()
+        fh.write(self._encode(event))
+        fh.flush()
+        self._note_id(event)
+        self._pending += 1
+        if sync or self._pending >= self.fsync_batch:
+            self.sync()
+
+    def append_many(self, events: Iterable[dict]):
+        """Añade un lote con un único fsync al final."""
+        fh = self._open()
+        for event in events:
+            fh.write(self._encode(event))
+            self._note_id(event)
+            self._pending += 1
+        fh.flush()
+        self.sync()
+
+    def sync(self):
+        if self._fh is not None and self._pending:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+        self._pending = 0
+
+    def close(self):
+        if self._fh is not None:
+            self.sync()
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _encode(event: dict) -> bytes:
+        return (json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    # -----------------------------
+    # Lectura
+    # -----------------------------
+    def __iter__(self) -> Iterator[dict]:
+        return self.iter_events()
+
+    def iter_events(self) -> Iterator[dict]:
+        """Lectura en streaming; ignora una última línea incompleta."""
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    yield json.loads(line)
+
+    def last_id(self) -> int:
+        """Último id numérico registrado, leyendo sólo el final del archivo."""
+        if self._last_id is None:
+            self._last_id = self._read_last_id()
+        return self._last_id
+
+    def next_id(self) -> str:
+        return str(self.last_id() + 1)
+
+    def _note_id(self, event: dict):
+        try:
+            self._last_id = max(self.last_id(), int(event.get("id")))
+        except (TypeError, ValueError):
+            pass
+
+    def _read_last_id(self) -> int:
+        if not self.path.exists():
+            return 0
+        with open(self.path, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            # Buscar la última línea completa
+            if end == 0:
+                return 0
+            f.seek(end - 1)
+            stop = end if f.read(1) == b"\n" else self._last_newline_before(f, end)
+            if stop == 0:
+                return 0
+            start = self._last_newline_before(f, stop - 1)
+            f.seek(start)
+            line = f.read(stop - start)
+        try:
+            return int(json.loads(line).get("id"))
+        except (TypeError, ValueError):
+            # ids no numéricos: recuento completo, una única vez
+            return sum(1 for _ in self.iter_events())
+
+
+def iter_json_array(path: Path, chunk_size: int = READ_CHUNK_SIZE) -> Iterator:
+    """Decodifica un array JSON elemento a elemento sin cargarlo entero."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+        started = False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError("JSON array truncated")
+                fill()
+                continue
+
+            ch = buf[pos]
+            if not started:
+                if ch != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if ch == "]":
+                return
+            if ch == ",":
+                pos += 1
+                continue
+
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            # Un objeto que termina justo al final del buffer puede estar cortado
+            if end == len(buf) and not eof:
+                fill()
+                continue
+            pos = end
+            yield item
+
+
+def migrate_json_array(src: Path, dest: Path) -> int:
+    """Convierte un events.json (array) en JSON Lines en streaming."""
+    tmp = Path(str(dest) + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    count = 0
+    with EventStore(tmp, fsync_batch=10_000) as store:
+        for event in iter_json_array(src):
+            store.append(event)
+            count += 1
+    os.replace(tmp, dest)
+    return count
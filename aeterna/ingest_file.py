@@ -4,38 +4,49 @@
 
 import hashlib
 import datetime
-import json
 from pathlib import Path
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet
 
+from aeterna.event_store import EventStore, migrate_json_array
+
 BASE_DIR = Path(__file__).parent.parent
 VAULT_DIR = BASE_DIR / "vault"
 INGEST_DIR = VAULT_DIR / "ingest"
 REPORTS_DIR = VAULT_DIR / "reports"
+# events.json (array reescrito entero) queda como formato heredado
 EVENTS_DB = VAULT_DIR / "events.json"
+EVENTS_LOG = VAULT_DIR / "events.jsonl"
+# Bloques grandes: hashlib libera el GIL y los hilos de ingesta masiva escalan
+HASH_CHUNK_SIZE = 1024 * 1024
 
 INGEST_DIR.mkdir(parents=True, exist_ok=True)
 REPORTS_DIR.mkdir(parents=True, exist_ok=True)
-if not EVENTS_DB.exists():
-    EVENTS_DB.write_text("[]", encoding="utf-8")
+
+_store = None
 
 
 def compute_sha3_512(file_path: Path) -> str:
     h = hashlib.sha3_512()
     with open(file_path, "rb") as f:
-        while chunk := f.read(4096):
+        while chunk := f.read(HASH_CHUNK_SIZE):
             h.update(chunk)
     return h.hexdigest()
 
 
-def load_events() -> list:
-    return json.loads(EVENTS_DB.read_text(encoding="utf-8"))
+def get_store() -> EventStore:
+    """Registro append-only; migra un events.json heredado la primera vez."""
+    global _store
+    if _store is None:
+        if not EVENTS_LOG.exists() and EVENTS_DB.exists():
+            migrate_json_array(EVENTS_DB, EVENTS_LOG)
+        _store = EventStore(EVENTS_LOG)
+    return _store
 
 
-def save_events(events: list):
-    EVENTS_DB.write_text(json.dumps(events, indent=2), encoding="utf-8")
+def load_events() -> list:
+    return list(get_store().iter_events())
 
 
 def generate_pdf(event: dict) -> Path:
@@ -55,13 +66,9 @@ def generate_pdf(event: dict) -> Path:
     return pdf_file
 
 
-def seal_file(file_path: Path, declared_by: str, purpose: str) -> dict:
-    """Sellar archivo: hash, registrar evento y generar PDF"""
-    file_path = Path(file_path)
-    hash_val = compute_sha3_512(file_path)
-    events = load_events()
-    event_id = str(len(events) + 1)
-    event = {
+def build_event(event_id: str, file_path: Path, hash_val: str,
+                declared_by: str, purpose: str) -> dict:
+    return {
         "id": event_id,
         "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
         "type": "FILE_INGEST",
@@ -71,7 +78,14 @@ def seal_file(file_path: Path, declared_by: str, purpose: str) -> dict:
         "declared_by": declared_by,
         "purpose": purpose
     }
-    events.append(event)
-    save_events(events)
+
+
+def seal_file(file_path: Path, declared_by: str, purpose: str) -> dict:
+    """Sellar archivo: hash, registrar evento y generar PDF"""
+    file_path = Path(file_path)
+    hash_val = compute_sha3_512(file_path)
+    store = get_store()
+    event = build_event(store.next_id(), file_path, hash_val, declared_by, purpose)
+    store.append(event, sync=True)
     generate_pdf(event)
     return event
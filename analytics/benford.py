@@ -39,4 +39,238 @@ class BenfordAnalyst:
         """Calcula una desviación global. Si supera 0.05, hay sospecha de fraude."""
         if not report: return 0
         avg_dev = sum(d['deviation'] for d in report.values()) / 9
-        return min(avg_dev * 10, 1.0) # Escala de 0 a 1
\ No newline at end of file
+        return min(avg_dev * 10, 1.0) # Escala de 0 a 1
+
+# -----------------------------
+# Suite completa (Nigrini)
+# -----------------------------
+BENFORD_TESTS = ("first", "second", "first_two", "last_two")
+
+# Dígitos posibles de cada prueba
+TEST_DIGITS = {
+    "first": range(1, 10),
+    "second": range(0, 10),
+    "first_two": range(10, 100),
+    "last_two": range(0, 100),
+}
+
+# Proporciones esperadas (last_two es uniforme: no sigue Benford sino el azar)
+EXPECTED = {
+    "first": {d: math.log10(1 + 1 / d) for d in range(1, 10)},
+    "second": {
+        d: sum(math.log10(1 + 1 / (10 * k + d)) for k in range(1, 10))
+        for d in range(0, 10)
+    },
+    "first_two": {d: math.log10(1 + 1 / d) for d in range(10, 100)},
+    "last_two": {d: 0.01 for d in range(0, 100)},
+}
+
+# Umbrales MAD de conformidad de Nigrini (Digital Analysis Using Benford's Law).
+# Para last_two no hay tabla publicada: se usan los de first_two (90 vs 100 celdas).
+MAD_THRESHOLDS = {
+    "first": (0.006, 0.012, 0.015),
+    "second": (0.008, 0.010, 0.012),
+    "first_two": (0.0012, 0.0018, 0.0022),
+    "last_two": (0.0012, 0.0018, 0.0022),
+}
+CONFORMITY_LABELS = ("CLOSE", "ACCEPTABLE", "MARGINAL", "NONCONFORMITY")
+
+# Z crítico al 95% (bilateral)
+Z_CRITICAL = 1.96
+
+
+def extract_digits(value, min_amount=10.0):
+    """
+    Devuelve (primeros_dos, ultimos_dos) de un importe, o None si no es
+    numérico o está por debajo de min_amount (Nigrini recomienda descartar
+    importes < 10). El primer y segundo dígito se derivan de primeros_dos.
+    ultimos_dos es None por debajo de 100, donde coincidirían con los primeros.
+    """
+    try:
+        amount = abs(float(value))
+    except (ValueError, TypeError):
+        return None
+    if not amount >= min_amount or amount == math.inf:
+        return None
+    # Notación científica: "d.ddd...e+XX" da los dígitos significativos sin
+    # los errores de redondeo de log10
+    s = "%.14e" % amount
+    first_two = (ord(s[0]) - 48) * 10 + ord(s[2]) - 48
+    return first_two, (int(amount) % 100 if amount >= 100 else None)
+
+
+def split_counts(joint):
+    """Conteos por prueba a partir de los conteos conjuntos {(primeros_dos, ultimos_dos): n}."""
+    counts = {test: Counter() for test in BENFORD_TESTS}
+    first, second, first_two, last_two = (counts[t] for t in BENFORD_TESTS)
+    for (f2, l2), n in joint.items():
+        first[f2 // 10] += n
+        second[f2 % 10] += n
+        first_two[f2] += n
+        if l2 is not None:
+            last_two[l2] += n
+    return counts
+
+
+def _chi2_sf(x, df):
+    """P(X > x) para chi-cuadrado con df grados de libertad (gamma incompleta regularizada)."""
+    if x <= 0:
+        return 1.0
+    a, x = df / 2.0, x / 2.0
+    ln_front = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        # Serie para la gamma inferior
+        term = total = 1.0 / a
+        n = a
+        for _ in range(1000):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(ln_front))
+    # Fracción continua (Lentz) para la gamma superior
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return min(1.0, h * math.exp(ln_front))
+
+
+def evaluate_test(test, counts, min_size=1):
+    """
+    Estadísticos de una prueba a partir de sus conteos por dígito:
+    chi-cuadrado (con p-valor), MAD con conformidad de Nigrini y Z por dígito.
+    """
+    n = sum(counts.values())
+    result = {"test": test, "n": n}
+    if n < max(min_size, 1):
+        result["conformity"] = "INSUFFICIENT_DATA"
+        return result
+
+    expected = EXPECTED[test]
+    chi_square = 0.0
+    abs_dev = 0.0
+    digits = {}
+    significant = []
+    for d in TEST_DIGITS[test]:
+        count = counts.get(d, 0)
+        p_exp = expected[d]
+        p_obs = count / n
+        diff = abs(p_obs - p_exp)
+        chi_square += (count - n * p_exp) ** 2 / (n * p_exp)
+        abs_dev += diff
+        # Corrección de continuidad sólo si es menor que la diferencia (Nigrini)
+        correction = 1 / (2 * n)
+        numerator = diff - correction if correction < diff else diff
+        z = numerator / math.sqrt(p_exp * (1 - p_exp) / n)
+        if z > Z_CRITICAL:
+            significant.append(d)
+        digits[d] = {
+            "count": count,
+            "observed": round(p_obs, 6),
+            "expected": round(p_exp, 6),
+            "z": round(z, 3),
+        }
+
+    df = len(TEST_DIGITS[test]) - 1
+    mad = abs_dev / len(TEST_DIGITS[test])
+    thresholds = MAD_THRESHOLDS[test]
+    level = sum(1 for t in thresholds if mad > t)
+    result.update({
+        "chi_square": round(chi_square, 4),
+        "df": df,
+        "p_value": _chi2_sf(chi_square, df),
+        "mad": round(mad, 6),
+        "conformity": CONFORMITY_LABELS[level],
+        "significant_digits": significant,
+        "digits": digits,
+    })
+    return result
+
+
+class BenfordSuite:
+    """
+    Pruebas de primer dígito, segundo dígito, primeros dos y últimos dos dígitos,
+    globales y segmentadas (por proveedor, por usuario) en una sola pasada.
+
+    Cada registro se reduce una única vez a su par (primeros_dos, ultimos_dos)
+    y se cuenta en el global y en su segmento; las cuatro pruebas salen de esos
+    conteos conjuntos al final. El coste es O(n) sin importar cuántos
+    proveedores o usuarios haya, y los acumuladores se pueden fusionar (merge)
+    para procesar por particiones.
+    """
+
+    def __init__(self, min_amount=10.0, segment_by=("vendor_id", "user_id"), min_segment_size=50):
+        self.min_amount = min_amount
+        self.segment_by = tuple(segment_by)
+        self.min_segment_size = min_segment_size
+        self.skipped = 0
+        self.global_counts = Counter()
+        # {campo: {valor: Counter((primeros_dos, ultimos_dos))}}
+        self.segment_counts = {field: {} for field in self.segment_by}
+
+    def accumulate(self, records, amount_key="amount"):
+        """Suma un lote de registros (se puede llamar por bloques en streaming)."""
+        min_amount = self.min_amount
+        global_counts = self.global_counts
+        segments = [(field, self.segment_counts[field]) for field in self.segment_by]
+
+        for r in records:
+            digits = extract_digits(r.get(amount_key), min_amount)
+            if digits is None:
+                self.skipped += 1
+                continue
+            global_counts[digits] += 1
+            for field, groups in segments:
+                key = r.get(field)
+                counts = groups.get(key)
+                if counts is None:
+                    counts = groups[key] = Counter()
+                counts[digits] += 1
+        return self
+
+    def merge(self, other):
+        """Fusiona los conteos de otra suite (mismos parámetros) en ésta."""
+        self.skipped += other.skipped
+        self.global_counts.update(other.global_counts)
+        for field in self.segment_by:
+            groups = self.segment_counts[field]
+            for key, counts in other.segment_counts.get(field, {}).items():
+                groups.setdefault(key, Counter()).update(counts)
+        return self
+
+    def _evaluate(self, joint, min_size=1):
+        counts = split_counts(joint)
+        return {test: evaluate_test(test, counts[test], min_size) for test in BENFORD_TESTS}
+
+    def results(self):
+        return {
+            "min_amount": self.min_amount,
+            "skipped": self.skipped,
+            "global": self._evaluate(self.global_counts),
+            "segments": {
+                field: {
+                    key: self._evaluate(joint, self.min_segment_size)
+                    for key, joint in groups.items()
+                }
+                for field, groups in self.segment_counts.items()
+            },
+        }
+
+    @classmethod
+    def analyze(cls, records, **kwargs):
+        return cls(**kwargs).accumulate(records).results()
@@ -0,0 +1,226 @@
+import heapq
+import multiprocessing
+import os
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, NamedTuple, Optional
+
+from analytics.benford import BenfordAnalyst, BenfordSuite
+from analytics.outliers import OutlierDetector
+from analytics.patterns import PatternMatcher
+
+# Por debajo de este tamaño arrancar procesos cuesta más de lo que ahorra
+PARALLEL_MIN_ROWS = 20000
+
+
+class Detector(NamedTuple):
+    """
+    kind:
+      "column"  -> fn(importes): sólo la columna de importes (memoria compartida)
+      "records" -> fn(registros): necesita el conjunto completo
+      "per_key" -> fn(clave, registros_del_grupo); key(registro) da la clave.
+                   Los grupos se reparten entre procesos por crc32 de la clave.
+    """
+    name: str
+    kind: str
+    fn: Callable
+    key: Optional[Callable] = None
+
+
+DETECTORS = {}
+
+
+def register_detector(name, kind="records", key=None):
+    """Registra un detector. Deben ser funciones de módulo (se ejecutan en otros procesos)."""
+    if kind not in ("column", "records", "per_key"):
+        raise ValueError(f"Unknown detector kind: {kind}")
+    if kind == "per_key" and key is None:
+        raise ValueError("per_key detectors need a key function")
+
+    def register(fn):
+        DETECTORS[name] = Detector(name, kind, fn, key)
+        return fn
+    return register
+
+
+# -----------------------------
+# Detectores incluidos
+# -----------------------------
+def _vendor_key(r):
+    return r.get('vendor_id')
+
+
+def _user_key(r):
+    return r.get('user_id')
+
+
+def _user_vendor_key(r):
+    return (r['user_id'], r['vendor_id'])
+
+
+def _amounts(records):
+    amounts = []
+    for r in records:
+        try:
+            amounts.append(float(r['amount']))
+        except (KeyError, ValueError, TypeError):
+            continue
+    return amounts
+
+
+@register_detector("benford_score", kind="column")
+def benford_score(amounts):
+    return BenfordAnalyst.get_anomaly_score(BenfordAnalyst.calculate_distribution(amounts))
+
+
+@register_detector("z_scores", kind="column")
+def z_scores(amounts):
+    return OutlierDetector.calculate_z_scores(amounts)
+
+
+@register_detector("benford_tests")
+def benford_tests(records):
+    return BenfordSuite.analyze(records)
+
+
+@register_detector("duplicates")
+def duplicates(records):
+    return PatternMatcher.detect_duplicate_payments(records)
+
+
+@register_detector("splits", kind="per_key", key=_user_vendor_key)
+def splits(key, transactions):
+    return PatternMatcher.split_transactions_for_key(key, transactions)
+
+
+@register_detector("robust_vendor", kind="per_key", key=_vendor_key)
+def robust_vendor(key, records):
+    return OutlierDetector.summarize_group(key, _amounts(records))
+
+
+@register_detector("robust_user", kind="per_key", key=_user_key)
+def robust_user(key, records):
+    return OutlierDetector.summarize_group(key, _amounts(records))
+
+
+# -----------------------------
+# Ejecución
+# -----------------------------
+def partition_of(key, partitions):
+    """Partición estable entre procesos (hash() de Python cambia por proceso)."""
+    return zlib.crc32(repr(key).encode()) % partitions
+
+
+def _group(records, key_fn, partition=None, partitions=1):
+    """[(primer_indice, clave, registros)] en orden de primera aparición."""
+    groups = {}
+    for i, r in enumerate(records):
+        key = key_fn(r)
+        group = groups.get(key)
+        if group is None:
+            if partition is not None and partition_of(key, partitions) != partition:
+                continue
+            group = groups[key] = (i, key, [])
+        group[2].append(r)
+    return list(groups.values())
+
+
+def _run_per_key(detector, records, partition=None, partitions=1):
+    return [
+        (first, key, detector.fn(key, group))
+        for first, key, group in _group(records, detector.key, partition, partitions)
+    ]
+
+
+def run_serial(records, names=None):
+    """Ejecuta los detectores en este proceso. Referencia para la versión paralela."""
+    results = {}
+    amounts = None
+    for name in names or list(DETECTORS):
+        detector = DETECTORS[name]
+        if detector.kind == "column":
+            if amounts is None:
+                amounts = [float(r['amount']) for r in records]
+            results[name] = detector.fn(amounts)
+        elif detector.kind == "records":
+            results[name] = detector.fn(records)
+        else:
+            results[name] = [(key, out) for _, key, out in _run_per_key(detector, records)]
+    return results
+
+
+# Estado de cada proceso del pool, fijado por _init_worker
+_worker = {}
+
+
+def _init_worker(shm_name, size, records):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker["shm"] = shm
+    _worker["amounts"] = shm.buf[:size * 8].cast("d")
+    _worker["records"] = records
+
+
+def _task(name, partition, partitions):
+    detector = DETECTORS[name]
+    if detector.kind == "column":
+        return detector.fn(_worker["amounts"].tolist())
+    if detector.kind == "records":
+        return detector.fn(_worker["records"])
+    return _run_per_key(detector, _worker["records"], partition, partitions)
+
+
+def run_parallel(records, workers=None, names=None):
+    """
+    Ejecuta los detectores en un pool de procesos.
+
+    La columna de importes se publica una vez en memoria compartida; los
+    registros llegan a cada proceso al arrancarlo (sin copia con fork).
+    Los detectores independientes corren a la vez y los de clave se dividen
+    en `workers` particiones por crc32 de la clave. Los resultados se
+    recomponen en el orden de la ejecución en serie, así que la salida es
+    idéntica a run_serial.
+    """
+    workers = workers or os.cpu_count() or 1
+    names = names or list(DETECTORS)
+
+    amounts = array("d", (float(r['amount']) for r in records))
+    shm = shared_memory.SharedMemory(create=True, size=max(len(amounts) * 8, 1))
+    try:
+        shm.buf[:len(amounts) * 8] = amounts.tobytes()
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(shm.name, len(amounts), records),
+        ) as pool:
+            futures = {}
+            for name in names:
+                if DETECTORS[name].kind == "per_key":
+                    futures[name] = [pool.submit(_task, name, p, workers) for p in range(workers)]
+                else:
+                    futures[name] = pool.submit(_task, name, None, 1)
+
+            results = {}
+            for name in names:
+                if DETECTORS[name].kind == "per_key":
+                    parts = [f.result() for f in futures[name]]
+                    # Cada partición ya está en orden de primera aparición
+                    merged = heapq.merge(*parts, key=lambda item: item[0])
+                    results[name] = [(key, out) for _, key, out in merged]
+                else:
+                    results[name] = futures[name].result()
+        return results
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def run_detectors(records, workers=None, names=None):
+    """Paralelo si hay más de un worker y datos suficientes; si no, en serie."""
+    if workers is not None and workers > 1 and len(records) >= PARALLEL_MIN_ROWS:
+        return run_parallel(records, workers, names)
+    return run_serial(records, names)
@@ -1,19 +1,28 @@
-from analytics.benford import BenfordAnalyst
+from analytics.detectors import run_detectors
 from analytics.outliers import OutlierDetector
-from analytics.patterns import PatternMatcher
 
 class AnalyticsEngine:
-    def __init__(self, data):
+    def __init__(self, data, workers=None):
         self.data = data # Datos inmutables de entrada
+        # Procesos para los detectores (None/1 = en serie, mismo resultado)
+        self.workers = workers
 
     def run_full_audit(self):
-        amounts = [float(r['amount']) for r in self.data]
-        
+        # Detectores independientes (ver analytics/detectors.py)
+        results = run_detectors(self.data, workers=self.workers)
+
         # Procesamiento estadístico
-        benford_report = BenfordAnalyst.calculate_distribution(amounts)
-        benford_score = BenfordAnalyst.get_anomaly_score(benford_report)
-        z_scores = OutlierDetector.calculate_z_scores(amounts)
-        splits = PatternMatcher.detect_split_transactions(self.data)
+        benford_score = results["benford_score"]
+        # Primer/segundo/primeros dos/últimos dos dígitos, global y por proveedor/usuario
+        benford_tests = results["benford_tests"]
+        z_scores = results["z_scores"]
+        # Mediana/MAD e IQR dentro de cada proveedor y cada usuario
+        robust = OutlierDetector.robust_scores(self.data, stats={
+            "vendor_id": dict(results["robust_vendor"]),
+            "user_id": dict(results["robust_user"]),
+        })
+        splits = [a for _, found in results["splits"] for a in found]
+        duplicates = results["duplicates"]
         
         # Construcción del set de Hallazgos (Findings)
         findings = []
@@ -22,6 +31,12 @@ class AnalyticsEngine:
             f = record.copy()
             f['z_score'] = round(z_scores[i], 2)
             f['is_outlier'] = OutlierDetector.flag_high_risk(z_scores[i])
+            vendor_score, user_score = robust[i]['vendor_id'], robust[i]['user_id']
+            f['robust_z_vendor'] = vendor_score['modified_z'] if vendor_score else None
+            f['robust_z_user'] = user_score['modified_z'] if user_score else None
+            f['is_robust_outlier'] = any(
+                s['is_outlier'] or s['iqr_outlier'] for s in (vendor_score, user_score) if s
+            )
             # Índice de Riesgo AETERNA (ARI)
             f['global_risk_index'] = (benford_score * 0.4) + (abs(z_scores[i]) / 10 * 0.6)
             findings.append(f)
@@ -29,9 +44,10 @@ class AnalyticsEngine:
         return {
             "summary": {
                 "benford_score": benford_score,
-                "outliers_count": sum(1 for x in findings if x['is_outlier'])
+                "outliers_count": sum(1 for x in findings if x['is_outlier']),
+                "robust_outliers_count": sum(1 for x in findings if x['is_robust_outlier'])
             },
             "detailed_findings": findings, # ESTA CLAVE ES EL CONTRATO DEFINITIVO
-            "patterns": splits
+            "patterns": splits + duplicates,
+            "benford_tests": benford_tests
         }
-    
\ No newline at end of file
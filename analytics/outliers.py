@@ -1,4 +1,16 @@
 import math
+import zlib
+
+from analytics.sketches import QuantileAccumulator
+
+# Iglewicz y Hoaglin: |M| > 3.5 es un posible outlier; 0.6745 = Φ⁻¹(0.75)
+MODIFIED_Z_THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+# Si MAD = 0 (más de la mitad de importes iguales) se usa la desviación
+# absoluta media escalada, como hacen las herramientas de auditoría habituales
+MEAN_AD_SCALE = 1.253314
+# Cercas de Tukey
+IQR_FENCE = 1.5
 
 class OutlierDetector:
     @staticmethod
@@ -15,4 +27,147 @@ class OutlierDetector:
     @staticmethod
     def flag_high_risk(z_score, threshold=3.0):
         """Un Z-Score > 3 indica una anomalía estadística severa (99.7% de confianza)."""
-        return abs(z_score) > threshold
\ No newline at end of file
+        return abs(z_score) > threshold
+
+    # -----------------------------
+    # Detección robusta por grupo
+    # -----------------------------
+    @staticmethod
+    def group_statistics(records, field, amount_key="amount", exact_limit=10000, k=200):
+        """
+        Mediana, MAD y cuartiles de los importes por valor de `field`.
+
+        Los grupos de hasta exact_limit registros se calculan de forma exacta;
+        los mayores con sketches KLL (memoria acotada). Son dos pasadas: la
+        primera fija la mediana y los cuartiles, la segunda la MAD sobre
+        |x - mediana|. La semilla del sketch sale de la clave del grupo, así
+        que el resultado no depende del orden de particionado.
+        """
+        def accumulator(key):
+            return QuantileAccumulator(exact_limit, k, seed=zlib.crc32(repr(key).encode()))
+
+        values = {}
+        for r in records:
+            amount = _amount(r, amount_key)
+            if amount is None:
+                continue
+            key = r.get(field)
+            acc = values.get(key)
+            if acc is None:
+                acc = values[key] = accumulator(key)
+            acc.add(amount)
+
+        stats = {key: _location_stats(acc) for key, acc in values.items()}
+
+        deviations = {}
+        abs_sums = {}
+        for r in records:
+            amount = _amount(r, amount_key)
+            if amount is None:
+                continue
+            key = r.get(field)
+            dev = abs(amount - stats[key]["median"])
+            acc = deviations.get(key)
+            if acc is None:
+                acc = deviations[key] = accumulator(key)
+            acc.add(dev)
+            abs_sums[key] = abs_sums.get(key, 0.0) + dev
+
+        for key, s in stats.items():
+            _add_spread_stats(s, deviations[key], abs_sums[key])
+        return stats
+
+    @staticmethod
+    def summarize_group(key, amounts, exact_limit=10000, k=200):
+        """
+        Las mismas estadísticas que group_statistics para un único grupo ya
+        reunido (importes en el orden original). Da resultados idénticos, así
+        que los grupos se pueden repartir entre procesos.
+        """
+        seed = zlib.crc32(repr(key).encode())
+        acc = QuantileAccumulator(exact_limit, k, seed=seed)
+        for amount in amounts:
+            acc.add(amount)
+        stats = _location_stats(acc)
+        deviations = QuantileAccumulator(exact_limit, k, seed=seed)
+        abs_sum = 0.0
+        for amount in amounts:
+            dev = abs(amount - stats["median"])
+            deviations.add(dev)
+            abs_sum += dev
+        _add_spread_stats(stats, deviations, abs_sum)
+        return stats
+
+    @staticmethod
+    def robust_score(amount, stats):
+        """
+        Z modificado de Iglewicz-Hoaglin y si el importe cae fuera de las
+        cercas de Tukey. Devuelve (modified_z, iqr_outlier).
+        """
+        deviation = amount - stats["median"]
+        if stats["mad"] > 0:
+            modified_z = MAD_SCALE * deviation / stats["mad"]
+        elif stats["mean_ad"] > 0:
+            modified_z = deviation / (MEAN_AD_SCALE * stats["mean_ad"])
+        else:
+            modified_z = 0.0
+        low = stats["q1"] - IQR_FENCE * stats["iqr"]
+        high = stats["q3"] + IQR_FENCE * stats["iqr"]
+        return modified_z, not (low <= amount <= high)
+
+    @staticmethod
+    def robust_scores(records, fields=("vendor_id", "user_id"), amount_key="amount",
+                      min_group_size=5, exact_limit=10000, k=200, stats=None):
+        """
+        Puntuaciones robustas de cada registro frente a su propio proveedor y
+        su propio usuario: un proveedor grande no dispara alertas por serlo.
+        Devuelve una lista paralela a `records` con {campo: {...}}; los grupos
+        con menos de min_group_size importes no se puntúan (None).
+        `stats` ({campo: {clave: estadísticas}}) evita recalcularlas si ya
+        se obtuvieron por grupos (ejecución en paralelo).
+        """
+        per_field = stats or {
+            field: OutlierDetector.group_statistics(records, field, amount_key, exact_limit, k)
+            for field in fields
+        }
+        scores = []
+        for r in records:
+            amount = _amount(r, amount_key)
+            entry = {}
+            for field in fields:
+                stats = per_field[field].get(r.get(field))
+                if amount is None or stats is None or stats["n"] < min_group_size:
+                    entry[field] = None
+                    continue
+                modified_z, iqr_outlier = OutlierDetector.robust_score(amount, stats)
+                entry[field] = {
+                    "modified_z": round(modified_z, 4),
+                    "iqr_outlier": iqr_outlier,
+                    "is_outlier": abs(modified_z) > MODIFIED_Z_THRESHOLD,
+                    "method": stats["method"],
+                }
+            scores.append(entry)
+        return scores
+
+
+def _location_stats(acc):
+    return {
+        "n": acc.n,
+        "method": acc.method,
+        "median": acc.quantile(0.5),
+        "q1": acc.quantile(0.25),
+        "q3": acc.quantile(0.75),
+    }
+
+
+def _add_spread_stats(stats, deviations, abs_sum):
+    stats["mad"] = deviations.quantile(0.5)
+    stats["mean_ad"] = abs_sum / stats["n"]
+    stats["iqr"] = stats["q3"] - stats["q1"]
+
+
+def _amount(record, amount_key):
+    try:
+        return float(record[amount_key])
+    except (KeyError, ValueError, TypeError):
+        return None
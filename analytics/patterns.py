@@ -1,4 +1,5 @@
 from collections import defaultdict
+import bisect
 import datetime
 
 class PatternMatcher:
@@ -16,21 +17,191 @@ class PatternMatcher:
             
         anomalies = []
         for key, transactions in buckets.items():
-            if len(transactions) < 2: continue
-            
-            # Ordenar por tiempo (asumiendo formato ISO)
-            transactions.sort(key=lambda x: x['date'])
-            
-            for i in range(len(transactions) - 1):
-                t1 = datetime.datetime.fromisoformat(transactions[i]['date'])
-                t2 = datetime.datetime.fromisoformat(transactions[i+1]['date'])
-                
-                diff = (t2 - t1).total_seconds() / 3600
-                if diff <= time_window_hours:
-                    anomalies.append({
-                        "type": "SPLIT_TRANSACTION",
-                        "user": key[0],
-                        "vendor": key[1],
-                        "records": [transactions[i]['tx_id'], transactions[i+1]['tx_id']]
-                    })
-        return anomalies
\ No newline at end of file
+            anomalies.extend(PatternMatcher.split_transactions_for_key(key, transactions, time_window_hours))
+        return anomalies
+
+    @staticmethod
+    def split_transactions_for_key(key, transactions, time_window_hours=24):
+        """Fraccionamientos de un único par (usuario, proveedor)."""
+        if len(transactions) < 2:
+            return []
+
+        # Ordenar por tiempo (asumiendo formato ISO)
+        transactions = sorted(transactions, key=lambda x: x['date'])
+
+        anomalies = []
+        for i in range(len(transactions) - 1):
+            t1 = datetime.datetime.fromisoformat(transactions[i]['date'])
+            t2 = datetime.datetime.fromisoformat(transactions[i+1]['date'])
+
+            diff = (t2 - t1).total_seconds() / 3600
+            if diff <= time_window_hours:
+                anomalies.append({
+                    "type": "SPLIT_TRANSACTION",
+                    "user": key[0],
+                    "vendor": key[1],
+                    "records": [transactions[i]['tx_id'], transactions[i+1]['tx_id']]
+                })
+        return anomalies
+
+    @staticmethod
+    def detect_duplicate_payments(records, window_days=7, amount_tolerance=0.0):
+        """
+        Pagos duplicados al mismo proveedor.
+
+        Exactos: mismo (proveedor, importe, fecha, referencia), agrupados con
+        una tabla hash en una sola pasada.
+        Cercanos: mismo proveedor, importes a menos de amount_tolerance y
+        fechas a menos de window_days días, encadenados en clústeres: cada
+        clúster se reporta una vez, no cada par. Por proveedor se ordena por
+        (importe, fecha); dentro de cada importe la ventana de fechas es un
+        rango contiguo (bisect) y sólo se visitan los importes de la banda.
+        Registros sin importe o fecha válidos se omiten.
+        """
+        # Importe en céntimos: evita que 0.1 + 0.2 rompa la igualdad
+        def cents(value):
+            return int(round(float(value) * 100))
+
+        def parse_date(value):
+            d = value if isinstance(value, datetime.datetime) else datetime.datetime.fromisoformat(str(value))
+            # Fechas con zona a UTC ingenuo: comparables con las que no la llevan
+            if d.tzinfo is not None:
+                d = d.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+            return d
+
+        rows = []
+        for r in records:
+            try:
+                rows.append((r['vendor_id'], cents(r['amount']), parse_date(r['date']), r))
+            except (KeyError, ValueError, TypeError):
+                continue
+
+        # 1) Duplicados exactos por clave compuesta
+        groups = defaultdict(list)
+        for vendor, amount, date, r in rows:
+            key = (vendor, amount, date.date().isoformat(), r.get('reference'))
+            groups[key].append(r)
+
+        anomalies = []
+        exact_ids = {}
+        for (vendor, amount, day, reference), matches in groups.items():
+            if len(matches) < 2:
+                continue
+            ids = [m['tx_id'] for m in matches]
+            group_id = len(anomalies)
+            for tx_id in ids:
+                exact_ids[tx_id] = group_id
+            anomalies.append({
+                "type": "DUPLICATE_PAYMENT",
+                "match": "EXACT",
+                "vendor": vendor,
+                "amount": amount / 100,
+                "date": day,
+                "reference": reference,
+                "records": ids,
+            })
+
+        # 2) Casi duplicados: clústeres conexos por proveedor
+        by_vendor = defaultdict(list)
+        for vendor, amount, date, r in rows:
+            by_vendor[vendor].append((amount, date, r))
+        band = cents(amount_tolerance)
+        window = datetime.timedelta(days=window_days)
+        for vendor, vendor_rows in by_vendor.items():
+            for cluster in PatternMatcher._near_clusters(vendor_rows, band, window):
+                ids = [r['tx_id'] for _, _, r in cluster]
+                # Ya reportados juntos como duplicado exacto
+                groups_hit = {exact_ids.get(tx_id) for tx_id in ids}
+                if len(groups_hit) == 1 and None not in groups_hit:
+                    continue
+                amounts = [a for a, _, _ in cluster]
+                dates = [d for _, d, _ in cluster]
+                anomalies.append({
+                    "type": "DUPLICATE_PAYMENT",
+                    "match": "NEAR",
+                    "vendor": vendor,
+                    "amount": min(amounts) / 100,
+                    "amount_difference": (max(amounts) - min(amounts)) / 100,
+                    "days_apart": round((max(dates) - min(dates)).total_seconds() / 86400, 2),
+                    "records": ids,
+                })
+        return anomalies
+
+    @staticmethod
+    def _near_clusters(rows, band, window):
+        """
+        Componentes conexas de rows (importe, fecha, registro) donde dos
+        filas están unidas si difieren a lo sumo band céntimos y window en
+        el tiempo. Devuelve sólo las de dos o más filas, ordenadas por fecha.
+
+        Bloques por importe ordenados por fecha. Para cada fila y cada
+        bloque de la banda, las filas dentro de la ventana son un rango
+        contiguo [lo, hi) y todas quedan unidas a ella: basta unirla con
+        rows[lo] y fusionar los vecinos del rango. `right` salta los pares
+        vecinos ya fusionados, así cada par se fusiona una sola vez y el
+        coste no crece con el tamaño de los clústeres.
+        """
+        rows = sorted(rows, key=lambda x: (x[0], x[1]))
+        n = len(rows)
+        if n < 2:
+            return []
+
+        parent = list(range(n))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i, j):
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+        # right[k] == k: k y k+1 todavía no fusionados
+        right = list(range(n))
+
+        def last_merged(k):
+            while right[k] != k:
+                right[k] = right[right[k]]
+                k = right[k]
+            return k
+
+        def merge_range(lo, hi):
+            k = last_merged(lo)
+            while k < hi - 1:
+                union(k, k + 1)
+                right[k] = k + 1
+                k = last_merged(k + 1)
+
+        # Bloques [inicio, fin) por importe
+        starts = [i for i in range(n) if i == 0 or rows[i][0] != rows[i - 1][0]]
+        ends = starts[1:] + [n]
+        amounts = [rows[s][0] for s in starts]
+        dates = [d for _, d, _ in rows]
+
+        for b, (start, end) in enumerate(zip(starts, ends)):
+            for i in range(start, end):
+                amount, date = rows[i][0], rows[i][1]
+                c = b
+                # Bloques de importe >= el propio dentro de la banda (los menores ya la miraron)
+                while c < len(starts) and amounts[c] - amount <= band:
+                    cs, ce = starts[c], ends[c]
+                    lo = bisect.bisect_left(dates, date - window, cs, ce)
+                    hi = bisect.bisect_right(dates, date + window, cs, ce)
+                    if c == b:
+                        lo = i
+                    if hi - lo > (1 if c == b else 0):
+                        union(i, lo)
+                        merge_range(lo, hi)
+                    c += 1
+
+        clusters = defaultdict(list)
+        for i in range(n):
+            clusters[find(i)].append(rows[i])
+        return [
+            sorted(members, key=lambda x: x[1])
+            for members in clusters.values()
+            if len(members) > 1
+        ]
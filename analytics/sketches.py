@@ -0,0 +1,200 @@
+import math
+import random
+
+
+class KLLSketch:
+    """
+    Sketch de cuantiles KLL (Karnin, Lang, Liberty 2016).
+
+    Memoria O(k log(n/k)) con error de rango ~1.7/k, y fusionable: se pueden
+    construir sketches por partición (hilos, procesos, bloques de un fichero)
+    y combinarlos con merge() sin perder las garantías de error.
+    Con una semilla fija el resultado es determinista.
+    """
+
+    def __init__(self, k=200, c=2 / 3, seed=None):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.compactors = [[]]
+        self._rng = random.Random(seed)
+        self._size = 0
+        self._max_size = 0
+        self._sorted = None
+        self._update_max_size()
+
+    # -----------------------------
+    # Capacidades
+    # -----------------------------
+    def _capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _update_max_size(self):
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    # -----------------------------
+    # Actualización y fusión
+    # -----------------------------
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.n += 1
+        self._size += 1
+        self._sorted = None
+        if self._size >= self._max_size:
+            self._compress()
+
+    def extend(self, values):
+        for value in values:
+            self.update(value)
+        return self
+
+    def _compress(self):
+        for h in range(len(self.compactors)):
+            level = self.compactors[h]
+            if len(level) < self._capacity(h):
+                continue
+            if h + 1 == len(self.compactors):
+                self.compactors.append([])
+                self._update_max_size()
+            # Ordena y promociona uno de cada dos elementos (par o impar al azar);
+            # si la longitud es impar, el mayor se queda en este nivel
+            level.sort()
+            keep = [level.pop()] if len(level) % 2 else []
+            offset = 1 if self._rng.random() < 0.5 else 0
+            self.compactors[h + 1].extend(level[offset::2])
+            self.compactors[h] = keep
+            self._size = sum(len(level) for level in self.compactors)
+            if self._size < self._max_size:
+                break
+
+    def merge(self, other):
+        """Incorpora otro sketch (mismo k y c) en éste."""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        self._update_max_size()
+        for h, level in enumerate(other.compactors):
+            self.compactors[h].extend(level)
+        self.n += other.n
+        self._size = sum(len(level) for level in self.compactors)
+        self._sorted = None
+        while self._size >= self._max_size:
+            before = self._size
+            self._compress()
+            if self._size >= before:
+                break
+        return self
+
+    # -----------------------------
+    # Consultas
+    # -----------------------------
+    def _weighted(self):
+        """[(valor, peso_acumulado)] ordenado; un elemento del nivel h pesa 2^h."""
+        if self._sorted is None:
+            items = sorted(
+                (value, 1 << h)
+                for h, level in enumerate(self.compactors)
+                for value in level
+            )
+            cumulative = 0
+            weighted = []
+            for value, weight in items:
+                cumulative += weight
+                weighted.append((value, cumulative))
+            self._sorted = weighted
+        return self._sorted
+
+    def quantile(self, q):
+        if self.n == 0:
+            return None
+        weighted = self._weighted()
+        target = q * weighted[-1][1]
+        for value, cumulative in weighted:
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def rank(self, value):
+        """Fracción aproximada de elementos <= value."""
+        if self.n == 0:
+            return 0.0
+        weighted = self._weighted()
+        below = 0
+        for item, cumulative in weighted:
+            if item > value:
+                break
+            below = cumulative
+        return below / weighted[-1][1]
+
+    def __len__(self):
+        return self.n
+
+
+def exact_quantile(sorted_values, q):
+    """Cuantil con interpolación lineal (el método por defecto de numpy)."""
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * q
+    lo = int(math.floor(pos))
+    hi = min(lo + 1, len(sorted_values) - 1)
+    frac = pos - lo
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * frac
+
+
+class QuantileAccumulator:
+    """
+    Valores de un grupo: exactos mientras caben en exact_limit y, a partir de
+    ahí, volcados a un KLLSketch. Los grupos pequeños (la mayoría de
+    proveedores) conservan cuantiles exactos; los grandes usan memoria acotada.
+    """
+
+    def __init__(self, exact_limit=10000, k=200, seed=None):
+        self.exact_limit = exact_limit
+        self.k = k
+        self.seed = seed
+        self.values = []
+        self.sketch = None
+        self._sorted = None
+
+    @property
+    def method(self):
+        return "exact" if self.sketch is None else "kll"
+
+    @property
+    def n(self):
+        return len(self.values) if self.sketch is None else self.sketch.n
+
+    def add(self, value):
+        self._sorted = None
+        if self.sketch is not None:
+            self.sketch.update(value)
+            return
+        self.values.append(value)
+        if len(self.values) > self.exact_limit:
+            self._spill()
+
+    def _spill(self):
+        self.sketch = KLLSketch(self.k, seed=self.seed).extend(self.values)
+        self.values = []
+
+    def merge(self, other):
+        self._sorted = None
+        if self.sketch is None and other.sketch is None:
+            self.values.extend(other.values)
+            if len(self.values) > self.exact_limit:
+                self._spill()
+            return self
+        if self.sketch is None:
+            self._spill()
+        if other.sketch is None:
+            self.sketch.extend(other.values)
+        else:
+            self.sketch.merge(other.sketch)
+        return self
+
+    def quantile(self, q):
+        if self.sketch is not None:
+            return self.sketch.quantile(q)
+        if self._sorted is None:
+            self._sorted = sorted(self.values)
+        return exact_quantile(self._sorted, q)
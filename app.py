@@ -1,20 +1,31 @@
 # app.py
 # AETERNA-FS — Payment + Certificate Generation
 # Python 3.9 / FastAPI
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from typing import Optional
 from fastapi import FastAPI, UploadFile, File, Form, Request
-from fastapi.responses import RedirectResponse, FileResponse, HTMLResponse
-from reports.pdf_generator import generate_audit_report
+from fastapi.responses import RedirectResponse, FileResponse, HTMLResponse, Response, StreamingResponse
+from payments.gateway import PaymentGateway
+from aeterna.event_store import EventStore, iter_json_array
+from core.archive import ArchiveStore
+from core.evidence import case_members, stream_package
+from core.export import EXPORT_FORMATS, stream_events
+from core.files import atomic_output, file_lock
+from core.vault_manager import VaultManager
+from jobs.job_queue import JobQueue
+from jobs.worker import WorkerPool, handler
 from pathlib import Path
 from datetime import datetime
+from itertools import islice
 import uuid
 import hashlib
+import hmac
 import json
 import logging
 import sqlite3
-import stripe
 import os
+import zlib
 
 load_dotenv()
 
@@ -23,14 +34,49 @@ logger = logging.getLogger("aeterna")
 
 
 # Amount in cents (900 = $9.00 USD)
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 PRICE_AMOUNT = 900
 MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
 # Public base URL used for Stripe redirects
 PUBLIC_URL = os.getenv("PUBLIC_URL", "http://localhost:8000")
+# Certificates never change once generated; paid content stays out of shared caches
+CERTIFICATE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Behind nginx: hand the file back via X-Accel-Redirect so it is served with sendfile
+ACCEL_REDIRECT_PREFIX = os.getenv("AETERNA_ACCEL_REDIRECT_PREFIX")
+# Job workers running inside the web process (0 = only the Procfile worker)
+INPROCESS_WORKERS = int(os.getenv("AETERNA_INPROCESS_WORKERS", "2"))
+# Bearer token for the operator endpoints (vault export, evidence packages); unset = disabled
+ADMIN_TOKEN = os.getenv("AETERNA_ADMIN_TOKEN")
+
+gateway = PaymentGateway(
+    api_key=os.getenv("STRIPE_SECRET_KEY"),
+    public_url=PUBLIC_URL,
+    price_amount=PRICE_AMOUNT,
+    # Points at tools/fake_stripe.py in tests and benchmarks
+    api_base=os.getenv("STRIPE_API_BASE"),
+    timeout=float(os.getenv("STRIPE_TIMEOUT", "10")),
+)
+
+job_queue: Optional[JobQueue] = None
+archive_store: Optional[ArchiveStore] = None
+vault_manager: Optional[VaultManager] = None
+worker_pool: Optional[WorkerPool] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing touches disk at import time; setup runs once per worker boot
+    global worker_pool
+    setup()
+    if INPROCESS_WORKERS > 0:
+        worker_pool = WorkerPool(job_queue, concurrency=INPROCESS_WORKERS).start()
+    try:
+        yield
+    finally:
+        if worker_pool:
+            worker_pool.stop()
+            worker_pool = None
 
-app = FastAPI(title="AETERNA-FS")
+app = FastAPI(title="AETERNA-FS", lifespan=lifespan)
 
 # -----------------------------
 # File Paths
@@ -39,15 +85,19 @@ BASE_DIR = Path(__file__).parent
 VAULT_DIR = BASE_DIR / "vault"
 INGEST_DIR = VAULT_DIR / "ingest"
 REPORTS_DIR = VAULT_DIR / "reports"
+# File-based event records: events.jsonl from the CLI ingest, events.json before it
 EVENTS_JSON = VAULT_DIR / "events.json"
+EVENTS_LOG = VAULT_DIR / "events.jsonl"
 EVENTS_DB_PATH = VAULT_DIR / "events.db"
-
-# Create necessary directories
-INGEST_DIR.mkdir(parents=True, exist_ok=True)
-REPORTS_DIR.mkdir(parents=True, exist_ok=True)
-
-if not EVENTS_JSON.exists():
-    EVENTS_JSON.write_text("[]", encoding="utf-8")
+ARCHIVE_DIR = VAULT_DIR / "archive"
+VAULT_DB_PATH = VAULT_DIR / "aeterna_vault.db"
+# flock() files coordinating uvicorn workers (and the Procfile worker) on this host
+LOCKS_DIR = VAULT_DIR / "locks"
+# Renders of different events rarely collide on a stripe; the lock files stay bounded
+RENDER_LOCK_STRIPES = 256
+# Certificate ETags by (path, inode, mtime, size)
+ETAG_CACHE_SIZE = 4096
+_etag_cache = {}
 
 # -----------------------------
 # Utilities
@@ -63,12 +113,15 @@ def compute_sha3_512(file_path: Path) -> str:
     return h.hexdigest()
 
 def get_conn():
-    conn = sqlite3.connect(EVENTS_DB_PATH)
+    # Several workers share this file: wait for a writer instead of failing
+    conn = sqlite3.connect(EVENTS_DB_PATH, timeout=30)
     conn.row_factory = sqlite3.Row
     return conn
 
 def init_db():
     with get_conn() as conn:
+        # Readers never block the writer; persistent for the database file
+        conn.execute("PRAGMA journal_mode=WAL")
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS events (
@@ -84,45 +137,116 @@ def init_db():
             )
             """
         )
+        # Binary SHA3-512 -> event index for /verify lookups
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS event_digests (
+                digest BLOB NOT NULL,
+                event_id TEXT NOT NULL,
+                PRIMARY KEY (digest, event_id)
+            ) WITHOUT ROWID
+            """
+        )
+        # One-time startup steps already applied to this database
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS setup_markers (
+                name TEXT PRIMARY KEY,
+                applied_at TEXT NOT NULL
+            )
+            """
+        )
         conn.commit()
 
-def db_is_empty() -> bool:
+def run_once(name: str, step):
     with get_conn() as conn:
-        row = conn.execute("SELECT COUNT(1) AS cnt FROM events").fetchone()
-        return row["cnt"] == 0
-
-def migrate_events_json_to_db():
-    if not EVENTS_JSON.exists():
-        return
-    if not db_is_empty():
+        done = conn.execute(
+            "SELECT 1 FROM setup_markers WHERE name = ?", (name,)
+        ).fetchone()
+    if done:
         return
+    step()
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO setup_markers (name, applied_at) VALUES (?, ?)",
+            (name, datetime.utcnow().isoformat() + "Z"),
+        )
+        conn.commit()
+
+def event_digest(hash_hex) -> Optional[bytes]:
+    """Binary SHA3-512 of a stored hash, or None if it is not 128 hex characters."""
+    if not isinstance(hash_hex, str) or len(hash_hex) != 128:
+        return None
     try:
-        events = json.loads(EVENTS_JSON.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
-        return
-    if not events:
-        return
+        return bytes.fromhex(hash_hex)
+    except ValueError:
+        return None
+
+def backfill_event_digests():
     with get_conn() as conn:
-        for e in events:
-            conn.execute(
+        events = conn.execute("SELECT COUNT(1) AS cnt FROM events").fetchone()["cnt"]
+        indexed = conn.execute("SELECT COUNT(1) AS cnt FROM event_digests").fetchone()["cnt"]
+        if events == indexed:
+            return
+        cur = conn.execute("SELECT id, hash FROM events")
+        while True:
+            rows = cur.fetchmany(1000)
+            if not rows:
+                break
+            digests = []
+            for row in rows:
+                digest = event_digest(row["hash"])
+                if digest is None:
+                    # Imported records may carry anything; they stay out of /verify
+                    logger.warning("Event %s has no valid SHA3-512 hash; not indexed", row["id"])
+                    continue
+                digests.append((digest, row["id"]))
+            conn.executemany(
+                "INSERT OR IGNORE INTO event_digests (digest, event_id) VALUES (?, ?)",
+                digests,
+            )
+        conn.commit()
+
+def iter_legacy_events():
+    """File-based events: the CLI's events.jsonl, or an older events.json array."""
+    if EVENTS_LOG.exists():
+        return EventStore(EVENTS_LOG).iter_events()
+    if EVENTS_JSON.exists():
+        return iter_json_array(EVENTS_JSON)
+    return iter(())
+
+def migrate_events_json_to_db():
+    """
+    Imports the file-based events into the database. Idempotent: rows whose
+    id is already there are left as they are, so it is safe next to events
+    created through the web.
+    """
+    columns = ("id", "timestamp", "file", "hash", "declared_by", "purpose")
+    events = iter_legacy_events()
+    imported = 0
+    with get_conn() as conn:
+        while True:
+            batch = list(islice(events, 1000))
+            if not batch:
+                break
+            cur = conn.executemany(
                 """
                 INSERT OR IGNORE INTO events
                 (id, timestamp, file, hash, declared_by, purpose, paid, session_id, payment_intent)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                (
-                    e.get("id"),
-                    e.get("timestamp"),
-                    e.get("file"),
-                    e.get("hash"),
-                    e.get("declared_by"),
-                    e.get("purpose"),
-                    1 if e.get("paid") else 0,
-                    e.get("session_id"),
-                    e.get("payment_intent"),
-                ),
+                [
+                    tuple(e.get(c) for c in columns)
+                    + (1 if e.get("paid") else 0, e.get("session_id"), e.get("payment_intent"))
+                    for e in batch
+                ],
             )
+            imported += cur.rowcount
         conn.commit()
+    if imported:
+        logger.info("Imported %d file-based events", imported)
+        # The digest backfill may already be marked as applied on this database
+        backfill_event_digests()
 
 def row_to_event(row: sqlite3.Row) -> dict:
     return {
@@ -173,8 +297,25 @@ def insert_event(event: dict):
                 event.get("payment_intent"),
             ),
         )
+        conn.execute(
+            "INSERT OR IGNORE INTO event_digests (digest, event_id) VALUES (?, ?)",
+            (bytes.fromhex(event["hash"]), event["id"]),
+        )
         conn.commit()
 
+def find_events_by_digest(digest: bytes) -> list:
+    with get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT e.* FROM event_digests d
+            JOIN events e ON e.id = d.event_id
+            WHERE d.digest = ?
+            ORDER BY e.timestamp
+            """,
+            (digest,),
+        ).fetchall()
+        return [row_to_event(row) for row in rows]
+
 def update_event_payment(event_id: str, paid: bool, payment_intent: Optional[str]):
     with get_conn() as conn:
         conn.execute(
@@ -199,8 +340,30 @@ def update_event_session(event_id: str, session_id: str):
         )
         conn.commit()
 
-init_db()
-migrate_events_json_to_db()
+def setup():
+    """Directories, schema and one-time migrations. Safe to call repeatedly."""
+    global job_queue, archive_store, vault_manager
+    INGEST_DIR.mkdir(parents=True, exist_ok=True)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    # Every uvicorn worker boots at once; the first one migrates, the rest find it done
+    with file_lock(LOCKS_DIR / "setup.lock"):
+        init_db()
+        # Renamed from events_json_migrated, which never looked at events.jsonl
+        run_once("events_log_migrated", migrate_events_json_to_db)
+        run_once("event_digests_backfilled", backfill_event_digests)
+        # Opening the vault creates its schema and migrates a legacy audit_log
+        if vault_manager is None:
+            vault_manager = VaultManager(str(VAULT_DB_PATH))
+    if job_queue is None:
+        job_queue = JobQueue(EVENTS_DB_PATH)
+    if archive_store is None:
+        archive_store = ArchiveStore(ARCHIVE_DIR, base=BASE_DIR)
+
+def enqueue_job(kind: str, payload: dict, **kwargs) -> int:
+    job_id = job_queue.enqueue(kind, payload, **kwargs)
+    if worker_pool:
+        worker_pool.notify()
+    return job_id
 
 def safe_filename(original_name: str) -> str:
     # Strip any path components to avoid traversal
@@ -219,6 +382,109 @@ def save_upload_limited(src, dest: Path, max_bytes: int) -> int:
             f.write(chunk)
     return written
 
+def hash_stream(src) -> bytes:
+    # Constant memory regardless of upload size
+    h = hashlib.sha3_512()
+    while True:
+        chunk = src.read(1024 * 1024)
+        if not chunk:
+            break
+        h.update(chunk)
+    return h.digest()
+
+def certificate_path(event_id: str) -> Path:
+    return REPORTS_DIR / f"integrity_reference_{event_id}.pdf"
+
+def certificate_report_hash(event: dict) -> str:
+    return hashlib.sha3_512(event["hash"].encode()).hexdigest()
+
+def certificate_etag(pdf_path: Path) -> str:
+    # Strong validator over the stored bytes: a re-rendered PDF differs
+    # (ReportLab stamps creation time), so it must get a new ETag or a
+    # Range/If-Range resume could splice two files. Hashed once per version
+    # of the file on disk, keyed by what fstat sees on the open descriptor.
+    with open(pdf_path, "rb") as f:
+        st = os.fstat(f.fileno())
+        key = (str(pdf_path), st.st_ino, st.st_mtime_ns, st.st_size)
+        etag = _etag_cache.get(key)
+        if etag is None:
+            h = hashlib.sha3_512()
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+            etag = f'"{h.hexdigest()[:64]}"'
+            if len(_etag_cache) >= ETAG_CACHE_SIZE:
+                _etag_cache.clear()
+            _etag_cache[key] = etag
+    return etag
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def render_lock_path(event_id: str) -> Path:
+    return LOCKS_DIR / f"render-{zlib.crc32(event_id.encode()) % RENDER_LOCK_STRIPES:03d}.lock"
+
+def render_certificate(event: dict) -> Path:
+    pdf_path = certificate_path(event["id"])
+    if pdf_path.exists():
+        return pdf_path
+
+    # Single flight across threads and workers: one renders, the others wait
+    # and then serve its file. The PDF only appears once fully written.
+    with file_lock(render_lock_path(event["id"])):
+        if pdf_path.exists():
+            return pdf_path
+
+        # Certificates past retention live in the archive; bring back the original bytes
+        if archive_store is not None:
+            archive_store.restore(pdf_path)
+        if pdf_path.exists():
+            return pdf_path
+
+        # ReportLab is heavy; load it on the first certificate, not at boot
+        from reports.pdf_generator import generate_audit_report
+
+        # Generate the report using event data
+        with atomic_output(pdf_path) as tmp_path:
+            generate_audit_report(str(tmp_path), {
+                "verified_at": event["timestamp"],
+                "verdict": "PASS",
+                "instance_id": f"AETERNA-{event['id'][:8]}",
+                "customer": event["declared_by"],
+                "license_type": "Public",
+                "scope": event["purpose"],
+                "checked_events": 1,
+                "deliverable_hash": event["hash"],
+                "deliverable_hash_algorithm": "SHA3-512",
+                "deliverable_purpose": event["purpose"],
+                "deliverable_declared_by": event["declared_by"],
+                "instance_fingerprint": event["hash"][:32],
+                "report_hash": certificate_report_hash(event),
+                "report_signature": hashlib.sha3_512(
+                    (event["hash"] + "aeterna").encode()
+                ).hexdigest()
+            })
+    return pdf_path
+
+def admin_authorized(request: Request) -> bool:
+    if not ADMIN_TOKEN:
+        return False
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode())
+
+def admin_denied(request: Request) -> Optional[Response]:
+    """Error response for operator endpoints, or None when the caller may proceed."""
+    if not ADMIN_TOKEN:
+        return HTMLResponse("Not found", status_code=404)
+    if not admin_authorized(request):
+        return HTMLResponse("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return None
+
 def db_health_ok() -> bool:
     try:
         with get_conn() as conn:
@@ -270,7 +536,7 @@ def landing():
 def health():
     checks = {
         "db": db_health_ok(),
-        "stripe_key": bool(stripe.api_key),
+        "stripe_key": gateway.configured,
         "webhook_secret": bool(STRIPE_WEBHOOK_SECRET),
     }
     ok = all(checks.values())
@@ -362,34 +628,59 @@ def preview(
     </html>
     """
 
+@app.post("/verify")
+def verify(
+    file: Optional[UploadFile] = File(None),
+    digest: Optional[str] = Form(None),
+):
+    if file is not None:
+        raw_digest = hash_stream(file.file)
+    elif digest:
+        try:
+            raw_digest = bytes.fromhex(digest.strip())
+        except ValueError:
+            raw_digest = b""
+        if len(raw_digest) != 64:
+            return HTMLResponse("Digest must be a 128-character SHA3-512 hex string.", status_code=400)
+    else:
+        return HTMLResponse("Provide a file or a digest.", status_code=400)
+
+    # The digest is public (every certificate prints it), and the event id
+    # alone unlocks /download. A bare digest only learns whether and when it
+    # was fixed; holding the file itself shows the record and certificate.
+    holds_file = file is not None
+    matches = []
+    for event in find_events_by_digest(raw_digest):
+        if not holds_file:
+            matches.append({"timestamp": event["timestamp"]})
+            continue
+        matches.append({
+            "id": event["id"],
+            "timestamp": event["timestamp"],
+            "file": event["file"],
+            "declared_by": event["declared_by"],
+            "purpose": event["purpose"],
+            "certificate": f"/download/{event['id']}" if event["paid"] else None,
+        })
+
+    return {
+        "hash_algorithm": "SHA3-512",
+        "digest": raw_digest.hex(),
+        "match": bool(matches),
+        "events": matches,
+    }
+
 @app.post("/pay/{event_id}")
 def pay(event_id: str):
     event = get_event_by_id(event_id)
     if not event:
         return HTMLResponse("Invalid reference ID", status_code=404)
 
-    # Create Stripe Checkout Session
-    session = stripe.checkout.Session.create(
-        payment_method_types=["card"],
-        line_items=[{
-            "price_data": {
-                "currency": "usd",
-                "product_data": {
-                    "name": f"AETERNA - Integrity Reference Certificate - ID: {event_id[:8]}",
-                },
-                "unit_amount": PRICE_AMOUNT,
-            },
-            "quantity": 1,
-        }],
-        mode="payment",
-        metadata={
-            "event_id": event_id,
-        },
-        success_url=f"{PUBLIC_URL}/paid/{event_id}?session_id={{CHECKOUT_SESSION_ID}}",
-        cancel_url=f"{PUBLIC_URL}/",
-    )
-    update_event_session(event_id, session.id)
-    return RedirectResponse(session.url, status_code=303)
+    # Reuse the event's open Checkout Session, or create a new one
+    session_id, session_url = gateway.checkout(event_id, event.get("session_id"))
+    if session_id != event.get("session_id"):
+        update_event_session(event_id, session_id)
+    return RedirectResponse(session_url, status_code=303)
 
 @app.get("/paid/{event_id}")
 def paid(event_id: str, session_id: Optional[str] = None):
@@ -401,15 +692,16 @@ def paid(event_id: str, session_id: Optional[str] = None):
         logger.warning("Invalid session for event %s", event_id)
         return HTMLResponse("Missing or invalid session.", status_code=400)
 
-    session = stripe.checkout.Session.retrieve(session_id)
-    if session.payment_status != "paid":
+    check = gateway.verify_payment(event, session_id)
+    if check.reason == "unpaid":
         logger.warning("Payment not completed for event %s", event_id)
         return HTMLResponse("Payment not completed.", status_code=402)
-    if session.amount_total != PRICE_AMOUNT or session.currency != "usd":
+    if check.reason == "amount_mismatch":
         logger.warning("Payment amount mismatch for event %s", event_id)
         return HTMLResponse("Payment amount mismatch.", status_code=400)
 
-    update_event_payment(event_id, True, session.payment_intent)
+    if not event.get("paid"):
+        update_event_payment(event_id, True, check.payment_intent)
     return RedirectResponse(f"/download/{event_id}", status_code=302)
 
 @app.post("/stripe/webhook")
@@ -421,33 +713,55 @@ async def stripe_webhook(request: Request):
     sig_header = request.headers.get("stripe-signature")
 
     try:
-        event = stripe.Webhook.construct_event(
-            payload=payload,
-            sig_header=sig_header,
-            secret=STRIPE_WEBHOOK_SECRET,
-        )
+        event = gateway.construct_webhook_event(payload, sig_header, STRIPE_WEBHOOK_SECRET)
     except Exception:
         logger.warning("Invalid Stripe webhook signature")
         return HTMLResponse("Invalid signature.", status_code=400)
 
     if event["type"] == "checkout.session.completed":
-        session = event["data"]["object"]
-        session_id = session.get("id")
-        payment_intent = session.get("payment_intent")
-        event_id = None
+        session = gateway.remember(event["data"]["object"])
         metadata = session.get("metadata") or {}
-        if isinstance(metadata, dict):
-            event_id = metadata.get("event_id")
-        target = get_event_by_session_id(session_id)
-        if not target and event_id:
-            target = get_event_by_id(event_id)
-        if target:
-            update_event_payment(target["id"], True, payment_intent)
+        # Side effects run on the job workers; Stripe redeliveries dedupe on the event id
+        enqueue_job(
+            "checkout_completed",
+            {
+                "session_id": session.get("id"),
+                "payment_intent": session.get("payment_intent"),
+                "event_id": metadata.get("event_id") if isinstance(metadata, dict) else None,
+            },
+            priority=10,
+            idempotency_key=f"stripe:{event['id']}",
+        )
 
     return {"status": "ok"}
 
-@app.get("/download/{event_id}")
-def download(event_id: str):
+# -----------------------------
+# Background jobs
+# -----------------------------
+@handler("checkout_completed")
+def handle_checkout_completed(payload: dict):
+    target = get_event_by_session_id(payload["session_id"])
+    if not target and payload.get("event_id"):
+        target = get_event_by_id(payload["event_id"])
+    if not target:
+        logger.warning("Checkout completed for unknown session %s", payload["session_id"])
+        return
+    if not target["paid"]:
+        update_event_payment(target["id"], True, payload.get("payment_intent"))
+    enqueue_job(
+        "render_certificate",
+        {"event_id": target["id"]},
+        idempotency_key=f"render:{target['id']}",
+    )
+
+@handler("render_certificate")
+def handle_render_certificate(payload: dict):
+    event = get_event_by_id(payload["event_id"])
+    if event and event["paid"]:
+        render_certificate(event)
+
+@app.api_route("/download/{event_id}", methods=["GET", "HEAD"])
+def download(event_id: str, request: Request):
     event = get_event_by_id(event_id)
     
     if not event:
@@ -456,31 +770,91 @@ def download(event_id: str):
     if not event.get("paid"):
         return HTMLResponse("Payment has not been processed.", status_code=402)
 
-    pdf_path = REPORTS_DIR / f"integrity_reference_{event_id}.pdf"
-
-    if not pdf_path.exists():
-        # Generate the report using event data
-        generate_audit_report(str(pdf_path), {
-            "verified_at": event["timestamp"],
-            "verdict": "PASS",
-            "instance_id": f"AETERNA-{event_id[:8]}",
-            "customer": event["declared_by"],
-            "license_type": "Public",
-            "scope": event["purpose"],
-            "checked_events": 1,
-            "deliverable_hash": event["hash"],
-            "deliverable_hash_algorithm": "SHA3-512",
-            "deliverable_purpose": event["purpose"],
-            "deliverable_declared_by": event["declared_by"],
-            "instance_fingerprint": event["hash"][:32],
-            "report_hash": hashlib.sha3_512(event["hash"].encode()).hexdigest(),
-            "report_signature": hashlib.sha3_512(
-                (event["hash"] + "aeterna").encode()
-            ).hexdigest()
-        })
+    pdf_path = render_certificate(event)
+    etag = certificate_etag(pdf_path)
+    cache_headers = {"ETag": etag, "Cache-Control": CERTIFICATE_CACHE_CONTROL}
+
+    # Revalidation costs a stat once the file's ETag is cached
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    if ACCEL_REDIRECT_PREFIX:
+        return Response(
+            media_type="application/pdf",
+            headers={
+                **cache_headers,
+                "X-Accel-Redirect": f"{ACCEL_REDIRECT_PREFIX.rstrip('/')}/{pdf_path.name}",
+                "Content-Disposition": 'attachment; filename="AETERNA_Integrity_Reference_Certificate.pdf"',
+            },
+        )
 
+    # FileResponse serves Range/If-Range against our ETag and uses
+    # zero-copy pathsend when the ASGI server offers it
     return FileResponse(
         pdf_path,
         filename="AETERNA_Integrity_Reference_Certificate.pdf",
-        media_type="application/pdf"
+        media_type="application/pdf",
+        headers=cache_headers,
+    )
+
+# -----------------------------
+# Operator endpoints
+# -----------------------------
+@app.get("/admin/vault/export")
+def export_vault(
+    request: Request,
+    format: str = "ndjson",
+    session_id: Optional[str] = None,
+    after: int = 0,
+    limit: Optional[int] = None,
+):
+    denied = admin_denied(request)
+    if denied:
+        return denied
+    if format not in EXPORT_FORMATS:
+        return HTMLResponse(f"Format must be one of: {', '.join(EXPORT_FORMATS)}", status_code=400)
+    if after < 0 or (limit is not None and limit < 1):
+        return HTMLResponse("after must be >= 0 and limit >= 1.", status_code=400)
+
+    # Rows carry their id: resume with ?after=<last id received>. The body is
+    # produced page by page as the client reads it, in constant memory.
+    return StreamingResponse(
+        stream_events(vault_manager, format, session_id, after, limit),
+        media_type=EXPORT_FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="aeterna_vault_after_{after}.{format}"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+@app.get("/admin/evidence/{case_id}.zip")
+def evidence_package(case_id: str, request: Request):
+    denied = admin_denied(request)
+    if denied:
+        return denied
+
+    event = get_event_by_id(case_id)
+    # A paid certificate that was never downloaded is rendered now; unpaid
+    # cases get no certificate, as on /download
+    certificate = render_certificate(event) if event and event["paid"] else None
+    members = case_members(
+        case_id,
+        vault_manager,
+        base=BASE_DIR,
+        archive=archive_store,
+        event=event,
+        certificate=certificate,
+    )
+    if not members:
+        return HTMLResponse("Unknown case", status_code=404)
+
+    # Built as it is sent: members are read, hashed and zipped chunk by
+    # chunk, the digest manifest goes last. No Content-Length, no temp file.
+    return StreamingResponse(
+        stream_package(members, {"case_id": case_id}),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="aeterna_evidence_{safe_filename(case_id)}.zip"',
+            "Cache-Control": "no-store",
+        },
     )
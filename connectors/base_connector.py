@@ -18,7 +18,7 @@ class BaseConnector(ABC):
     def get_context(self):
         """Metadatos de la conexión para la cadena de custodia."""
         return {
-            "timestamp": datetime.datetime.now(datetime.UTC).isoformat(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
             "connector": self.__class__.__name__,
             "target": self.config.get("host", "unknown")
         }
\ No newline at end of file
@@ -0,0 +1,209 @@
+import csv
+import hashlib
+import logging
+import mmap
+import os
+from connectors.base_connector import BaseConnector
+
+# Conversores admitidos en config['dtypes'] (también se acepta cualquier callable)
+DTYPES = {
+    "str": str,
+    "float": float,
+    "int": int,
+    "bool": lambda v: v if isinstance(v, bool) else str(v).strip().lower() in ("1", "true", "t", "yes", "si", "sí", "y"),
+}
+
+DEFAULT_CHUNK_ROWS = 50000
+
+
+class FileConnector(BaseConnector):
+    """
+    Exportaciones de contabilidad en fichero: CSV o Parquet.
+
+    config:
+        path        ruta del fichero
+        format      'csv' o 'parquet' (por defecto, según la extensión)
+        dtypes      {columna: 'float' | 'int' | 'str' | 'bool' | callable}
+        columns     columnas a leer (proyección); por defecto todas
+        chunk_rows  filas por bloque (por defecto 50000)
+        delimiter, encoding   sólo CSV
+
+    El fichero se lee una única vez y en bloques: la memoria depende del
+    tamaño del bloque, no del fichero. El SHA3-512 del fichero se calcula en
+    esa misma lectura y queda en get_context() para la cadena de custodia.
+    """
+
+    def connect(self):
+        try:
+            self.path = self.config['path']
+            self.format = (self.config.get('format') or os.path.splitext(self.path)[1].lstrip('.')).lower()
+            if self.format not in ('csv', 'parquet'):
+                raise ValueError(f"Formato no soportado: {self.format}")
+            if self.format == 'parquet':
+                # Dependencia opcional: sólo la necesita quien lee Parquet
+                import pyarrow.parquet  # noqa: F401
+            self.connection = open(self.path, 'rb')
+            self.size = os.fstat(self.connection.fileno()).st_size
+            self._hasher = hashlib.sha3_512()
+            self._hashed = 0
+            self.rows_read = 0
+            self.is_connected = True
+            return True
+        except Exception as e:
+            logging.error(f"Error abriendo el fichero: {e}")
+            return False
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        self.is_connected = False
+
+    # -----------------------------
+    # Lectura
+    # -----------------------------
+    def extract_data(self, query_params=None):
+        """Todas las filas en una lista (para ficheros que caben en memoria)."""
+        rows = []
+        for chunk in self.iter_chunks(**(query_params or {})):
+            rows.extend(chunk)
+        return rows
+
+    def iter_chunks(self, columns=None, chunk_rows=None):
+        """Genera listas de diccionarios ya tipados, de chunk_rows filas como máximo."""
+        if not self.is_connected:
+            raise ConnectionError("Fichero no abierto.")
+        columns = columns or self.config.get('columns')
+        chunk_rows = chunk_rows or self.config.get('chunk_rows', DEFAULT_CHUNK_ROWS)
+        converters = self._converters()
+        # Cada recorrido vuelve a leer el fichero desde el principio
+        self._hasher = hashlib.sha3_512()
+        self._hashed = 0
+        self.rows_read = 0
+        if self.format == 'csv':
+            chunks = self._iter_csv(columns, chunk_rows, converters)
+        else:
+            chunks = self._iter_parquet(columns, chunk_rows, converters)
+        for chunk in chunks:
+            self.rows_read += len(chunk)
+            yield chunk
+
+    def _converters(self):
+        converters = {}
+        for column, dtype in (self.config.get('dtypes') or {}).items():
+            fn = DTYPES.get(dtype) if isinstance(dtype, str) else dtype
+            if fn is None:
+                raise ValueError(f"Tipo desconocido para {column}: {dtype}")
+            converters[column] = fn
+        return converters
+
+    @staticmethod
+    def _convert(row, converters, line_no):
+        for column, fn in converters.items():
+            val = row.get(column)
+            if val is None or isinstance(val, str) and not val.strip():
+                row[column] = None
+                continue
+            try:
+                row[column] = fn(val)
+            except (ValueError, TypeError) as e:
+                # Un valor ilegible no debe desaparecer en silencio del análisis
+                raise ValueError(f"Fila {line_no}, columna {column!r}: {val!r} ({e})") from None
+        return row
+
+    def _iter_csv(self, columns, chunk_rows, converters):
+        if self.size == 0:
+            return
+        encoding = self.config.get('encoding', 'utf-8-sig')
+        delimiter = self.config.get('delimiter', ',')
+
+        with mmap.mmap(self.connection.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+
+            def lines():
+                # Cada línea se suma al hash a la vez que se entrega al parser
+                while True:
+                    line = mm.readline()
+                    if not line:
+                        return
+                    self._hasher.update(line)
+                    self._hashed += len(line)
+                    yield line.decode(encoding)
+
+            reader = csv.reader(lines(), delimiter=delimiter)
+            header = next(reader, None)
+            if header is None:
+                return
+            wanted = [i for i, name in enumerate(header) if not columns or name in columns]
+            names = [header[i] for i in wanted]
+
+            chunk = []
+            for row in reader:
+                record = {name: (row[i] if i < len(row) else None) for name, i in zip(names, wanted)}
+                chunk.append(self._convert(record, converters, reader.line_num))
+                if len(chunk) >= chunk_rows:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def _iter_parquet(self, columns, chunk_rows, converters):
+        import pyarrow.parquet as pq
+
+        if self.size == 0:
+            return
+        # pyarrow mapea el fichero por su cuenta; el hash va por otro mapeo del
+        # que sólo se copian bytes, así que cerrarlo nunca choca con un buffer
+        # vivo aunque el consumidor pare a mitad
+        with pq.ParquetFile(self.path, memory_map=True) as pf, \
+                mmap.mmap(self.connection.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            meta = pf.metadata
+            for rg in range(meta.num_row_groups):
+                group = meta.row_group(rg)
+                for batch in pf.iter_batches(batch_size=chunk_rows, row_groups=[rg], columns=columns):
+                    yield [self._convert(row, converters, None) for row in batch.to_pylist()]
+                # Hash hasta el final de este row group mientras sus páginas
+                # siguen en la caché de páginas del sistema
+                self._hash_until(mm, max(
+                    _chunk_start(group.column(i)) + group.column(i).total_compressed_size
+                    for i in range(group.num_columns)
+                ))
+            # Pie del fichero (metadatos)
+            self._hash_until(mm, self.size)
+
+    def _hash_until(self, mm, end):
+        end = min(end, self.size)
+        while self._hashed < end:
+            step = min(end - self._hashed, 1024 * 1024)
+            self._hasher.update(mm[self._hashed:self._hashed + step])
+            self._hashed += step
+
+    # -----------------------------
+    # Cadena de custodia
+    # -----------------------------
+    def source_hash(self):
+        """SHA3-512 del fichero completo; termina de leer lo que falte si se paró antes."""
+        if not self.is_connected:
+            raise ConnectionError("Fichero no abierto.")
+        if self._hashed < self.size:
+            with mmap.mmap(self.connection.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self._hash_until(mm, self.size)
+        return self._hasher.hexdigest()
+
+    def get_context(self):
+        context = super().get_context()
+        context["target"] = os.path.abspath(self.config['path'])
+        if self.is_connected:
+            context.update({
+                "source_format": self.format,
+                "source_bytes": self.size,
+                "source_sha3_512": self.source_hash(),
+                "rows_read": self.rows_read,
+            })
+        return context
+
+
+def _chunk_start(column):
+    """Primer byte de un column chunk de Parquet (la página de diccionario va antes)."""
+    if column.has_dictionary_page and column.dictionary_page_offset:
+        return min(column.dictionary_page_offset, column.data_page_offset)
+    return column.data_page_offset
@@ -15,4 +15,10 @@ class ForensicNormalizer:
                     val = val.strip()
                 new_entry[aeterna_key] = val
             normalized.append(new_entry)
-        return normalized
\ No newline at end of file
+        return normalized
+
+    @staticmethod
+    def normalize_chunks(chunks, mapping):
+        """Versión en streaming: normaliza bloque a bloque (p. ej. FileConnector.iter_chunks)."""
+        for chunk in chunks:
+            yield ForensicNormalizer.normalize(chunk, mapping)
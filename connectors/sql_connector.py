@@ -1,6 +1,14 @@
+import datetime
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy import create_engine, text
 from connectors.base_connector import BaseConnector
 
+# Fin de partición en la cola de bloques
+_DONE = object()
+
+
 class SQLConnector(BaseConnector):
     def connect(self):
         try:
@@ -18,4 +26,188 @@ class SQLConnector(BaseConnector):
             raise ConnectionError("Base de datos no conectada.")
         
         result = self.connection.execute(text(query))
-        return [dict(row._mapping) for row in result]
\ No newline at end of file
+        return [dict(row._mapping) for row in result]
+
+    # -----------------------------
+    # Extracción particionada
+    # -----------------------------
+    def _pool_engine(self, workers):
+        """Engine aparte con un pool acotado: como mucho `workers` conexiones al origen."""
+        engine = getattr(self, '_partition_engine', None)
+        if engine is None or self._partition_workers != workers:
+            if engine is not None:
+                engine.dispose()
+            engine = create_engine(
+                self.config['db_url'],
+                pool_size=workers,
+                max_overflow=0,
+                pool_timeout=self.config.get('pool_timeout', 30),
+            )
+            self._partition_engine, self._partition_workers = engine, workers
+        return engine
+
+    def partition_ranges(self, table, column, partitions, where=None):
+        """
+        Divide [MIN(column), MAX(column)] en `partitions` rangos de igual
+        anchura: [(desde, hasta, ultimo)], con 'hasta' excluido salvo en el último.
+        Sirve para columnas numéricas (id) y de fecha (date/datetime o texto ISO).
+        """
+        q = self.engine.dialect.identifier_preparer.quote
+        row = self.connection.execute(text(
+            f"SELECT MIN({q(column)}), MAX({q(column)}) FROM {q(table)}"
+            + (f" WHERE {where}" if where else "")
+        )).fetchone()
+        low, high = row
+        if low is None:
+            return []
+
+        to_value, from_value = _range_codec(low)
+        lo, hi = to_value(low), to_value(high)
+        if isinstance(lo, int):
+            # No más particiones que valores enteros distintos
+            partitions = max(1, min(partitions, hi - lo + 1))
+            bounds = [lo + (hi - lo + 1) * i // partitions for i in range(partitions + 1)]
+        else:
+            bounds = [lo + (hi - lo) * i / partitions for i in range(partitions + 1)]
+        # Los extremos son los valores reales: ninguna fila queda fuera por redondeo
+        points = [low] + [from_value(b) for b in bounds[1:-1]] + [high]
+
+        ranges = []
+        for i in range(partitions):
+            last = i == partitions - 1
+            # Los límites convertidos pueden repetirse (p. ej. fechas sin hora)
+            if last or points[i] != points[i + 1]:
+                ranges.append((points[i], points[i + 1], last))
+        return ranges
+
+    def iter_partitioned(self, table, partition_column, columns="*", where=None,
+                         partitions=None, workers=4, ordered=True, chunk_size=None):
+        """
+        Lanza una consulta por rango de `partition_column` en paralelo sobre un
+        pool acotado de `workers` conexiones. Genera bloques (listas) de hasta
+        `chunk_size` filas: en orden de clave con ordered=True, o según llegan.
+        Las filas con la columna a NULL van en una partición propia al final,
+        para no perder ninguna.
+
+        Memoria acotada: cada partición se lee con fetchmany sobre un cursor
+        de servidor, como mucho `workers` particiones están en vuelo y cada
+        una se bloquea tras dejar un par de bloques sin consumir; la siguiente
+        partición sólo se lanza cuando otra termina. Un consumidor lento frena
+        la lectura en vez de acumular la tabla.
+        """
+        if not self.is_connected:
+            raise ConnectionError("Base de datos no conectada.")
+        chunk_size = chunk_size or self.config.get('chunk_size', 10000)
+        q = self.engine.dialect.identifier_preparer.quote
+        cols = columns if isinstance(columns, str) else ", ".join(q(c) for c in columns)
+        col = q(partition_column)
+        base = f"SELECT {cols} FROM {q(table)} WHERE " + (f"({where}) AND " if where else "")
+        order = f" ORDER BY {col}" if ordered else ""
+
+        queries = [
+            (text(base + f"{col} >= :lo AND {col} {'<=' if last else '<'} :hi" + order), {"lo": lo, "hi": hi})
+            for lo, hi, last in self.partition_ranges(table, partition_column, partitions or workers * 4, where)
+        ]
+        queries.append((text(base + f"{col} IS NULL"), {}))
+
+        engine = self._pool_engine(workers)
+        stop = threading.Event()
+
+        def put(out, item):
+            # Espera a que el consumidor haga sitio, salvo que haya abandonado
+            while not stop.is_set():
+                try:
+                    out.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def fetch(index, out):
+            stmt, params = queries[index]
+            try:
+                with engine.connect() as conn:
+                    result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(stmt, params)
+                    while not stop.is_set():
+                        rows = result.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        if not put(out, (index, [dict(row._mapping) for row in rows])):
+                            return
+            except BaseException as e:
+                put(out, (index, e))
+                return
+            put(out, (index, _DONE))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Ordenado: una cola por partición (se vacía la de cabeza, las
+            # siguientes esperan llenas). Sin orden: una cola compartida.
+            shared = queue.Queue(maxsize=workers * 2)
+            outs = {}
+            submitted = 0
+
+            def submit_next():
+                nonlocal submitted
+                if submitted < len(queries):
+                    outs[submitted] = queue.Queue(maxsize=2) if ordered else shared
+                    pool.submit(fetch, submitted, outs[submitted])
+                    submitted += 1
+
+            try:
+                for _ in range(workers):
+                    submit_next()
+                head = 0
+                while outs:
+                    source = outs[head] if ordered else shared
+                    index, item = source.get()
+                    if item is _DONE:
+                        del outs[index]
+                        head += 1
+                        submit_next()
+                    elif isinstance(item, BaseException):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                stop.set()
+
+    def extract_partitioned(self, table, partition_column, **kwargs):
+        """Como extract_data, pero leyendo por rangos en paralelo (filas en orden de clave)."""
+        kwargs.setdefault("ordered", True)
+        return [row for chunk in self.iter_partitioned(table, partition_column, **kwargs) for row in chunk]
+
+
+def _range_codec(sample):
+    """(a_numero, desde_numero) para repartir valores numéricos o fechas."""
+    utc = datetime.timezone.utc
+    if isinstance(sample, bool):
+        raise TypeError("No se puede particionar por una columna booleana")
+    if isinstance(sample, int):
+        return int, int
+    if isinstance(sample, float):
+        return float, float
+    if isinstance(sample, datetime.datetime):
+        # Sin zona horaria se trata como UTC: la hora local no es monótona (cambio de hora)
+        tz = sample.tzinfo
+        return (
+            lambda v: (v if v.tzinfo else v.replace(tzinfo=utc)).timestamp(),
+            lambda v: datetime.datetime.fromtimestamp(v, tz or utc).replace(tzinfo=tz),
+        )
+    if isinstance(sample, datetime.date):
+        return (lambda v: v.toordinal()), (lambda v: datetime.date.fromordinal(int(v)))
+    if isinstance(sample, str):
+        # Fechas ISO guardadas como texto (SQLite): se comparan como texto,
+        # así que los límites se escriben con el mismo formato
+        if len(sample) == 10:
+            return (
+                lambda v: datetime.date.fromisoformat(v).toordinal(),
+                lambda v: datetime.date.fromordinal(int(v)).isoformat(),
+            )
+        to_dt, from_dt = _range_codec(datetime.datetime.fromisoformat(sample))
+        sep = sample[10]
+        timespec = "microseconds" if "." in sample else "seconds"
+        return (
+            lambda v: to_dt(datetime.datetime.fromisoformat(v)),
+            lambda v: from_dt(v).isoformat(sep=sep, timespec=timespec),
+        )
+    raise TypeError(f"Tipo de columna no particionable: {type(sample).__name__}")
@@ -0,0 +1,419 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+BASE_DIR = Path(__file__).parent.parent
+DEFAULT_ROOT = BASE_DIR / "vault" / "archive"
+
+# A pack is closed and a new one started past this size
+PACK_TARGET_BYTES = 64 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+COMPRESSION_LEVEL = 6
+
+
+class ArchiveStore:
+    """
+    Cold tier for evidence and reports.
+
+    Files past the retention age are compressed into append-only packs under
+    `root/packs`. Each blob is addressed by the SHA3-512 of its original
+    bytes (the same digest the events record), so identical files are
+    stored once, and a pack is named after the digests it holds. The index
+    maps the original path to its blob; restore() puts the exact bytes back
+    at that path, which keeps every vault and event reference valid.
+
+    Archiving is crash safe: a pack is fsynced and renamed into place
+    before the index commits, and originals are only deleted afterwards.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, base=BASE_DIR):
+        self.root = Path(root)
+        self.base = Path(base).resolve()
+        self.packs_dir = self.root / "packs"
+        self.index_path = self.root / "index.db"
+        self.packs_dir.mkdir(parents=True, exist_ok=True)
+        self._ensure_schema()
+
+    @classmethod
+    def open_existing(cls, root=DEFAULT_ROOT, base=BASE_DIR):
+        """The store at root, or None if nothing was ever archived there."""
+        if not (Path(root) / "index.db").exists():
+            return None
+        return cls(root, base)
+
+    def _connect(self):
+        return sqlite3.connect(self.index_path, timeout=30)
+
+    def _ensure_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    pack TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    size INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL REFERENCES blobs (digest),
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    mode INTEGER NOT NULL,
+                    archived_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.commit()
+
+    # -----------------------------
+    # Paths
+    # -----------------------------
+    def _key(self, path) -> str:
+        """Index key: path relative to base when inside it, absolute otherwise."""
+        resolved = Path(path).resolve()
+        try:
+            return resolved.relative_to(self.base).as_posix()
+        except ValueError:
+            return resolved.as_posix()
+
+    def _path(self, key: str) -> Path:
+        return Path(key) if os.path.isabs(key) else self.base / key
+
+    def _pack_path(self, pack: str) -> Path:
+        return self.packs_dir / f"{pack}.pack"
+
+    # -----------------------------
+    # Archive
+    # -----------------------------
+    def candidates(self, dirs: Iterable, older_than: float) -> list:
+        """Files under dirs not modified for older_than seconds, oldest first."""
+        cutoff = time.time() - older_than
+        found = []
+        for d in dirs:
+            for dirpath, _, filenames in os.walk(d):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if st.st_mtime < cutoff:
+                        found.append((st.st_mtime, path))
+        return [path for _, path in sorted(found)]
+
+    def archive_older_than(self, dirs: Iterable, older_than: float, dry_run: bool = False) -> dict:
+        """
+        Moves files older than the policy age into packs.
+        Returns counts: files, bytes (original) and stored (compressed, new blobs only).
+        """
+        paths = self.candidates(dirs, older_than)
+        stats = {"files": 0, "bytes": 0, "stored": 0}
+        if dry_run:
+            stats["files"] = len(paths)
+            stats["bytes"] = sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+            return stats
+
+        batch = []
+        for path in paths:
+            batch.append(path)
+            if len(batch) >= 10000:
+                self._archive_batch(batch, stats)
+                batch = []
+        if batch:
+            self._archive_batch(batch, stats)
+        return stats
+
+    def _archive_batch(self, paths: list, stats: dict):
+        writer = None
+        open_blobs = []  # blobs in the pack being written
+        new_blobs = []   # [digest, pack, offset, length, size]
+        new_files = []   # (path_key, digest, size, mtime, mode, archived_at, path, st)
+        seen = set()
+
+        def seal():
+            pack, _ = writer.close()
+            for blob in open_blobs:
+                blob[1] = pack
+            new_blobs.extend(open_blobs)
+            open_blobs.clear()
+
+        with self._connect() as conn:
+            try:
+                for path in paths:
+                    try:
+                        st = os.stat(path)
+                        f = open(path, "rb")
+                    except FileNotFoundError:
+                        continue
+                    if writer is None:
+                        writer = _PackWriter(self.packs_dir)
+                    with f:
+                        digest, offset, length = writer.add(f)
+                    exists = digest in seen or conn.execute(
+                        "SELECT 1 FROM blobs WHERE digest = ?", (digest,)
+                    ).fetchone()
+                    if exists:
+                        writer.discard(offset)
+                    else:
+                        seen.add(digest)
+                        open_blobs.append([digest, None, offset, length, st.st_size])
+                        stats["stored"] += length
+                    new_files.append((
+                        self._key(path), digest, st.st_size, st.st_mtime,
+                        st.st_mode & 0o777, time.time(), path, st,
+                    ))
+                    stats["bytes"] += st.st_size
+
+                    if writer.size >= PACK_TARGET_BYTES:
+                        seal()
+                        writer = None
+                if writer is not None:
+                    seal()
+                    writer = None
+            finally:
+                if writer is not None:
+                    writer.abort()
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR IGNORE INTO blobs (digest, pack, offset, length, size) VALUES (?, ?, ?, ?, ?)",
+                [tuple(b) for b in new_blobs],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO files (path, digest, size, mtime, mode, archived_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [f[:6] for f in new_files],
+            )
+
+        # Only now is it safe to drop the hot copies
+        changed = []
+        for key, _, _, _, _, _, path, st in new_files:
+            try:
+                now = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if (now.st_size, now.st_mtime_ns) != (st.st_size, st.st_mtime_ns):
+                # Rewritten while we were archiving: keep it hot
+                changed.append((key,))
+                continue
+            os.unlink(path)
+            stats["files"] += 1
+        if changed:
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM files WHERE path = ?", changed)
+
+    # -----------------------------
+    # Restore
+    # -----------------------------
+    def lookup(self, path) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("""
+                SELECT f.digest, f.size, f.mtime, f.mode, f.archived_at, b.pack, b.offset, b.length
+                FROM files f JOIN blobs b ON b.digest = f.digest
+                WHERE f.path = ?
+            """, (self._key(path),)).fetchone()
+        if not row:
+            return None
+        keys = ("digest", "size", "mtime", "mode", "archived_at", "pack", "offset", "length")
+        return dict(zip(keys, row))
+
+    def restore(self, path) -> Optional[Path]:
+        """
+        Puts an archived file back at its original path and returns it.
+        A file already present is returned as is; None if it was never archived.
+        The restored bytes are checked against the recorded digest. The file
+        gets a fresh mtime, so it stays hot for another retention period.
+        """
+        target = Path(path)
+        if target.exists():
+            return target
+        entry = self.lookup(target)
+        if entry is None:
+            return None
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".restore")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for data in self._read_blob(entry, target):
+                    out.write(data)
+            os.chmod(tmp, entry["mode"])
+            os.replace(tmp, target)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return target
+
+    def iter_archived(self, path) -> Optional[Iterator[bytes]]:
+        """
+        The original bytes of an archived file, decompressed chunk by chunk
+        without restoring it to disk; None if it was never archived. The
+        digest is checked when the last chunk has been read, and a mismatch
+        raises ValueError instead of ending the iteration normally.
+        """
+        entry = self.lookup(path)
+        if entry is None:
+            return None
+        return self._read_blob(entry, Path(path))
+
+    def _read_blob(self, entry: dict, target: Path) -> Iterator[bytes]:
+        h = hashlib.sha3_512()
+        decomp = zlib.decompressobj()
+        with open(self._pack_path(entry["pack"]), "rb") as pack:
+            pack.seek(entry["offset"])
+            remaining = entry["length"]
+            while remaining:
+                chunk = pack.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ValueError(f"Truncated archive pack {entry['pack']}")
+                remaining -= len(chunk)
+                # Bounded output per step: a highly compressible blob never
+                # expands into one huge buffer
+                data = decomp.decompress(chunk, CHUNK_SIZE)
+                while data:
+                    h.update(data)
+                    yield data
+                    data = decomp.decompress(decomp.unconsumed_tail, CHUNK_SIZE)
+            data = decomp.flush()
+            if data:
+                h.update(data)
+                yield data
+        if h.hexdigest() != entry["digest"]:
+            raise ValueError(f"Archived copy of {target} does not match its digest")
+
+    def archived_paths(self, missing_only: bool = False, prefix=None):
+        """
+        Original paths in the index; optionally only those not currently on
+        disk, or only those starting with `prefix` (a path, matched as text).
+        """
+        sql, params = "SELECT path FROM files", ()
+        if prefix is not None:
+            # Range on the primary key instead of LIKE, which would need escaping
+            key = self._key(prefix) + ("/" if str(prefix).endswith(("/", os.sep)) else "")
+            sql, params = sql + " WHERE path >= ? AND path < ?", (key, key + "\U0010ffff")
+        with self._connect() as conn:
+            keys = [key for (key,) in conn.execute(sql + " ORDER BY path", params)]
+        for key in keys:
+            path = self._path(key)
+            if not missing_only or not path.exists():
+                yield path
+
+    def restore_many(self, paths: Iterable) -> dict:
+        restored = missing = 0
+        for path in paths:
+            if self.restore(path) is None:
+                missing += 1
+            else:
+                restored += 1
+        return {"restored": restored, "missing": missing}
+
+    # -----------------------------
+    # Maintenance
+    # -----------------------------
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            files, original = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+            blobs, stored = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM blobs").fetchone()
+            packs = conn.execute("SELECT COUNT(DISTINCT pack) FROM blobs").fetchone()[0]
+        return {
+            "files": files,
+            "original_bytes": original,
+            "blobs": blobs,
+            "stored_bytes": stored,
+            "packs": packs,
+        }
+
+    def verify(self) -> dict:
+        """Decompresses every blob and checks it against its digest."""
+        checked = 0
+        failed = []
+        with self._connect() as conn:
+            rows = conn.execute("SELECT digest, pack, offset, length FROM blobs ORDER BY pack, offset").fetchall()
+        handles = {}
+        try:
+            for digest, pack, offset, length in rows:
+                f = handles.get(pack)
+                if f is None:
+                    try:
+                        f = handles[pack] = open(self._pack_path(pack), "rb")
+                    except FileNotFoundError:
+                        failed.append(digest)
+                        continue
+                f.seek(offset)
+                try:
+                    data = zlib.decompress(f.read(length))
+                except zlib.error:
+                    failed.append(digest)
+                    continue
+                if hashlib.sha3_512(data).hexdigest() != digest:
+                    failed.append(digest)
+                checked += 1
+        finally:
+            for f in handles.values():
+                f.close()
+        return {"ok": not failed, "checked": checked, "failed": failed}
+
+
+class _PackWriter:
+    """Appends independently compressed members to a pack being built."""
+
+    def __init__(self, packs_dir: Path):
+        self.packs_dir = packs_dir
+        fd, self.tmp = tempfile.mkstemp(dir=packs_dir, prefix=".pack-", suffix=".tmp")
+        self.f = os.fdopen(fd, "wb")
+        self.size = 0
+        self.digests = []
+
+    def add(self, src) -> tuple:
+        """Streams src into the pack. Returns (digest, offset, compressed_length)."""
+        offset = self.size
+        h = hashlib.sha3_512()
+        comp = zlib.compressobj(COMPRESSION_LEVEL)
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+            self.size += self.f.write(comp.compress(chunk))
+        self.size += self.f.write(comp.flush())
+        digest = h.hexdigest()
+        self.digests.append(digest)
+        return digest, offset, self.size - offset
+
+    def discard(self, offset: int):
+        """Drops the member just added (its content is already archived)."""
+        self.f.truncate(offset)
+        self.f.seek(offset)
+        self.size = offset
+        self.digests.pop()
+
+    def close(self) -> tuple:
+        """Durably publishes the pack. Returns (pack_name, digests)."""
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+        if not self.digests:
+            os.unlink(self.tmp)
+            return None, []
+        name = hashlib.sha3_256("".join(self.digests).encode()).hexdigest()
+        os.replace(self.tmp, self.packs_dir / f"{name}.pack")
+        dir_fd = os.open(self.packs_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        return name, self.digests
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp):
+            os.unlink(self.tmp)
@@ -3,10 +3,13 @@ import json
 import platform
 import uuid
 import hashlib
+from concurrent.futures import Future
 
 from core.crypto import generate_hash, sign_data
+from core.files import atomic_output
+from core.merkle import HASH_ALGORITHM, MerkleBuilder, canonical_row, inclusion_proof, verify_inclusion
 from core.vault_manager import VaultManager
-from reports.pdf_generator import generate_audit_report
+from core.vault_writer import VaultWriter
 
 
 REPORT_CANONICAL_FIELDS = [
@@ -23,8 +26,9 @@ REPORT_CANONICAL_FIELDS = [
 
 
 class AeternaEngine:
-    def __init__(self, session_id: str):
-        self.vault = VaultManager()
+    def __init__(self, session_id: str, writer: VaultWriter = None, vault: VaultManager = None):
+        self.writer = writer
+        self.vault = writer.vault if writer else (vault or VaultManager())
         self.session_id = session_id
 
         # Hardware fingerprint
@@ -38,27 +42,17 @@ class AeternaEngine:
             f"{self.session_id}{self.hw_id}".encode("utf-8")
         ).hexdigest()[:12]
 
-    def record_event(self, event_type: str, payload: dict, meta: dict = None):
+    def _prepare_event(self, event_type: str, payload: dict, meta: dict = None):
         """
-        Records an event into the cryptographically chained audit vault.
+        Serializes the event and returns a builder that seals it once the
+        previous hash is known.
         """
-        # ✅ CORRECCIÓN (Python 3.9 compatible)
-        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
-
         payload_str = json.dumps(
             payload,
             sort_keys=True,
             separators=(",", ":")
         )
 
-        previous_hash = self.vault.get_last_hash()
-
-        current_hash = generate_hash(
-            f"{self.session_id}{timestamp}{payload_str}{previous_hash}"
-        )
-
-        signature = sign_data(current_hash)
-
         metadata = meta.copy() if meta else {}
         metadata.update({
             "hw_id": self.hw_id,
@@ -68,16 +62,108 @@ class AeternaEngine:
 
         metadata_str = json.dumps(metadata, sort_keys=True)
 
-        self.vault.persist((
-            self.session_id,
-            timestamp,
-            event_type,
-            payload_str,
-            previous_hash,
-            current_hash,
-            signature,
-            metadata_str
-        ))
+        def build(previous_hash: str) -> tuple:
+            # ✅ CORRECCIÓN (Python 3.9 compatible)
+            # Stamped at sealing time so chain order and timestamps agree
+            timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+            current_hash = generate_hash(
+                f"{self.session_id}{timestamp}{payload_str}{previous_hash}"
+            )
+
+            signature = sign_data(current_hash)
+
+            return (
+                self.session_id,
+                timestamp,
+                event_type,
+                payload_str,
+                previous_hash,
+                current_hash,
+                signature,
+                metadata_str
+            )
+
+        return build
+
+    def record_event(self, event_type: str, payload: dict, meta: dict = None) -> str:
+        """
+        Records an event into the cryptographically chained audit vault.
+        Returns the sealed hash.
+        """
+        build = self._prepare_event(event_type, payload, meta)
+        if self.writer:
+            return self.writer.submit(build).result()
+        return self.vault.append_chained([build])[0]
+
+    def submit_event(self, event_type: str, payload: dict, meta: dict = None) -> Future:
+        """
+        Queues an event on the group-commit writer.
+        Returns a future resolving to the sealed hash.
+        """
+        if not self.writer:
+            raise RuntimeError("submit_event requires an AeternaEngine created with a VaultWriter")
+        return self.writer.submit(self._prepare_event(event_type, payload, meta))
+
+    def seal_dataset(
+        self,
+        rows,
+        is_flagged=None,
+        event_type: str = "FORENSIC_ENTRY",
+        meta: dict = None,
+        extra: dict = None,
+    ) -> dict:
+        """
+        Seals a whole dataset with one Merkle root instead of one event per row.
+
+        Rows are streamed once: each is hashed as a Merkle leaf over its
+        canonical JSON, and only rows for which is_flagged(row) is true are
+        kept. The vault gets a DATASET_ROOT event and one event per flagged
+        row (with its index, so its inclusion proof can be rebuilt later
+        with dataset_proof). All of them are committed in a single batch.
+        """
+        builder = MerkleBuilder()
+        flagged = []
+        for index, row in enumerate(rows):
+            builder.add(canonical_row(row))
+            if is_flagged is not None and is_flagged(row):
+                flagged.append((index, row))
+        root = builder.root().hex()
+
+        root_payload = dict(extra or {})
+        root_payload.update({
+            "merkle_root": root,
+            "leaf_count": builder.count,
+            "hash_algorithm": HASH_ALGORITHM,
+            "leaf_encoding": "canonical-json",
+            "flagged_count": len(flagged),
+        })
+        builds = [self._prepare_event("DATASET_ROOT", root_payload, meta)]
+        builds += [
+            self._prepare_event(event_type, {"merkle_root": root, "row_index": index, "record": row}, meta)
+            for index, row in flagged
+        ]
+
+        if self.writer:
+            hashes = [f.result() for f in [self.writer.submit(b) for b in builds]]
+        else:
+            hashes = self.vault.append_chained(builds)
+
+        return {
+            "merkle_root": root,
+            "leaf_count": builder.count,
+            "root_event_hash": hashes[0],
+            "flagged": [(index, h) for (index, _), h in zip(flagged, hashes[1:])],
+        }
+
+    @staticmethod
+    def dataset_proof(rows, index: int) -> dict:
+        """Inclusion proof of rows[index], recomputed by streaming the dataset."""
+        return inclusion_proof((canonical_row(row) for row in rows), index)
+
+    @staticmethod
+    def verify_row(row, proof: dict, merkle_root: str) -> bool:
+        return verify_inclusion(canonical_row(row), proof, merkle_root)
 
     def finalize_session(self, license_info: dict, scope_status: str) -> str:
         """
@@ -128,11 +214,15 @@ class AeternaEngine:
         )
 
         # ---- Persist verification payload (v1 contract) ----
+        # Temp file + rename: readers never see a half-written report
         json_path = output_path.replace(".pdf", ".json")
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(report_data, f, indent=2, sort_keys=True)
+        with atomic_output(json_path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(report_data, f, indent=2, sort_keys=True)
 
         # ---- Generate PDF ----
-        generate_audit_report(output_path, report_data)
+        from reports.pdf_generator import generate_audit_report
+        with atomic_output(output_path) as tmp_path:
+            generate_audit_report(str(tmp_path), report_data)
 
         return output_path
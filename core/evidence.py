@@ -0,0 +1,234 @@
+import glob
+import hashlib
+import json
+import time
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from core.archive import ArchiveStore
+from core.crypto import sign_data
+from core.export import stream_events
+from core.vault_manager import VaultManager
+
+BASE_DIR = Path(__file__).parent.parent
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = "aeterna-evidence/1"
+
+# Members whose bytes are already compressed: deflating them again costs CPU
+# for nothing, so they are stored as is
+STORED_SUFFIXES = {
+    ".pdf", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar",
+    ".parquet", ".docx", ".xlsx", ".pptx", ".odt", ".ods",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".mp3", ".mp4", ".m4a", ".mov", ".avi", ".mkv", ".webm",
+}
+
+# The client receives the archive in pieces of about this size
+CHUNK_SIZE = 1024 * 1024
+
+
+class Member(NamedTuple):
+    """
+    One file of the package. `chunks` is consumed only when the member is
+    written, so building the list opens nothing. A member without chunks is
+    listed in the manifest as missing.
+    """
+    name: str
+    chunks: Optional[Iterable[bytes]]
+    size: Optional[int] = None
+    mtime: Optional[float] = None
+    source: Optional[str] = None
+    recorded_sha3_512: Optional[str] = None
+
+
+class _Sink:
+    """
+    Write-only target for ZipFile. Having no tell()/seek(), it makes zipfile
+    use data descriptors and never go back to patch a header, so whatever
+    was written can be handed to the client right away.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self.pending = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self.pending += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        self.pending = 0
+        return data
+
+
+def _read_file(path: Path) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def file_member(name: str, path, archive: Optional[ArchiveStore] = None, recorded_sha3_512: str = None) -> Member:
+    """
+    The file at `path`, read from disk or, once archived, straight out of its
+    pack (nothing is restored to disk). Missing everywhere: chunks is None.
+    """
+    path = Path(path)
+    source = str(path)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        entry = archive.lookup(path) if archive is not None else None
+        if entry is None:
+            return Member(name, None, source=source, recorded_sha3_512=recorded_sha3_512)
+        return Member(name, archive.iter_archived(path), entry["size"], entry["mtime"], source, recorded_sha3_512)
+    return Member(name, _read_file(path), stat.st_size, stat.st_mtime, source, recorded_sha3_512)
+
+
+def _zip_info(member: Member) -> zipfile.ZipInfo:
+    stamp = time.localtime(member.mtime) if member.mtime else time.localtime()
+    # ZIP dates start in 1980
+    info = zipfile.ZipInfo(member.name, max(stamp[:6], (1980, 1, 1, 0, 0, 0)))
+    info.external_attr = 0o644 << 16
+    info.compress_type = (
+        zipfile.ZIP_STORED if Path(member.name).suffix.lower() in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+    )
+    if member.size is not None:
+        # Lets zipfile pick ZIP64 headers up front for members over 4 GiB
+        info.file_size = member.size
+    return info
+
+
+def stream_package(members: Iterable[Member], case: dict = None) -> Iterator[bytes]:
+    """
+    Streams a ZIP with `members` followed by manifest.json, as byte chunks.
+
+    Each member is read, hashed and compressed in one pass while the
+    archive is being sent: nothing is staged on disk and memory stays at
+    about CHUNK_SIZE whatever the member sizes. The manifest comes last
+    because it records the SHA3-512 and size of what was actually written,
+    and flags members whose bytes no longer match the digest on record.
+    """
+    sink = _Sink()
+    listed, missing = [], []
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for member in members:
+            if member.chunks is None:
+                missing.append({"name": member.name, "source": member.source})
+                continue
+            info = _zip_info(member)
+            h = hashlib.sha3_512()
+            size = 0
+            # Generated members have no size up front; force ZIP64 so they may grow past 4 GiB
+            with zf.open(info, "w", force_zip64=member.size is None) as dest:
+                for chunk in member.chunks:
+                    h.update(chunk)
+                    size += len(chunk)
+                    dest.write(chunk)
+                    if sink.pending >= CHUNK_SIZE:
+                        yield sink.drain()
+            entry = {
+                "name": member.name,
+                "size": size,
+                "sha3_512": h.hexdigest(),
+                "compression": "stored" if info.compress_type == zipfile.ZIP_STORED else "deflated",
+            }
+            if member.source:
+                entry["source"] = member.source
+            if member.recorded_sha3_512:
+                entry["recorded_sha3_512"] = member.recorded_sha3_512
+                entry["matches_recorded"] = entry["sha3_512"] == member.recorded_sha3_512
+            listed.append(entry)
+            yield sink.drain()
+
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "case": case or {},
+            "hash_algorithm": "SHA3-512",
+            "members": listed,
+            "missing": missing,
+        }
+        # Same contract as the reports: hash of the canonical JSON, then its HMAC
+        manifest_hash = hashlib.sha3_512(
+            json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        ).hexdigest()
+        manifest["manifest_hash"] = manifest_hash
+        manifest["manifest_signature"] = sign_data(manifest_hash)
+        zf.writestr(_zip_info(Member(MANIFEST_NAME, None)), json.dumps(manifest, indent=2, sort_keys=True))
+    yield sink.drain()
+
+
+# -----------------------------
+# Case contents
+# -----------------------------
+def case_members(
+    case_id: str,
+    vault: VaultManager,
+    base=BASE_DIR,
+    archive: Optional[ArchiveStore] = None,
+    event: dict = None,
+    certificate=None,
+) -> list:
+    """
+    Everything held about one case, as package members (contents lazy).
+
+    `event` is the web record with that id, if any: its certificate, the
+    ingested file (checked against the recorded hash) and the record itself.
+    `certificate` overrides where the certificate is read from. Vault events
+    whose session_id is case_id bring their rows as NDJSON, every report
+    finalize_session wrote for the session (PDF and companion JSON) and the
+    source files connectors recorded a digest for. Empty when the id is
+    unknown.
+    """
+    base = Path(base).resolve()
+    reports_dir = base / "vault" / "reports"
+    members = []
+
+    if event is not None:
+        members.append(file_member(
+            f"certificate/integrity_reference_{case_id}.pdf",
+            certificate or reports_dir / f"integrity_reference_{case_id}.pdf",
+            archive,
+        ))
+        members.append(file_member(
+            f"evidence/{event['file']}",
+            base / "vault" / "ingest" / f"{case_id}_{event['file']}",
+            archive,
+            recorded_sha3_512=event["hash"],
+        ))
+        record = json.dumps(event, indent=2, sort_keys=True).encode("utf-8")
+        members.append(Member("event.json", [record], len(record)))
+
+    if next(vault.iter_events(case_id, 0, 1), None) is not None:
+        members.append(Member("vault/events.ndjson", stream_events(vault, "ndjson", session_id=case_id)))
+
+        prefix = f"audit_{case_id}_"
+        reports = {p for p in reports_dir.glob(glob.escape(prefix) + "*") if p.suffix in (".pdf", ".json")}
+        if archive is not None:
+            reports.update(p for p in archive.archived_paths(prefix=reports_dir / prefix) if p.suffix in (".pdf", ".json"))
+        # Several finalizations of one session: each report next to its JSON
+        for path in sorted(reports, key=lambda p: p.name):
+            members.append(file_member(f"reports/{path.name}", path, archive))
+
+        seen = set()
+        for context in vault.session_contexts(case_id):
+            target, digest = context.get("target"), context.get("source_sha3_512")
+            if not target or not digest or (target, digest) in seen:
+                continue
+            seen.add((target, digest))
+            name = f"sources/{len(seen)}_{Path(target).name}"
+            members.append(file_member(name, target, archive, recorded_sha3_512=digest))
+
+    return members
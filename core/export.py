@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+from typing import Iterable, Iterator, Optional
+
+from core.files import atomic_output
+from core.vault_manager import VaultManager
+
+EXPORT_COLUMNS = (
+    "id",
+    "session_id",
+    "timestamp",
+    "event_type",
+    "payload",
+    "prev_hash",
+    "curr_hash",
+    "signature",
+    "metadata",
+)
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+# Rows per output chunk: one vault page becomes one write to the client
+DEFAULT_PAGE_SIZE = 500
+
+
+def _ndjson_line(event: tuple) -> str:
+    # payload and metadata stay the exact strings the chain hashed and signed
+    # (not re-serialized objects), so curr_hash and signature can be
+    # recomputed from the export; CSV carries the same text
+    return json.dumps(dict(zip(EXPORT_COLUMNS, event)), ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _chunks(events: Iterable[tuple], rows_per_chunk: int, fmt: str) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for event in events:
+        if writer is None:
+            buffer.write(_ndjson_line(event))
+        else:
+            writer.writerow(event)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_events(
+    vault: VaultManager,
+    fmt: str = "ndjson",
+    session_id: Optional[str] = None,
+    after_id: int = 0,
+    limit: Optional[int] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> Iterator[bytes]:
+    """
+    Vault events as NDJSON or CSV byte chunks, one vault page at a time.
+
+    Every row carries its id; passing the last id received as after_id
+    resumes the export where it stopped. The generator only reads the next
+    page when the consumer asks for more, so a slow client slows the reads
+    instead of growing a buffer.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r} (expected one of {sorted(EXPORT_FORMATS)})")
+    if limit is not None:
+        page_size = max(1, min(page_size, limit))
+    events = vault.iter_events(session_id, after_id, page_size)
+    if limit is not None:
+        events = (event for i, event in zip(range(limit), events))
+    return _chunks(events, page_size, fmt)
+
+
+def export_events(vault: VaultManager, path: str, fmt: str = "ndjson", **kwargs) -> int:
+    """Writes stream_events() to a file; returns the bytes written."""
+    written = 0
+    with atomic_output(path) as tmp_path, open(tmp_path, "wb") as f:
+        for chunk in stream_events(vault, fmt, **kwargs):
+            f.write(chunk)
+            written += len(chunk)
+    return written
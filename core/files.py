@@ -0,0 +1,59 @@
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only cover threads of this process
+    fcntl = None
+
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Exclusive lock shared by every thread and process on this host.
+
+    Uses flock() on `path` (created if missing). Each call opens its own
+    descriptor, so threads of one process exclude each other too. The lock
+    is released when the process dies, so a crashed holder never wedges
+    the others.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        with _local_locks_guard:
+            lock = _local_locks.setdefault(str(path), threading.Lock())
+        with lock:
+            yield
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_output(path):
+    """
+    Yields a temporary path next to `path`; on success the file is fsynced
+    and renamed over `path`, so readers see either nothing or the whole
+    file. On error the temporary file is removed.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        yield tmp
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
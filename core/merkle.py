@@ -0,0 +1,143 @@
+import hashlib
+import json
+from typing import Iterable, List, Optional, Tuple
+
+# Domain separation (RFC 6962): a leaf can never be mistaken for a node
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+HASH_ALGORITHM = "SHA3-512"
+
+
+def canonical_row(row) -> bytes:
+    """Same canonical JSON the engine uses for event payloads."""
+    return json.dumps(row, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def leaf_hash(data: bytes) -> bytes:
+    return hashlib.sha3_512(LEAF_PREFIX + data).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha3_512(NODE_PREFIX + left + right).digest()
+
+
+class MerkleBuilder:
+    """
+    Streaming Merkle root over an ordered sequence of leaves.
+
+    Keeps one pending subtree per level (O(log n) memory): equal-height
+    subtrees are merged as leaves arrive, and the remaining ones are folded
+    right to left at the end. The result matches the RFC 6962 tree for any
+    leaf count. With `track` set, the audit path of that leaf is collected
+    during the same pass.
+    """
+
+    def __init__(self, track: Optional[int] = None):
+        self.count = 0
+        self.track = track
+        self.path = []        # audit path of completed subtrees
+        self.tracked_leaf = None
+        self._stack = []      # [(height, hash, contains_tracked)]
+
+    def add(self, data: bytes):
+        self.add_leaf_hash(leaf_hash(data))
+
+    def add_leaf_hash(self, digest: bytes):
+        tracked = self.count == self.track
+        if tracked:
+            self.tracked_leaf = digest
+        self._stack.append((0, digest, tracked))
+        self.count += 1
+        while len(self._stack) > 1 and self._stack[-1][0] == self._stack[-2][0]:
+            right = self._stack.pop()
+            left = self._stack.pop()
+            self._stack.append(self._merge(left, right, self.path))
+
+    @staticmethod
+    def _merge(left, right, path) -> tuple:
+        if left[2]:
+            path.append(("R", right[1]))
+        elif right[2]:
+            path.append(("L", left[1]))
+        return left[0] + 1, node_hash(left[1], right[1]), left[2] or right[2]
+
+    def _fold(self) -> tuple:
+        """(root, path) without consuming the pending subtrees."""
+        path = list(self.path)
+        if not self._stack:
+            return hashlib.sha3_512(b"").digest(), path
+        right = self._stack[-1]
+        for left in reversed(self._stack[:-1]):
+            right = self._merge(left, right, path)
+        return right[1], path
+
+    def root(self) -> bytes:
+        return self._fold()[0]
+
+    def proof(self) -> List[Tuple[str, bytes]]:
+        """Audit path of the tracked leaf, bottom-up; side is where the sibling sits."""
+        return self._fold()[1]
+
+
+def merkle_root(leaves: Iterable[bytes]) -> Tuple[bytes, int]:
+    """(root, leaf_count) of already-encoded leaves, in one streaming pass."""
+    builder = MerkleBuilder()
+    for data in leaves:
+        builder.add(data)
+    return builder.root(), builder.count
+
+
+def inclusion_proof(leaves: Iterable[bytes], index: int) -> dict:
+    """
+    Recomputes the proof for one leaf by streaming the dataset again;
+    nothing per row needs to be stored.
+    """
+    builder = MerkleBuilder(track=index)
+    for data in leaves:
+        builder.add(data)
+    if index < 0 or index >= builder.count:
+        raise IndexError(f"Leaf {index} out of range (dataset has {builder.count} rows)")
+    root, path = builder._fold()
+    return {
+        "index": index,
+        "leaf_count": builder.count,
+        "leaf_hash": builder.tracked_leaf.hex(),
+        "path": [{"side": side, "hash": sibling.hex()} for side, sibling in path],
+        "merkle_root": root.hex(),
+        "hash_algorithm": HASH_ALGORITHM,
+    }
+
+
+def audit_paths(leaf_hashes: List[bytes]) -> Tuple[bytes, List[List[Tuple[str, bytes]]]]:
+    """
+    (root, paths) for a batch held in memory: the audit path of every leaf
+    in one O(n log n) pass, instead of one streaming pass per leaf.
+    """
+    if not leaf_hashes:
+        return hashlib.sha3_512(b"").digest(), []
+    paths = [[] for _ in leaf_hashes]
+
+    def subtree(lo, hi):
+        if hi - lo == 1:
+            return leaf_hashes[lo]
+        # RFC 6962 split: the left subtree holds the largest power of two < n
+        mid = lo + (1 << ((hi - lo - 1).bit_length() - 1))
+        left = subtree(lo, mid)
+        right = subtree(mid, hi)
+        for i in range(lo, mid):
+            paths[i].append(("R", right))
+        for i in range(mid, hi):
+            paths[i].append(("L", left))
+        return node_hash(left, right)
+
+    return subtree(0, len(leaf_hashes)), paths
+
+
+def verify_inclusion(data: bytes, proof: dict, root_hex: str) -> bool:
+    digest = leaf_hash(data)
+    if digest.hex() != proof["leaf_hash"]:
+        return False
+    for step in proof["path"]:
+        sibling = bytes.fromhex(step["hash"])
+        digest = node_hash(digest, sibling) if step["side"] == "R" else node_hash(sibling, digest)
+    return digest.hex() == root_hex
@@ -0,0 +1,200 @@
+import datetime
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+from core.crypto import generate_hash, sign_data
+from core.vault_manager import GENESIS_HASH, VaultManager
+from core.vault_writer import VaultWriter
+
+logger = logging.getLogger("aeterna.shards")
+
+TENANT_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,127}$")
+
+
+class ShardedVault:
+    """
+    One chain and one SQLite file per tenant (or session namespace).
+
+    Shards are written independently, so writers for different customers
+    never contend on the same head. A small global anchor chain periodically
+    commits every shard's head hash, which ties the shards together without
+    putting the global chain on the write path.
+    """
+
+    def __init__(self, root: str = "vault/shards", anchor_db: str = "vault/anchor_chain.db"):
+        self.root = root
+        self.anchor_db = anchor_db
+        self._vaults = {}
+        self._writers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._anchor_thread = None
+        os.makedirs(self.root, exist_ok=True)
+        self._ensure_anchor_schema()
+
+    # -----------------------------
+    # Shards
+    # -----------------------------
+    def shard_path(self, tenant: str) -> str:
+        if not TENANT_RE.match(tenant or ""):
+            raise ValueError(f"Invalid tenant name: {tenant!r}")
+        return os.path.join(self.root, f"{tenant}.db")
+
+    def vault_for(self, tenant: str) -> VaultManager:
+        path = self.shard_path(tenant)
+        with self._lock:
+            vault = self._vaults.get(tenant)
+            if vault is None:
+                vault = self._vaults[tenant] = VaultManager(path)
+            return vault
+
+    def writer_for(self, tenant: str) -> VaultWriter:
+        """Group-commit writer dedicated to one shard."""
+        vault = self.vault_for(tenant)
+        with self._lock:
+            writer = self._writers.get(tenant)
+            if writer is None:
+                writer = self._writers[tenant] = VaultWriter(vault).start()
+            return writer
+
+    def tenants(self) -> list:
+        return sorted(
+            name[:-3]
+            for name in os.listdir(self.root)
+            if name.endswith(".db") and TENANT_RE.match(name[:-3])
+        )
+
+    def verify_shard(self, tenant: str) -> dict:
+        """Verifies a single customer's chain without touching other shards."""
+        if not os.path.exists(self.shard_path(tenant)):
+            raise KeyError(f"Unknown tenant: {tenant}")
+        return self.vault_for(tenant).verify_chain()
+
+    # -----------------------------
+    # Global anchor chain
+    # -----------------------------
+    def _connect_anchor(self):
+        return sqlite3.connect(self.anchor_db, timeout=30)
+
+    def _ensure_anchor_schema(self):
+        os.makedirs(os.path.dirname(self.anchor_db) or ".", exist_ok=True)
+        with self._connect_anchor() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS anchor_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    shard TEXT NOT NULL,
+                    shard_height INTEGER NOT NULL,
+                    shard_head TEXT NOT NULL,
+                    prev_hash TEXT NOT NULL,
+                    curr_hash TEXT NOT NULL,
+                    signature TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_anchor_shard
+                ON anchor_log (shard, id)
+            """)
+            conn.commit()
+
+    def anchor(self) -> int:
+        """
+        Commits the head of every shard that moved since its last anchor.
+        Returns the number of anchor records written.
+        """
+        with self._connect_anchor() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Heads are read under the anchor lock: a concurrent anchor() that
+            # saw older heads cannot commit them after newer ones
+            heads = [(tenant,) + self.vault_for(tenant).get_head() for tenant in self.tenants()]
+            row = conn.execute(
+                "SELECT curr_hash FROM anchor_log ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+            prev_hash = row[0] if row else GENESIS_HASH
+            last = {
+                shard: (height, head)
+                for shard, height, head in conn.execute("""
+                    SELECT shard, shard_height, shard_head FROM anchor_log
+                    WHERE id IN (SELECT MAX(id) FROM anchor_log GROUP BY shard)
+                """)
+            }
+
+            written = 0
+            for tenant, height, head in heads:
+                last_height, last_head = last.get(tenant, (0, None))
+                # Never anchor a shard at or below its last anchored height
+                if height == 0 or height <= last_height or head == last_head:
+                    continue
+                timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+                curr_hash = generate_hash(f"{timestamp}{tenant}{height}{head}{prev_hash}")
+                conn.execute("""
+                    INSERT INTO anchor_log (
+                        timestamp, shard, shard_height, shard_head,
+                        prev_hash, curr_hash, signature
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (timestamp, tenant, height, head, prev_hash, curr_hash, sign_data(curr_hash)))
+                prev_hash = curr_hash
+                written += 1
+        return written
+
+    def verify_anchors(self, tenant: str = None) -> dict:
+        """
+        Verifies the anchor chain. With a tenant, also checks that every head
+        anchored for it is still present in that shard at the anchored height.
+        """
+        expected_prev = GENESIS_HASH
+        checked = 0
+        shard = self.vault_for(tenant) if tenant is not None else None
+        with self._connect_anchor() as conn:
+            cur = conn.execute("""
+                SELECT id, timestamp, shard, shard_height, shard_head,
+                       prev_hash, curr_hash, signature
+                FROM anchor_log ORDER BY id ASC
+            """)
+            for row_id, ts, name, height, head, prev_hash, curr_hash, signature in cur:
+                recalculated = generate_hash(f"{ts}{name}{height}{head}{prev_hash}")
+                if (
+                    prev_hash != expected_prev
+                    or curr_hash != recalculated
+                    or signature != sign_data(recalculated)
+                ):
+                    return {"ok": False, "checked": checked, "failed_id": row_id}
+                if shard is not None and name == tenant and shard.get_hash_at(height) != head:
+                    return {"ok": False, "checked": checked, "failed_id": row_id}
+                expected_prev = curr_hash
+                checked += 1
+        return {"ok": True, "checked": checked, "failed_id": None}
+
+    def start_anchoring(self, interval: float = 60.0):
+        """Anchors shard heads every `interval` seconds on a background thread."""
+        if self._anchor_thread is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                # A failed round (busy database, disk error) is retried at the
+                # next interval instead of ending the thread
+                try:
+                    self.anchor()
+                except Exception:
+                    logger.exception("Shard anchoring failed; retrying in %gs", interval)
+
+        self._stop.clear()
+        self._anchor_thread = threading.Thread(target=loop, name="aeterna-anchor", daemon=True)
+        self._anchor_thread.start()
+
+    def close(self):
+        """Stops anchoring, drains shard writers and writes a final anchor."""
+        self._stop.set()
+        if self._anchor_thread is not None:
+            self._anchor_thread.join()
+            self._anchor_thread = None
+        with self._lock:
+            writers = list(self._writers.values())
+            self._writers.clear()
+        for writer in writers:
+            writer.close()
+        self.anchor()
@@ -0,0 +1,395 @@
+"""
+Minimal RFC 3161 Time-Stamp Protocol: request encoding, response parsing
+and a pooled HTTP client.
+
+Only the DER needed for TimeStampReq / TimeStampResp / TSTInfo is
+implemented. The CMS signature on a token is not checked here (that needs
+the TSA certificate chain and an X.509 stack); the raw token is kept so it
+can be verified with `openssl ts -verify -token_in`. What is checked is
+that the token stamps the digest we sent, with our nonce.
+"""
+import asyncio
+import hashlib
+import http.client
+import queue
+import random
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import urlsplit
+
+HASH_OIDS = {
+    "sha256": "2.16.840.1.101.3.4.2.1",
+    "sha512": "2.16.840.1.101.3.4.2.3",
+    "sha3_512": "2.16.840.1.101.3.4.2.10",
+}
+OID_HASHES = {oid: name for name, oid in HASH_OIDS.items()}
+OID_SIGNED_DATA = "1.2.840.113549.1.7.2"
+OID_TST_INFO = "1.2.840.113549.1.9.16.1.4"
+
+# PKIStatus values that carry a token
+STATUS_GRANTED = 0
+STATUS_GRANTED_WITH_MODS = 1
+STATUS_NAMES = {0: "granted", 1: "grantedWithMods", 2: "rejection", 3: "waiting",
+                4: "revocationWarning", 5: "revocationNotification"}
+
+TAG_BOOLEAN = 0x01
+TAG_INTEGER = 0x02
+TAG_OCTET_STRING = 0x04
+TAG_NULL = 0x05
+TAG_OID = 0x06
+TAG_UTF8_STRING = 0x0C
+TAG_GENERALIZED_TIME = 0x18
+TAG_SEQUENCE = 0x30
+TAG_SET = 0x31
+TAG_CONTEXT_0 = 0xA0
+
+CONTENT_TYPE_QUERY = "application/timestamp-query"
+CONTENT_TYPE_REPLY = "application/timestamp-reply"
+
+
+class TSAError(Exception):
+    """The TSA refused the request or answered with something unusable."""
+
+
+class _Retryable(Exception):
+    pass
+
+
+# -----------------------------
+# DER encoding
+# -----------------------------
+def _length(n: int) -> bytes:
+    if n < 0x80:
+        return bytes([n])
+    body = n.to_bytes((n.bit_length() + 7) // 8, "big")
+    return bytes([0x80 | len(body)]) + body
+
+
+def tlv(tag: int, content: bytes) -> bytes:
+    return bytes([tag]) + _length(len(content)) + content
+
+
+def der_integer(value: int) -> bytes:
+    size = max(1, (value.bit_length() + 8) // 8)
+    return tlv(TAG_INTEGER, value.to_bytes(size, "big", signed=True))
+
+
+def der_oid(dotted: str) -> bytes:
+    arcs = [int(a) for a in dotted.split(".")]
+    body = bytearray([40 * arcs[0] + arcs[1]])
+    for arc in arcs[2:]:
+        chunk = [arc & 0x7F]
+        arc >>= 7
+        while arc:
+            chunk.append(0x80 | (arc & 0x7F))
+            arc >>= 7
+        body.extend(reversed(chunk))
+    return tlv(TAG_OID, bytes(body))
+
+
+def der_octets(data: bytes) -> bytes:
+    return tlv(TAG_OCTET_STRING, data)
+
+
+def der_bool(value: bool) -> bytes:
+    return tlv(TAG_BOOLEAN, b"\xff" if value else b"\x00")
+
+
+def der_sequence(*items: bytes) -> bytes:
+    return tlv(TAG_SEQUENCE, b"".join(items))
+
+
+def der_set(*items: bytes) -> bytes:
+    return tlv(TAG_SET, b"".join(sorted(items)))
+
+
+def der_generalized_time(when: datetime) -> bytes:
+    when = when.astimezone(timezone.utc)
+    text = when.strftime("%Y%m%d%H%M%S")
+    if when.microsecond:
+        text += (".%06d" % when.microsecond).rstrip("0")
+    return tlv(TAG_GENERALIZED_TIME, (text + "Z").encode("ascii"))
+
+
+def algorithm_identifier(hash_name: str) -> bytes:
+    # SHA-3 takes no parameters (RFC 8702); the SHA-2 ones conventionally carry NULL
+    if hash_name.startswith("sha3"):
+        return der_sequence(der_oid(HASH_OIDS[hash_name]))
+    return der_sequence(der_oid(HASH_OIDS[hash_name]), tlv(TAG_NULL, b""))
+
+
+# -----------------------------
+# DER decoding
+# -----------------------------
+def read_tlv(data: bytes, offset: int = 0) -> tuple:
+    """(tag, content, next_offset) of the element at offset."""
+    try:
+        tag = data[offset]
+        first = data[offset + 1]
+        offset += 2
+        if first & 0x80:
+            size = first & 0x7F
+            if not size or size > 4:
+                raise TSAError("Unsupported DER length")
+            length = int.from_bytes(data[offset:offset + size], "big")
+            offset += size
+        else:
+            length = first
+    except IndexError:
+        raise TSAError("Truncated DER") from None
+    end = offset + length
+    if end > len(data):
+        raise TSAError("Truncated DER")
+    return tag, data[offset:end], end
+
+
+def children(content: bytes) -> list:
+    """[(tag, content)] of a constructed element's content."""
+    items = []
+    offset = 0
+    while offset < len(content):
+        tag, value, offset = read_tlv(content, offset)
+        items.append((tag, value))
+    return items
+
+
+def _expect(item: tuple, tag: int, what: str) -> bytes:
+    if item[0] != tag:
+        raise TSAError(f"Malformed {what}: tag 0x{item[0]:02x}, expected 0x{tag:02x}")
+    return item[1]
+
+
+def decode_integer(content: bytes) -> int:
+    return int.from_bytes(content, "big", signed=True)
+
+
+def decode_oid(content: bytes) -> str:
+    arcs = []
+    value = 0
+    for byte in content:
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            arcs.append(value)
+            value = 0
+    first = min(arcs[0] // 40, 2)
+    return ".".join(str(a) for a in [first, arcs[0] - 40 * first] + arcs[1:])
+
+
+def decode_generalized_time(content: bytes) -> str:
+    text = content.decode("ascii").rstrip("Z")
+    main, _, frac = text.partition(".")
+    when = datetime.strptime(main, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+    if frac:
+        when = when.replace(microsecond=int(frac[:6].ljust(6, "0")))
+    return when.isoformat()
+
+
+# -----------------------------
+# Time-Stamp Protocol messages
+# -----------------------------
+def message_imprint(digest: bytes, hash_name: str) -> bytes:
+    return der_sequence(algorithm_identifier(hash_name), der_octets(digest))
+
+
+def build_request(digest: bytes, hash_name: str = "sha3_512", nonce: Optional[int] = None,
+                  policy: Optional[str] = None, cert_req: bool = True) -> tuple:
+    """(DER TimeStampReq, nonce) for a digest already computed with hash_name."""
+    if hash_name not in HASH_OIDS:
+        raise ValueError(f"Unsupported hash for RFC 3161: {hash_name!r}")
+    if len(digest) != hashlib.new(hash_name).digest_size:
+        raise ValueError(f"Digest length does not match {hash_name}")
+    nonce = secrets.randbits(64) if nonce is None else nonce
+    fields = [der_integer(1), message_imprint(digest, hash_name)]
+    if policy:
+        fields.append(der_oid(policy))
+    fields.append(der_integer(nonce))
+    if cert_req:
+        fields.append(der_bool(True))
+    return der_sequence(*fields), nonce
+
+
+def parse_request(data: bytes) -> dict:
+    """Fields of a TimeStampReq (used by the local stand-in TSA)."""
+    tag, content, _ = read_tlv(data)
+    items = children(_expect((tag, content), TAG_SEQUENCE, "TimeStampReq"))
+    imprint = children(_expect(items[1], TAG_SEQUENCE, "MessageImprint"))
+    algorithm = children(_expect(imprint[0], TAG_SEQUENCE, "AlgorithmIdentifier"))
+    request = {
+        "version": decode_integer(_expect(items[0], TAG_INTEGER, "version")),
+        "hash_oid": decode_oid(_expect(algorithm[0], TAG_OID, "hash OID")),
+        "digest": _expect(imprint[1], TAG_OCTET_STRING, "hashedMessage"),
+        "policy": None,
+        "nonce": None,
+        "cert_req": False,
+    }
+    for tag, value in items[2:]:
+        if tag == TAG_OID:
+            request["policy"] = decode_oid(value)
+        elif tag == TAG_INTEGER:
+            request["nonce"] = decode_integer(value)
+        elif tag == TAG_BOOLEAN:
+            request["cert_req"] = value != b"\x00"
+    return request
+
+
+def _signed_data(token: bytes) -> list:
+    tag, content, _ = read_tlv(token)
+    info = children(_expect((tag, content), TAG_SEQUENCE, "ContentInfo"))
+    if decode_oid(_expect(info[0], TAG_OID, "contentType")) != OID_SIGNED_DATA:
+        raise TSAError("Token is not CMS SignedData")
+    tag, content, _ = read_tlv(_expect(info[1], TAG_CONTEXT_0, "content"))
+    return children(_expect((tag, content), TAG_SEQUENCE, "SignedData"))
+
+
+def parse_token(token: bytes) -> dict:
+    """The TSTInfo inside a TimeStampToken."""
+    signed = _signed_data(token)
+    encap = children(_expect(signed[2], TAG_SEQUENCE, "EncapsulatedContentInfo"))
+    if decode_oid(_expect(encap[0], TAG_OID, "eContentType")) != OID_TST_INFO:
+        raise TSAError("Token does not carry a TSTInfo")
+    tag, octets, _ = read_tlv(_expect(encap[1], TAG_CONTEXT_0, "eContent"))
+    tag, tst, _ = read_tlv(_expect((tag, octets), TAG_OCTET_STRING, "eContent"))
+    items = children(_expect((tag, tst), TAG_SEQUENCE, "TSTInfo"))
+
+    imprint = children(_expect(items[2], TAG_SEQUENCE, "MessageImprint"))
+    algorithm = children(_expect(imprint[0], TAG_SEQUENCE, "AlgorithmIdentifier"))
+    info = {
+        "version": decode_integer(_expect(items[0], TAG_INTEGER, "version")),
+        "policy": decode_oid(_expect(items[1], TAG_OID, "policy")),
+        "hash_oid": decode_oid(_expect(algorithm[0], TAG_OID, "hash OID")),
+        "digest": _expect(imprint[1], TAG_OCTET_STRING, "hashedMessage"),
+        "serial": decode_integer(_expect(items[3], TAG_INTEGER, "serialNumber")),
+        "gen_time": decode_generalized_time(_expect(items[4], TAG_GENERALIZED_TIME, "genTime")),
+        "nonce": None,
+    }
+    for tag, value in items[5:]:
+        if tag == TAG_INTEGER:
+            info["nonce"] = decode_integer(value)
+    info["hash_name"] = OID_HASHES.get(info["hash_oid"])
+    return info
+
+
+def parse_response(data: bytes, digest: bytes, nonce: Optional[int]) -> dict:
+    """
+    Checks a TimeStampResp against the request that produced it and returns
+    the token with its TSTInfo fields. Raises TSAError otherwise.
+    """
+    tag, content, _ = read_tlv(data)
+    items = children(_expect((tag, content), TAG_SEQUENCE, "TimeStampResp"))
+    status_info = children(_expect(items[0], TAG_SEQUENCE, "PKIStatusInfo"))
+    status = decode_integer(_expect(status_info[0], TAG_INTEGER, "status"))
+    if status not in (STATUS_GRANTED, STATUS_GRANTED_WITH_MODS):
+        detail = ""
+        if len(status_info) > 1 and status_info[1][0] == TAG_SEQUENCE:
+            texts = [v.decode("utf-8", "replace") for t, v in children(status_info[1][1])]
+            detail = ": " + "; ".join(texts)
+        raise TSAError(f"TSA answered {STATUS_NAMES.get(status, status)}{detail}")
+    if len(items) < 2:
+        raise TSAError("Granted response without a token")
+
+    token = tlv(*items[1])
+    info = parse_token(token)
+    if info["digest"] != digest:
+        raise TSAError("Token stamps a different digest")
+    if nonce is not None and info["nonce"] != nonce:
+        raise TSAError("Token nonce does not match the request")
+    info["status"] = STATUS_NAMES[status]
+    info["token"] = token
+    return info
+
+
+# -----------------------------
+# Client
+# -----------------------------
+class TSAClient:
+    """
+    HTTP client for one TSA.
+
+    Keeps up to pool_size keep-alive connections and reuses them across
+    requests and threads. Connection errors, 5xx and 429 are retried with
+    exponential backoff and jitter; a TSA rejection is not. atimestamp()
+    runs the same request on a worker thread so it can be awaited.
+    """
+
+    def __init__(self, url: str, hash_name: str = "sha3_512", policy: Optional[str] = None,
+                 pool_size: int = 4, retries: int = 3, backoff: float = 0.5, timeout: float = 10.0):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"TSA URL must be http(s): {url!r}")
+        if hash_name not in HASH_OIDS:
+            raise ValueError(f"Unsupported hash for RFC 3161: {hash_name!r}")
+        self.url = url
+        self.hash_name = hash_name
+        self.policy = policy
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._scheme = parts.scheme
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _new_connection(self):
+        cls = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+        return cls(self._host, self._port, timeout=self.timeout)
+
+    def _post(self, body: bytes) -> bytes:
+        with self._slots:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = self._new_connection()
+            try:
+                conn.request("POST", self._path, body, {
+                    "Content-Type": CONTENT_TYPE_QUERY,
+                    "Accept": CONTENT_TYPE_REPLY,
+                })
+                response = conn.getresponse()
+                data = response.read()
+            except BaseException:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._pool.put_nowait(conn)
+        if response.status == 429 or response.status >= 500:
+            raise _Retryable(f"TSA HTTP {response.status}")
+        if response.status != 200:
+            raise TSAError(f"TSA HTTP {response.status}: {data[:200]!r}")
+        return data
+
+    def timestamp(self, digest: bytes) -> dict:
+        """Token for a digest computed with self.hash_name; see parse_response."""
+        request, nonce = build_request(digest, self.hash_name, policy=self.policy)
+        attempt = 0
+        while True:
+            try:
+                return parse_response(self._post(request), digest, nonce)
+            except (_Retryable, OSError, http.client.HTTPException) as e:
+                if attempt >= self.retries:
+                    raise TSAError(f"TSA unreachable after {attempt + 1} attempts: {e}") from e
+                delay = self.backoff * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay / 2))
+                attempt += 1
+
+    async def atimestamp(self, digest: bytes) -> dict:
+        return await asyncio.to_thread(self.timestamp, digest)
+
+    def imprint(self, digest: bytes) -> bytes:
+        """What to stamp for a SHA3-512 digest: itself, or rehashed for a SHA-2 only TSA."""
+        if self.hash_name == "sha3_512":
+            return digest
+        return hashlib.new(self.hash_name, digest).digest()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
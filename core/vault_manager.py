@@ -1,75 +1,622 @@
+import json
 import sqlite3
 import os
+import threading
+import zlib
+
+from core.crypto import generate_hash, sign_data
+
+GENESIS_HASH = "GENESIS"
+
+# Payload codecs (vault_events.payload_codec). Hashes and signatures are
+# always over the canonical uncompressed text, so the codec is storage only.
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODECS = {"zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+# Opt-in: "zlib" (stdlib) or "zstd" (needs the zstandard package)
+DEFAULT_COMPRESSION = os.environ.get("AETERNA_VAULT_COMPRESSION") or None
+
+# Payloads this small rarely win anything, even with a dictionary
+MIN_COMPRESS_SIZE = 64
+
+# zlib can only look back 32 KiB, so a larger preset dictionary is wasted
+ZLIB_DICT_SIZE = 32 * 1024
+ZSTD_DICT_SIZE = 64 * 1024
+
+# Train a dictionary for an event type once this many of its events were written
+AUTO_TRAIN_AFTER = 1000
+
+# Per-session constants stamped on every event by AeternaEngine.record_event
+SESSION_META_KEYS = ("hw_id", "session_id", "instance_fingerprint")
+
+INSERT_EVENT_SQL = """
+    INSERT INTO vault_events (
+        session_ref,
+        timestamp,
+        event_type,
+        payload,
+        prev_hash,
+        curr_hash,
+        signature,
+        metadata,
+        meta_packed,
+        payload_codec,
+        payload_dict
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Decoded back to the original record layout (hex digests, full metadata JSON)
+SELECT_EVENTS_SQL = """
+    SELECT
+        e.id,
+        s.session_id,
+        e.timestamp,
+        e.event_type,
+        e.payload,
+        e.prev_hash,
+        e.curr_hash,
+        e.signature,
+        e.metadata,
+        e.meta_packed,
+        e.payload_codec,
+        e.payload_dict,
+        s.hw_id,
+        s.instance_fingerprint
+    FROM vault_events e
+    JOIN sessions s ON s.id = e.session_ref
+"""
+
+
+def _digest_to_blob(value: str):
+    return None if value is None or value == GENESIS_HASH else bytes.fromhex(value)
+
+
+def _blob_to_digest(value) -> str:
+    return GENESIS_HASH if value is None else value.hex()
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression requires the 'zstandard' package") from None
+    return zstandard
 
 
 class VaultManager:
-    def __init__(self, db_path: str = "vault/aeterna_vault.db"):
+    """
+    Hash-chained audit vault.
+
+    Storage is compact: digests and signatures are 64-byte BLOBs, and the
+    per-session constants (session_id, hw_id, instance_fingerprint) live once
+    in `sessions`, referenced by integer key. Records go in and come out in
+    the original layout (hex strings, full metadata JSON); the compact form
+    never leaves this class.
+
+    With `compression` set ("zlib" or "zstd"), payloads are stored
+    compressed, using a dictionary trained on earlier payloads of the same
+    event type when one exists. Rows already written keep their codec, so
+    compression can be switched on or off at any time.
+    """
+
+    def __init__(self, db_path: str = "vault/aeterna_vault.db", compression: str = DEFAULT_COMPRESSION):
+        if compression is not None and compression not in CODECS:
+            raise ValueError(f"Unknown compression: {compression!r} (expected one of {sorted(CODECS)})")
+        if compression == "zstd":
+            _zstd()
         self.db_path = db_path
+        self.compression = compression
+        self._session_refs = {}
+        self._dicts = {}          # dict id -> (codec, bytes)
+        self._dict_for_type = {}  # (event_type, codec) -> dict id, or None if untrained
+        self._written = {}        # event_type -> events written since the last training
+        self._train_lock = threading.Lock()
         self._ensure_schema()
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        # Several processes share the file: wait for a writer instead of failing
+        return sqlite3.connect(self.db_path, timeout=30)
 
     def _ensure_schema(self):
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
 
         with self._connect() as conn:
             conn.execute("""
-                CREATE TABLE IF NOT EXISTS audit_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY,
                     session_id TEXT NOT NULL,
+                    hw_id BLOB NOT NULL,
+                    instance_fingerprint TEXT NOT NULL,
+                    UNIQUE (session_id, hw_id, instance_fingerprint)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS vault_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_ref INTEGER NOT NULL REFERENCES sessions (id),
                     timestamp TEXT NOT NULL,
                     event_type TEXT NOT NULL,
                     payload TEXT NOT NULL,
-                    prev_hash TEXT,
-                    curr_hash TEXT NOT NULL,
-                    signature TEXT NOT NULL,
-                    metadata TEXT
+                    prev_hash BLOB,
+                    curr_hash BLOB NOT NULL,
+                    signature BLOB NOT NULL,
+                    metadata TEXT,
+                    meta_packed INTEGER NOT NULL DEFAULT 0,
+                    payload_codec INTEGER NOT NULL DEFAULT 0,
+                    payload_dict INTEGER REFERENCES payload_dicts (id)
                 )
             """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(vault_events)")}
+            if "payload_codec" not in columns:
+                conn.execute("ALTER TABLE vault_events ADD COLUMN payload_codec INTEGER NOT NULL DEFAULT 0")
+                conn.execute("ALTER TABLE vault_events ADD COLUMN payload_dict INTEGER REFERENCES payload_dicts (id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS payload_dicts (
+                    id INTEGER PRIMARY KEY,
+                    event_type TEXT NOT NULL,
+                    codec INTEGER NOT NULL,
+                    samples INTEGER NOT NULL,
+                    data BLOB NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_vault_events_session
+                ON vault_events (session_ref, id)
+            """)
+            # WAL: commits are a log append and readers never block the writer
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.commit()
 
-    def get_last_hash(self):
+        self._migrate_legacy_audit_log()
+
+    def _migrate_legacy_audit_log(self):
+        """
+        Streams rows of the old all-TEXT audit_log table into the compact layout.
+
+        Every process opening the vault gets here (one per web worker), so
+        the table is checked again once the write lock is held: whoever gets
+        it second finds the migration done and returns. The legacy table is
+        only dropped once the copy has the same row count and last hash.
+        The space it leaves is reclaimed by vacuum(), not here.
+        """
         with self._connect() as conn:
+            if not self._has_legacy_table(conn):
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            if not self._has_legacy_table(conn):
+                conn.rollback()
+                return
+            before = conn.execute("SELECT COUNT(*) FROM vault_events").fetchone()[0]
+            refs = {}
             cur = conn.execute("""
-                SELECT curr_hash
+                SELECT session_id, timestamp, event_type, payload,
+                       prev_hash, curr_hash, signature, metadata
                 FROM audit_log
+                ORDER BY id ASC
+            """)
+            while True:
+                rows = cur.fetchmany(1000)
+                if not rows:
+                    break
+                conn.executemany(
+                    INSERT_EVENT_SQL,
+                    [self._encode(conn, tuple(row), refs) for row in rows],
+                )
+
+            legacy_count, legacy_last = conn.execute(
+                "SELECT COUNT(*), (SELECT curr_hash FROM audit_log ORDER BY id DESC LIMIT 1) FROM audit_log"
+            ).fetchone()
+            copied = conn.execute("SELECT COUNT(*) FROM vault_events").fetchone()[0] - before
+            last = conn.execute("SELECT curr_hash FROM vault_events ORDER BY id DESC LIMIT 1").fetchone()
+            copied_last = last[0].hex() if last and copied else None
+            if copied != legacy_count or copied_last != legacy_last:
+                # Leaving the `with` block rolls the copy back; audit_log stays
+                raise RuntimeError(
+                    f"Legacy audit_log migration mismatch: {legacy_count} rows ending in "
+                    f"{legacy_last}, copied {copied} ending in {copied_last}"
+                )
+            conn.execute("DROP TABLE audit_log")
+        self._session_refs.update(refs)
+
+    @staticmethod
+    def _has_legacy_table(conn) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'audit_log'"
+        ).fetchone() is not None
+
+    def vacuum(self):
+        """
+        Rewrites the database file to reclaim free pages (after the legacy
+        migration or large deletions). Needs exclusive access for its whole
+        run: a maintenance step, never done implicitly.
+        """
+        with self._connect() as conn:
+            conn.execute("VACUUM")
+
+    # -----------------------------
+    # Encoding (record tuple <-> compact row)
+    # -----------------------------
+    def _session_ref(self, conn, key: tuple, pending: dict) -> int:
+        ref = self._session_refs.get(key) or pending.get(key)
+        if ref is None:
+            conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, hw_id, instance_fingerprint) VALUES (?, ?, ?)",
+                key,
+            )
+            ref = conn.execute(
+                "SELECT id FROM sessions WHERE session_id = ? AND hw_id = ? AND instance_fingerprint = ?",
+                key,
+            ).fetchone()[0]
+            pending[key] = ref
+        return ref
+
+    @staticmethod
+    def _pack_metadata(session_id: str, metadata_str):
+        """
+        Splits the session constants out of the metadata JSON. Returns
+        (hw_id, instance_fingerprint, extra_json, packed); falls back to
+        storing the JSON verbatim when it would not round-trip exactly.
+        Sessions without identity use empty values (NULLs defeat UNIQUE).
+        """
+        verbatim = (b"", "", metadata_str, 0)
+        try:
+            metadata = json.loads(metadata_str) if metadata_str else None
+        except ValueError:
+            metadata = None
+        if not isinstance(metadata, dict) or any(k not in metadata for k in SESSION_META_KEYS):
+            return verbatim
+        if metadata["session_id"] != session_id:
+            return verbatim
+        try:
+            hw_id = bytes.fromhex(metadata["hw_id"])
+        except (TypeError, ValueError):
+            return verbatim
+
+        extra = {k: v for k, v in metadata.items() if k not in SESSION_META_KEYS}
+        extra_str = json.dumps(extra, sort_keys=True) if extra else None
+        packed = (hw_id, metadata["instance_fingerprint"], extra_str, 1)
+        if VaultManager._unpack_metadata(session_id, extra_str, 1, hw_id, packed[1]) != metadata_str:
+            return verbatim
+        return packed
+
+    @staticmethod
+    def _unpack_metadata(session_id, metadata, packed, hw_id, instance_fingerprint):
+        if not packed:
+            return metadata
+        full = json.loads(metadata) if metadata else {}
+        full.update({
+            "hw_id": hw_id.hex(),
+            "session_id": session_id,
+            "instance_fingerprint": instance_fingerprint,
+        })
+        return json.dumps(full, sort_keys=True)
+
+    def _encode(self, conn, record: tuple, pending: dict) -> tuple:
+        session_id, timestamp, event_type, payload, prev_hash, curr_hash, signature, metadata = record
+        hw_id, fingerprint, meta_value, packed = self._pack_metadata(session_id, metadata)
+        ref = self._session_ref(conn, (session_id, hw_id, fingerprint), pending)
+        stored, codec, dict_id = self._compress_payload(conn, event_type, payload)
+        return (
+            ref,
+            timestamp,
+            event_type,
+            stored,
+            _digest_to_blob(prev_hash),
+            bytes.fromhex(curr_hash),
+            bytes.fromhex(signature),
+            meta_value,
+            packed,
+            codec,
+            dict_id,
+        )
+
+    def _decode(self, conn, row) -> tuple:
+        """(id, session_id, timestamp, event_type, payload, prev_hash, curr_hash, signature, metadata)"""
+        (row_id, session_id, timestamp, event_type, payload, prev_hash,
+         curr_hash, signature, metadata, packed, codec, dict_id, hw_id, fingerprint) = row
+        return (
+            row_id,
+            session_id,
+            timestamp,
+            event_type,
+            self._decompress_payload(conn, payload, codec, dict_id),
+            _blob_to_digest(prev_hash),
+            curr_hash.hex(),
+            signature.hex(),
+            VaultManager._unpack_metadata(session_id, metadata, packed, hw_id, fingerprint),
+        )
+
+    # -----------------------------
+    # Payload compression
+    # -----------------------------
+    def _load_dict(self, conn, dict_id: int) -> tuple:
+        entry = self._dicts.get(dict_id)
+        if entry is None:
+            row = conn.execute(
+                "SELECT codec, data FROM payload_dicts WHERE id = ?", (dict_id,)
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Missing payload dictionary {dict_id}")
+            entry = self._dicts[dict_id] = (row[0], bytes(row[1]))
+        return entry
+
+    def _current_dict(self, conn, event_type: str, codec: int):
+        key = (event_type, codec)
+        if key not in self._dict_for_type:
+            row = conn.execute("""
+                SELECT id FROM payload_dicts
+                WHERE event_type = ? AND codec = ?
                 ORDER BY id DESC
                 LIMIT 1
-            """)
-            row = cur.fetchone()
-            return row[0] if row else "GENESIS"
+            """, key).fetchone()
+            self._dict_for_type[key] = row[0] if row else None
+        return self._dict_for_type[key]
+
+    def _compress_payload(self, conn, event_type: str, payload: str) -> tuple:
+        """Returns (stored_value, codec, dict_id); raw text when compression does not pay off."""
+        raw = (payload, CODEC_RAW, None)
+        if self.compression is None or payload is None:
+            return raw
+        data = payload.encode("utf-8")
+        if len(data) < MIN_COMPRESS_SIZE:
+            return raw
+
+        codec = CODECS[self.compression]
+        self._written[event_type] = self._written.get(event_type, 0) + 1
+        dict_id = self._current_dict(conn, event_type, codec)
+        zdict = self._load_dict(conn, dict_id)[1] if dict_id is not None else None
+        if codec == CODEC_ZLIB:
+            comp = zlib.compressobj(9, zdict=zdict) if zdict else zlib.compressobj(9)
+            blob = comp.compress(data) + comp.flush()
+        else:
+            zstandard = _zstd()
+            dict_data = zstandard.ZstdCompressionDict(zdict) if zdict else None
+            blob = zstandard.ZstdCompressor(level=9, dict_data=dict_data).compress(data)
+        if len(blob) >= len(data):
+            return raw
+        return (blob, codec, dict_id)
+
+    def _decompress_payload(self, conn, stored, codec: int, dict_id) -> str:
+        if not codec:
+            return stored
+        zdict = self._load_dict(conn, dict_id)[1] if dict_id is not None else None
+        if codec == CODEC_ZLIB:
+            decomp = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+            data = decomp.decompress(stored) + decomp.flush()
+        elif codec == CODEC_ZSTD:
+            zstandard = _zstd()
+            dict_data = zstandard.ZstdCompressionDict(zdict) if zdict else None
+            data = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(stored)
+        else:
+            raise ValueError(f"Unknown payload codec {codec}")
+        return data.decode("utf-8")
+
+    def train_dictionary(self, event_type: str, sample_limit: int = 2000):
+        """
+        Builds a compression dictionary from the most recent payloads of one
+        event type and makes it the dictionary for new writes of that type.
+        Older rows keep referencing the dictionary they were written with.
+        Returns the new dictionary id, or None without compression or samples.
+        """
+        if self.compression is None:
+            return None
+        codec = CODECS[self.compression]
+        with self._train_lock, self._connect() as conn:
+            rows = conn.execute("""
+                SELECT payload, payload_codec, payload_dict
+                FROM vault_events
+                WHERE event_type = ?
+                ORDER BY id DESC
+                LIMIT ?
+            """, (event_type, sample_limit)).fetchall()
+            samples = [
+                self._decompress_payload(conn, stored, c, d).encode("utf-8")
+                for stored, c, d in rows
+            ]
+            if not samples:
+                return None
+
+            if codec == CODEC_ZSTD:
+                try:
+                    data = _zstd().train_dictionary(ZSTD_DICT_SIZE, samples).as_bytes()
+                except Exception:
+                    # Too few or too uniform samples for zstd's trainer
+                    data = b"".join(samples)[-ZSTD_DICT_SIZE:]
+            else:
+                # zlib has no trainer: a preset dictionary is simply the
+                # most common substrings placed nearest the end, which for
+                # payloads of one event type is well served by recent samples
+                # (oldest first, so the newest ends up closest to the data).
+                data = b"".join(reversed(samples))[-ZLIB_DICT_SIZE:]
+
+            cur = conn.execute(
+                "INSERT INTO payload_dicts (event_type, codec, samples, data) VALUES (?, ?, ?, ?)",
+                (event_type, codec, len(samples), data),
+            )
+            dict_id = cur.lastrowid
+        self._dicts[dict_id] = (codec, data)
+        self._dict_for_type[(event_type, codec)] = dict_id
+        self._written[event_type] = 0
+        return dict_id
+
+    def _maybe_train(self):
+        """Trains a first dictionary for event types that reached AUTO_TRAIN_AFTER."""
+        if self.compression is None:
+            return
+        codec = CODECS[self.compression]
+        for event_type, count in list(self._written.items()):
+            if count >= AUTO_TRAIN_AFTER and self._dict_for_type.get((event_type, codec)) is None:
+                self.train_dictionary(event_type)
+
+    # -----------------------------
+    # Chain head
+    # -----------------------------
+    @staticmethod
+    def _head(conn) -> str:
+        cur = conn.execute("""
+            SELECT curr_hash
+            FROM vault_events
+            ORDER BY id DESC
+            LIMIT 1
+        """)
+        row = cur.fetchone()
+        return row[0].hex() if row else GENESIS_HASH
+
+    def get_last_hash(self):
+        with self._connect() as conn:
+            return self._head(conn)
+
+    def get_head(self) -> tuple:
+        """Returns (height, head_hash); height is the id of the last row."""
+        with self._connect() as conn:
+            row = conn.execute("""
+                SELECT id, curr_hash
+                FROM vault_events
+                ORDER BY id DESC
+                LIMIT 1
+            """).fetchone()
+            return (row[0], row[1].hex()) if row else (0, GENESIS_HASH)
 
+    def get_hash_at(self, height: int):
+        """curr_hash of the row with this id, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT curr_hash FROM vault_events WHERE id = ?", (height,)
+            ).fetchone()
+            return row[0].hex() if row else None
+
+    def hashes_after(self, after_id: int, limit: int = 1000) -> list:
+        """[(id, curr_hash)] of the rows after after_id, in chain order."""
+        with self._connect() as conn:
+            cur = conn.execute("""
+                SELECT id, curr_hash
+                FROM vault_events
+                WHERE id > ?
+                ORDER BY id ASC
+                LIMIT ?
+            """, (after_id, limit))
+            return [(row_id, curr.hex()) for row_id, curr in cur]
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
     def persist(self, record: tuple):
+        pending = {}
         with self._connect() as conn:
-            conn.execute("""
-                INSERT INTO audit_log (
-                    session_id,
-                    timestamp,
-                    event_type,
-                    payload,
-                    prev_hash,
-                    curr_hash,
-                    signature,
-                    metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, record)
+            conn.execute(INSERT_EVENT_SQL, self._encode(conn, record, pending))
             conn.commit()
+        self._session_refs.update(pending)
+        self._maybe_train()
+
+    def append_chained(self, builders) -> list:
+        """
+        Seals records in order against the current chain head.
+
+        Each builder receives the previous hash and returns the record tuple
+        to insert (curr_hash at index 5). The head read and all inserts share
+        one IMMEDIATE transaction, so concurrent writers (threads or
+        processes) cannot fork the chain and the batch pays a single commit.
+        """
+        pending = {}
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            prev_hash = self._head(conn)
+            records = []
+            rows = []
+            for build in builders:
+                record = build(prev_hash)
+                records.append(record)
+                rows.append(self._encode(conn, record, pending))
+                prev_hash = record[5]
+            conn.executemany(INSERT_EVENT_SQL, rows)
+        # Only cache session keys once their rows are committed
+        self._session_refs.update(pending)
+        self._maybe_train()
+        return [record[5] for record in records]
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def iter_events(self, session_id: str = None, after_id: int = 0, page_size: int = 500):
+        """
+        Streams decoded events in id order, as (id, session_id, timestamp,
+        event_type, payload, prev_hash, curr_hash, signature, metadata).
+
+        Keyset pagination on id: each page is one short query on its own
+        connection (WHERE id > last LIMIT page_size), so memory stays at one
+        page, no read transaction is held while the caller is slow, and the
+        last id seen is a cursor to resume from.
+        """
+        if session_id is None:
+            where, params = "WHERE e.id > ?", ()
+        else:
+            where = "WHERE e.session_ref IN (SELECT id FROM sessions WHERE session_id = ?) AND e.id > ?"
+            params = (session_id,)
+        sql = SELECT_EVENTS_SQL + where + " ORDER BY e.id ASC LIMIT ?"
+        last_id = after_id
+        while True:
+            with self._connect() as conn:
+                page = [self._decode(conn, row) for row in conn.execute(sql, params + (last_id, page_size))]
+            yield from page
+            if len(page) < page_size:
+                return
+            last_id = page[-1][0]
 
     def get_events_by_session(self, session_id: str):
+        return [event[1:] for event in self.iter_events(session_id)]
+
+    def session_contexts(self, session_id: str) -> list:
+        """
+        Distinct metadata stamped on a session's events (connector context
+        and the like), as dicts without the per-session constants. Reads
+        only the metadata column, never the payloads.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT DISTINCT e.metadata FROM vault_events e
+                WHERE e.session_ref IN (SELECT id FROM sessions WHERE session_id = ?)
+                  AND e.metadata IS NOT NULL
+            """, (session_id,)).fetchall()
+        contexts = []
+        for (metadata,) in rows:
+            try:
+                context = json.loads(metadata)
+            except ValueError:
+                continue
+            if isinstance(context, dict):
+                context = {k: v for k, v in context.items() if k not in SESSION_META_KEYS}
+                if context and context not in contexts:
+                    contexts.append(context)
+        return contexts
+
+    def verify_chain(self) -> dict:
+        """
+        Re-derives every hash and signature in id order, streaming the rows.
+        """
+        checked = 0
+        expected_prev = GENESIS_HASH
         with self._connect() as conn:
             cur = conn.execute("""
-                SELECT
-                    session_id,
-                    timestamp,
-                    event_type,
-                    payload,
-                    prev_hash,
-                    curr_hash,
-                    signature,
-                    metadata
-                FROM audit_log
-                WHERE session_id = ?
-                ORDER BY id ASC
-            """, (session_id,))
-            return cur.fetchall()
+                SELECT e.id, s.session_id, e.timestamp, e.payload,
+                       e.payload_codec, e.payload_dict,
+                       e.prev_hash, e.curr_hash, e.signature
+                FROM vault_events e
+                JOIN sessions s ON s.id = e.session_ref
+                ORDER BY e.id ASC
+            """)
+            for (row_id, session_id, timestamp, stored, codec, dict_id,
+                 prev_blob, curr_blob, signature) in cur:
+                payload = self._decompress_payload(conn, stored, codec, dict_id)
+                prev_hash = _blob_to_digest(prev_blob)
+                recalculated = generate_hash(f"{session_id}{timestamp}{payload}{prev_hash}")
+                if (
+                    prev_hash != expected_prev
+                    or curr_blob.hex() != recalculated
+                    or signature.hex() != sign_data(recalculated)
+                ):
+                    return {"ok": False, "checked": checked, "failed_id": row_id}
+                expected_prev = recalculated
+                checked += 1
+        return {"ok": True, "checked": checked, "failed_id": None}
@@ -0,0 +1,111 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from core.vault_manager import VaultManager
+
+_STOP = object()
+
+
+class VaultWriter:
+    """
+    Single-writer vault service.
+
+    Producers enqueue event builders; one dedicated thread assigns prev_hash
+    in queue order and coalesces whatever is waiting into a group commit,
+    flushed when the batch reaches max_batch or max_delay seconds have passed.
+    Each caller gets a future resolving to its sealed hash.
+    """
+
+    def __init__(self, vault: VaultManager = None, max_batch: int = 512, max_delay: float = 0.002):
+        self.vault = vault or VaultManager()
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        with self._lock:
+            self._start_locked()
+        return self
+
+    def _start_locked(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="aeterna-vault-writer", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, build) -> Future:
+        future = Future()
+        # Same lock as close(): an item is either queued before _STOP or refused
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("VaultWriter is closed")
+            self._start_locked()
+            self._queue.put((build, future))
+        return future
+
+    def close(self, timeout: float = None):
+        """Drains pending events and stops the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+        # Nothing should follow _STOP; never leave a caller waiting on a future
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[1].set_exception(RuntimeError("VaultWriter is closed"))
+
+    def _flush(self, batch: list):
+        try:
+            hashes = self.vault.append_chained([build for build, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # The group commit rolled back as a whole: seal one by one so a
+            # failing builder only fails its own caller
+            for item in batch:
+                self._flush([item])
+            return
+        for (_, future), sealed_hash in zip(batch, hashes):
+            future.set_result(sealed_hash)
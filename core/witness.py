@@ -1,24 +1,404 @@
-import hashlib
+import asyncio
+import base64
 import datetime
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from core.merkle import HASH_ALGORITHM, audit_paths, leaf_hash, verify_inclusion
+from core.tsp import TSAClient, TSAError, parse_token
+
+TSA_URL = os.getenv("AETERNA_TSA_URL")
+TSA_HASH = os.getenv("AETERNA_TSA_HASH", "sha3_512")
+ANCHOR_DB = os.getenv("AETERNA_ANCHOR_DB", "vault/witness.db")
+ANCHOR_INTERVAL = float(os.getenv("AETERNA_ANCHOR_INTERVAL", "60"))
+ANCHOR_MAX_BATCH = int(os.getenv("AETERNA_ANCHOR_MAX_BATCH", "4096"))
+
+# Cuántos hashes se leen del vault por adelantado; si la TSA no responde,
+# lo pendiente se queda en el vault y no en memoria
+MAX_PENDING_FACTOR = 4
+
+# Cada paso de un camino se guarda como 1 byte de lado + 64 del hash hermano
+_STEP = 65
+_SIDES = {"L": b"\x00", "R": b"\x01"}
+_SIDE_NAMES = {0: "L", 1: "R"}
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def default_client() -> Optional[TSAClient]:
+    """Cliente compartido para AETERNA_TSA_URL, o None si no hay TSA configurada."""
+    global _default_client
+    if not TSA_URL:
+        return None
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = TSAClient(TSA_URL, hash_name=TSA_HASH)
+        return _default_client
+
+
+def _to_digest(block_hash: str) -> bytes:
+    """Los hashes del vault ya son SHA3-512 en hex; cualquier otro texto se resume."""
+    try:
+        digest = bytes.fromhex(block_hash)
+        if len(digest) == 64:
+            return digest
+    except ValueError:
+        pass
+    return hashlib.sha3_512(block_hash.encode("utf-8")).digest()
+
 
 class GlobalWitness:
     """Implementa la validación de tiempo externo para evitar manipulación de reloj local."""
-    
+
     @staticmethod
-    def get_external_timestamp(block_hash: str):
+    def get_external_timestamp(block_hash: str, client: TSAClient = None):
         """
-        Simula una llamada a una Autoridad de Sellado de Tiempo (RFC 3161).
-        En un peritaje real, esto devuelve un token firmado por una entidad certificadora.
+        Sella un único hash en una Autoridad de Sellado de Tiempo (RFC 3161).
+
+        Con AETERNA_TSA_URL (o un client) el token es real y firmado por la TSA.
+        Sin TSA configurada se mantiene la simulación local, marcada como tal.
+        Para sellar muchos bloques, AnchorService agrupa los hashes y hace una
+        sola petición por lote.
         """
-        # Simulamos la latencia de red y respuesta de autoridad (DigiCert/GlobalSign)
+        client = client or default_client()
+        if client is not None:
+            stamp = client.timestamp(client.imprint(_to_digest(block_hash)))
+            return {
+                "tsa_id": client.url,
+                "verified_utc": stamp["gen_time"],
+                "tsa_signature": hashlib.sha3_512(stamp["token"]).hexdigest().upper(),
+                "serial": str(stamp["serial"]),
+                "token": base64.b64encode(stamp["token"]).decode("ascii"),
+                "simulated": False,
+            }
+
         tsa_id = "TSA_SERVER_01_NETHERLANDS"
-        external_time = datetime.datetime.now(datetime.UTC).isoformat()
-        
+        external_time = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
         # El testigo firma el hash que nosotros le enviamos
-        witness_sig = hashlib.sha3_512SS(f"{block_hash}{external_time}{tsa_id}".encode()).hexdigest()
-        
+        witness_sig = hashlib.sha3_512(f"{block_hash}{external_time}{tsa_id}".encode()).hexdigest()
+
         return {
             "tsa_id": tsa_id,
             "verified_utc": external_time,
-            "tsa_signature": witness_sig.upper()
-        }
\ No newline at end of file
+            "tsa_signature": witness_sig.upper(),
+            "simulated": True,
+        }
+
+
+class AnchorService:
+    """
+    Anclaje por lotes de los hashes del vault en una TSA RFC 3161.
+
+    Los hashes (cabezas del vault o de sus shards) se acumulan en memoria y,
+    cada `interval` segundos o al llegar a `max_batch`, se calcula la raíz
+    Merkle del lote y se sella con una única petición a la TSA. Se guardan
+    el token y, por cada hash, su camino de inclusión: un hash queda sellado
+    con la hora de la TSA sin pagar una petición por bloque.
+
+    Los lotes se sellan de uno en uno y en orden, así que tras un reinicio
+    basta con seguir el vault desde la última altura anclada.
+    """
+
+    def __init__(self, client: TSAClient = None, db_path: str = ANCHOR_DB,
+                 interval: float = ANCHOR_INTERVAL, max_batch: int = ANCHOR_MAX_BATCH):
+        # Sin cliente sólo se pueden consultar pruebas ya guardadas
+        self.client = client or default_client()
+        self.db_path = db_path
+        self.interval = interval
+        self.max_batch = max_batch
+        self._buffer = []          # [(digest, source, height)]
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._sources = []         # [(vault, source)]
+        self._cursors = {}
+        self._loop = None
+        self._wake = None
+        self._stopping = False
+        self._thread = None
+        self._ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _ensure_schema(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS anchors (
+                    id INTEGER PRIMARY KEY,
+                    merkle_root BLOB NOT NULL,
+                    leaf_count INTEGER NOT NULL,
+                    tsa_url TEXT NOT NULL,
+                    imprint_hash TEXT NOT NULL,
+                    gen_time TEXT NOT NULL,
+                    serial TEXT NOT NULL,
+                    token BLOB NOT NULL,
+                    anchored_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS anchor_leaves (
+                    event_hash BLOB PRIMARY KEY,
+                    anchor_id INTEGER NOT NULL REFERENCES anchors (id),
+                    leaf_index INTEGER NOT NULL,
+                    source TEXT,
+                    height INTEGER,
+                    path BLOB NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_anchor_leaves_source
+                ON anchor_leaves (source, height)
+            """)
+            conn.commit()
+
+    # -----------------------------
+    # Entrada
+    # -----------------------------
+    def submit(self, event_hash: str, source: str = None, height: int = None):
+        """Encola un hash (SHA3-512 en hex) para el próximo lote. Seguro entre hilos."""
+        digest = bytes.fromhex(event_hash)
+        if len(digest) != 64:
+            raise ValueError("Expected a SHA3-512 digest in hex")
+        with self._lock:
+            self._buffer.append((digest, source, height))
+            full = len(self._buffer) >= self.max_batch
+        if full and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def follow(self, vault, source: str = "vault"):
+        """Ancla cada evento nuevo de un VaultManager, retomando donde se quedó."""
+        self._sources.append((vault, source))
+        return self
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def _cursor(self, source: str) -> int:
+        if source not in self._cursors:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT MAX(height) FROM anchor_leaves WHERE source = ?", (source,)
+                ).fetchone()
+            self._cursors[source] = row[0] or 0
+        return self._cursors[source]
+
+    def _collect(self):
+        """Lee del vault los eventos aún no encolados, sin pasar del límite de pendientes."""
+        limit = self.max_batch * MAX_PENDING_FACTOR
+        for vault, source in self._sources:
+            room = limit - self.pending()
+            if room <= 0:
+                return
+            rows = vault.hashes_after(self._cursor(source), room)
+            with self._lock:
+                self._buffer.extend((bytes.fromhex(h), source, height) for height, h in rows)
+            if rows:
+                self._cursors[source] = rows[-1][0]
+
+    # -----------------------------
+    # Sellado
+    # -----------------------------
+    def _take(self) -> list:
+        with self._lock:
+            batch = self._buffer[:self.max_batch]
+            del self._buffer[:self.max_batch]
+        return batch
+
+    def _requeue(self, batch: list):
+        with self._lock:
+            self._buffer[:0] = batch
+
+    async def flush_async(self) -> list:
+        """Sella todo lo pendiente, lote a lote. Devuelve los ids de anclaje creados."""
+        if self.client is None:
+            raise TSAError("No TSA configured (AETERNA_TSA_URL)")
+        # Sin bloquear el bucle (y sin quedarse con el cerrojo si se cancela la espera)
+        while not self._flush_lock.acquire(blocking=False):
+            await asyncio.sleep(0.05)
+        try:
+            await asyncio.to_thread(self._collect)
+            anchored = []
+            while True:
+                batch = self._take()
+                if not batch:
+                    return anchored
+                try:
+                    anchored.append(await self._anchor(batch))
+                except BaseException:
+                    self._requeue(batch)
+                    raise
+        finally:
+            self._flush_lock.release()
+
+    def flush(self) -> list:
+        """Versión síncrona de flush_async (desde otro hilo o sin bucle de eventos)."""
+        if self._loop is not None and self._thread is not None:
+            return asyncio.run_coroutine_threadsafe(self.flush_async(), self._loop).result()
+        return asyncio.run(self.flush_async())
+
+    async def _anchor(self, batch: list) -> int:
+        # Un mismo hash enviado dos veces sólo ocupa una hoja
+        seen = set()
+        unique = []
+        for item in batch:
+            if item[0] not in seen:
+                seen.add(item[0])
+                unique.append(item)
+        root, paths = audit_paths([leaf_hash(digest) for digest, _, _ in unique])
+        stamp = await self.client.atimestamp(self.client.imprint(root))
+        return await asyncio.to_thread(self._store, unique, root, paths, stamp)
+
+    def _store(self, leaves: list, root: bytes, paths: list, stamp: dict) -> int:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute("""
+                INSERT INTO anchors (
+                    merkle_root, leaf_count, tsa_url, imprint_hash,
+                    gen_time, serial, token, anchored_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (root, len(leaves), self.client.url, self.client.hash_name,
+                  stamp["gen_time"], str(stamp["serial"]), stamp["token"], time.time()))
+            anchor_id = cur.lastrowid
+            # Un hash ya anclado en un lote anterior conserva su primera prueba
+            conn.executemany("""
+                INSERT OR IGNORE INTO anchor_leaves (
+                    event_hash, anchor_id, leaf_index, source, height, path
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                (digest, anchor_id, i, source, height,
+                 b"".join(_SIDES[side] + sibling for side, sibling in path))
+                for i, ((digest, source, height), path) in enumerate(zip(leaves, paths))
+            ))
+        return anchor_id
+
+    # -----------------------------
+    # Ciclo de vida
+    # -----------------------------
+    async def run(self):
+        """Bucle de anclaje; se puede lanzar como tarea en un bucle existente."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        try:
+            while not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                try:
+                    await self.flush_async()
+                except TSAError as e:
+                    # El lote vuelve a la cola y se reintenta en el siguiente ciclo
+                    logging.warning(f"Anclaje aplazado: {e}")
+        finally:
+            self._loop = None
+
+    def start(self):
+        """Arranca run() en un hilo propio."""
+        if self.client is None:
+            raise TSAError("No TSA configured (AETERNA_TSA_URL)")
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=lambda: asyncio.run(self.run()), name="aeterna-witness", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self, final_flush: bool = True):
+        """Detiene el bucle y, por defecto, sella lo que quede pendiente."""
+        self._stopping = True
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._wake.set)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if final_flush:
+            self.flush()
+
+    # -----------------------------
+    # Pruebas
+    # -----------------------------
+    def proof(self, event_hash: str) -> Optional[dict]:
+        """Camino de inclusión y token del lote que selló el hash, o None si aún no está anclado."""
+        with self._connect() as conn:
+            row = conn.execute("""
+                SELECT l.leaf_index, l.source, l.height, l.path,
+                       a.id, a.merkle_root, a.leaf_count, a.tsa_url,
+                       a.imprint_hash, a.gen_time, a.serial, a.token
+                FROM anchor_leaves l
+                JOIN anchors a ON a.id = l.anchor_id
+                WHERE l.event_hash = ?
+            """, (bytes.fromhex(event_hash),)).fetchone()
+        if row is None:
+            return None
+        (index, source, height, path, anchor_id, root, leaf_count,
+         tsa_url, imprint_hash, gen_time, serial, token) = row
+        return {
+            "event_hash": event_hash,
+            "source": source,
+            "height": height,
+            "index": index,
+            "leaf_count": leaf_count,
+            "leaf_hash": leaf_hash(bytes.fromhex(event_hash)).hex(),
+            "path": [
+                {"side": _SIDE_NAMES[path[i]], "hash": path[i + 1:i + _STEP].hex()}
+                for i in range(0, len(path), _STEP)
+            ],
+            "merkle_root": root.hex(),
+            "hash_algorithm": HASH_ALGORITHM,
+            "anchor_id": anchor_id,
+            "tsa_url": tsa_url,
+            "imprint_hash": imprint_hash,
+            "gen_time": gen_time,
+            "serial": serial,
+            "token": base64.b64encode(token).decode("ascii"),
+        }
+
+    @staticmethod
+    def verify_proof(proof: dict) -> dict:
+        """
+        Comprueba el camino hasta la raíz y que el token sella esa raíz.
+        La firma CMS del token se verifica aparte con el certificado de la TSA.
+        """
+        root = bytes.fromhex(proof["merkle_root"])
+        included = verify_inclusion(bytes.fromhex(proof["event_hash"]), proof, proof["merkle_root"])
+        info = parse_token(base64.b64decode(proof["token"]))
+        expected = root if proof["imprint_hash"] == "sha3_512" else hashlib.new(proof["imprint_hash"], root).digest()
+        token_matches = info["digest"] == expected and info["hash_name"] == proof["imprint_hash"]
+        return {
+            "ok": included and token_matches,
+            "included": included,
+            "token_matches_root": token_matches,
+            "gen_time": info["gen_time"],
+            "serial": str(info["serial"]),
+        }
+
+    def verify(self, event_hash: str) -> dict:
+        proof = self.proof(event_hash)
+        if proof is None:
+            return {"ok": False, "included": False, "token_matches_root": False, "anchored": False}
+        return dict(self.verify_proof(proof), anchored=True)
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            anchors, last = conn.execute("SELECT COUNT(*), MAX(gen_time) FROM anchors").fetchone()
+            leaves = conn.execute("SELECT COUNT(*) FROM anchor_leaves").fetchone()[0]
+        return {
+            "anchors": anchors,
+            "anchored_hashes": leaves,
+            "last_gen_time": last,
+            "pending": self.pending(),
+            "cursors": {source: self._cursor(source) for _, source in self._sources},
+        }
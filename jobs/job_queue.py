@@ -0,0 +1,177 @@
+# jobs/job_queue.py
+# Durable job queue stored in the events SQLite database
+import json
+import random
+import sqlite3
+import time
+from typing import NamedTuple, Optional
+
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 600.0
+
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+
+
+class JobQueue:
+    """
+    Jobs are rows; a worker leases one by stamping an owner and an expiry.
+    A worker that dies mid-task simply lets its lease lapse and the job
+    becomes visible again. Failures are retried with exponential backoff
+    until max_attempts, then parked as 'dead'.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self._ensure_schema()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 5,
+                    run_after REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    idempotency_key TEXT UNIQUE,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_jobs_ready
+                ON jobs (status, priority DESC, run_after)
+                """
+            )
+            conn.commit()
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        priority: int = 0,
+        idempotency_key: Optional[str] = None,
+        delay: float = 0.0,
+        max_attempts: int = 5,
+    ) -> int:
+        """Adds a job; a repeated idempotency_key returns the existing job id."""
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                INSERT OR IGNORE INTO jobs
+                (kind, payload, priority, max_attempts, run_after, idempotency_key, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (kind, json.dumps(payload), priority, max_attempts, now + delay, idempotency_key, now, now),
+            )
+            if cur.rowcount:
+                return cur.lastrowid
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE idempotency_key = ?",
+                (idempotency_key,),
+            ).fetchone()
+            return row["id"]
+
+    def lease(self, owner: str, visibility_timeout: float = 300.0) -> Optional[Job]:
+        """Claims the highest-priority ready job, or an abandoned one whose lease expired."""
+        while True:
+            now = time.time()
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    """
+                    SELECT * FROM jobs
+                    WHERE (status = 'queued' AND run_after <= ?)
+                       OR (status = 'leased' AND lease_expires <= ?)
+                    ORDER BY priority DESC, run_after ASC, id ASC
+                    LIMIT 1
+                    """,
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    return None
+
+                if row["attempts"] >= row["max_attempts"]:
+                    # Lease lapsed on its last attempt (worker crashed)
+                    conn.execute(
+                        """
+                        UPDATE jobs SET status = 'dead', lease_owner = NULL,
+                            last_error = COALESCE(last_error, 'lease expired'), updated_at = ?
+                        WHERE id = ?
+                        """,
+                        (now, row["id"]),
+                    )
+                    continue
+
+                conn.execute(
+                    """
+                    UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?,
+                        attempts = attempts + 1, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    (owner, now + visibility_timeout, now, row["id"]),
+                )
+                return Job(
+                    row["id"],
+                    row["kind"],
+                    json.loads(row["payload"]),
+                    row["attempts"] + 1,
+                    row["max_attempts"],
+                )
+
+    def complete(self, job: Job, owner: str) -> bool:
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+                """,
+                (time.time(), job.id, owner),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job: Job, owner: str, error: str) -> bool:
+        """Reschedules with backoff, or marks the job dead once attempts run out."""
+        now = time.time()
+        if job.attempts >= job.max_attempts:
+            status, run_after = "dead", now
+        else:
+            backoff = min(BACKOFF_BASE_SECONDS * (2 ** (job.attempts - 1)), BACKOFF_MAX_SECONDS)
+            status, run_after = "queued", now + backoff * random.uniform(0.8, 1.2)
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                UPDATE jobs SET status = ?, run_after = ?, lease_owner = NULL, lease_expires = NULL,
+                    last_error = ?, updated_at = ?
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+                """,
+                (status, run_after, error[:2000], now, job.id, owner),
+            )
+            return cur.rowcount == 1
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(1) AS cnt FROM jobs GROUP BY status").fetchall()
+            return {row["status"]: row["cnt"] for row in rows}
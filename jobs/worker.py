@@ -0,0 +1,121 @@
+# jobs/worker.py
+# Worker pool draining the durable job queue
+#
+# In-process: started by app.py's lifespan (AETERNA_INPROCESS_WORKERS)
+# Standalone: python -m jobs.worker   (Procfile "worker" entry)
+import logging
+import os
+import socket
+import threading
+import traceback
+import uuid
+
+from jobs.job_queue import JobQueue
+
+logger = logging.getLogger("aeterna.jobs")
+
+HANDLERS = {}
+
+
+def handler(kind: str):
+    """Registers a function as the handler for a job kind. Handlers must be idempotent."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: int = 2,
+        visibility_timeout: float = 300.0,
+        poll_interval: float = 1.0,
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    def start(self):
+        self._stop.clear()
+        for i in range(self.concurrency):
+            t = threading.Thread(
+                target=self._loop, args=(f"{self._prefix}:{i}",),
+                name=f"aeterna-worker-{i}", daemon=True,
+            )
+            t.start()
+            self._threads.append(t)
+        logger.info("Job worker pool started (%d threads)", self.concurrency)
+        return self
+
+    def notify(self):
+        """Wakes idle workers right after an in-process enqueue."""
+        self._wake.set()
+
+    def stop(self, timeout: float = 30.0):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def run_forever(self):
+        self.start()
+        try:
+            self._stop.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _loop(self, owner: str):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.lease(owner, self.visibility_timeout)
+            except Exception:
+                logger.exception("Job lease failed")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._run(job, owner)
+
+    def _run(self, job, owner: str):
+        fn = HANDLERS.get(job.kind)
+        if fn is None:
+            self.queue.fail(job, owner, f"No handler registered for {job.kind!r}")
+            logger.error("No handler for job kind %s (job %s)", job.kind, job.id)
+            return
+        try:
+            fn(job.payload)
+        except Exception:
+            logger.exception("Job %s (%s) failed on attempt %d", job.id, job.kind, job.attempts)
+            self.queue.fail(job, owner, traceback.format_exc())
+        else:
+            self.queue.complete(job, owner)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    # Importing the app registers its handlers; setup() opens its job queue.
+    # Go through the imported module: under -m this file is __main__ and
+    # its HANDLERS would be a separate, empty registry.
+    import app
+    from jobs import worker
+
+    app.setup()
+    worker.WorkerPool(
+        app.job_queue,
+        concurrency=int(os.getenv("AETERNA_WORKER_CONCURRENCY", "4")),
+    ).run_forever()
+
+
+if __name__ == "__main__":
+    main()
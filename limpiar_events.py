@@ -1,36 +1,56 @@
 # limpiar_events.py
 import json
+import os
 from pathlib import Path
 
 VAULT_DIR = Path(__file__).parent / "vault"
 EVENTS_DB = VAULT_DIR / "events.json"
+EVENTS_LOG = VAULT_DIR / "events.jsonl"
+
+DEFAULTS = {
+    "type": "FILE_INGEST",
+    "status": "OK",
+}
 
 def main():
-    if not EVENTS_DB.exists():
-        print("❌ events.json no existe.")
+    if not EVENTS_LOG.exists():
+        if EVENTS_DB.exists():
+            print("❌ events.jsonl no existe. Migra primero: python -m tools.migrate_events")
+        else:
+            print("❌ events.jsonl no existe.")
         return
 
-    with open(EVENTS_DB, "r", encoding="utf-8") as f:
-        try:
-            events = json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON inválido: {e}")
-            return
-
-    updated = False
-    for e in events:
-        if "type" not in e:
-            e["type"] = "FILE_INGEST"
-            updated = True
-        if "status" not in e:
-            e["status"] = "OK"
-            updated = True
+    # Relleno en streaming: línea a línea hacia un temporal y rename atómico
+    tmp = EVENTS_LOG.with_suffix(".jsonl.tmp")
+    updated = 0
+    with open(EVENTS_LOG, "rb") as src, open(tmp, "wb") as dst:
+        for lineno, line in enumerate(src, 1):
+            if not line.strip():
+                continue
+            if not line.endswith(b"\n"):
+                # Última línea incompleta (escritura interrumpida): se descarta
+                break
+            try:
+                e = json.loads(line)
+            except json.JSONDecodeError as err:
+                print(f"❌ JSON inválido en la línea {lineno}: {err}")
+                dst.close()
+                tmp.unlink()
+                return
+            missing = {k: v for k, v in DEFAULTS.items() if k not in e}
+            if missing:
+                e.update(missing)
+                updated += 1
+                line = (json.dumps(e, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+            dst.write(line)
+        dst.flush()
+        os.fsync(dst.fileno())
 
     if updated:
-        with open(EVENTS_DB, "w", encoding="utf-8") as f:
-            json.dump(events, f, indent=2)
-        print("✅ Campos faltantes rellenados.")
+        os.replace(tmp, EVENTS_LOG)
+        print(f"✅ Campos faltantes rellenados en {updated} eventos.")
     else:
+        tmp.unlink()
         print("⚠️ No se detectaron campos faltantes.")
 
 if __name__ == "__main__":
@@ -3,13 +3,11 @@ from core.engine import AeternaEngine
 from connectors.sql_connector import SQLConnector
 from connectors.normalizer import ForensicNormalizer
 from analytics.engine import AnalyticsEngine
-from i18n.manager import I18nManager
-from reports.pdf_generator import ForensicReport
+from core.export import export_events
 
 def run_aeterna_audit():
     # Identidad Única de la Auditoría
     SID = f"AUDIT-{uuid.uuid4().hex[:8].upper()}"
-    i18n = I18nManager("es")
     engine = AeternaEngine(SID) # Solución definitiva al TypeError
 
     print(f"\n[AETERNA-FS] SESIÓN INICIADA: {SID}")
@@ -24,16 +22,36 @@ def run_aeterna_audit():
     # Análisis
     results = AnalyticsEngine(clean).run_full_audit()
 
-    # Persistencia con el contrato 'detailed_findings'
+    # Persistencia: una raíz Merkle sobre las filas extraídas tal cual (sin
+    # la salida del análisis, para que cualquiera pueda recalcularla desde
+    # el origen) y un evento sólo por cada fila que el análisis marcó
     print("Sellando registros en la Bóveda...")
-    for record in results['detailed_findings']: # Solución definitiva al KeyError
-        engine.record_event("FORENSIC_ENTRY", record, meta=conn.get_context())
-
-    # Reporte
+    flagged_tx = {tx for p in results['patterns'] for tx in p['records']}
+    flagged_tx.update(
+        f['tx_id'] for f in results['detailed_findings'] # Contrato 'detailed_findings'
+        if f['is_outlier'] or f['is_robust_outlier']
+    )
+
+    sealed = engine.seal_dataset(
+        clean,
+        is_flagged=lambda record: record['tx_id'] in flagged_tx,
+        meta=conn.get_context(),
+        extra={"summary": results['summary'], "patterns": results['patterns']},
+    )
+    print(f"Raíz Merkle: {sealed['merkle_root'][:32]}... "
+          f"({sealed['leaf_count']} filas, {len(sealed['flagged'])} hallazgos sellados)")
+
+    # Reporte: el informe firmado y, junto a él, los eventos de la sesión
+    # exportados página a página (no se cargan todos en memoria)
     print("Generando Informe de Peritaje...")
-    with engine.vault as vault:
-        data = vault.fetch_all()
-        ForensicReport(i18n).generate(data, "REPORTE_AETERNA_PLATINUM.pdf")
+    report_path = engine.finalize_session(
+        {"customer": "Empresa auditada", "type": "Forensic", "scope": "transacciones"},
+        scope_status="COMPLETE",
+    )
+    events_path = report_path.replace(".pdf", ".events.ndjson")
+    export_events(engine.vault, events_path, "ndjson", session_id=SID)
+    print(f"Informe: {report_path}")
+    print(f"Eventos: {events_path}")
 
     print(f"\n[V] AUDITORÍA FINALIZADA CON ÉXITO. SID: {SID}")
 
@@ -0,0 +1,193 @@
+# payments/gateway.py
+# Stripe Checkout access for AETERNA-FS: session reuse, cached verification,
+# pooled HTTP client with timeouts.
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+# Sessions in a final state never change again; open ones are re-read sooner
+FINAL_TTL_SECONDS = 3600
+OPEN_TTL_SECONDS = 5
+# Do not hand out a checkout URL that is about to expire
+REUSE_MARGIN_SECONDS = 300
+
+
+class PaymentCheck(NamedTuple):
+    ok: bool
+    reason: str
+    payment_intent: Optional[str] = None
+
+
+def as_dict(obj) -> dict:
+    """Plain dict from a StripeObject (newer SDKs drop the dict interface)."""
+    if isinstance(obj, dict):
+        return obj
+    if hasattr(obj, "to_dict_recursive"):
+        return obj.to_dict_recursive()
+    return obj.to_dict()
+
+
+class SessionCache:
+    """Small thread-safe TTL cache of retrieved Checkout Sessions."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str):
+        with self._lock:
+            item = self._items.get(session_id)
+            if item is None:
+                return None
+            expires, session = item
+            if expires < time.monotonic():
+                del self._items[session_id]
+                return None
+            return session
+
+    def put(self, session, ttl: float):
+        with self._lock:
+            self._items[session["id"]] = (time.monotonic() + ttl, session)
+            self._items.move_to_end(session["id"])
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def discard(self, session_id: str):
+        with self._lock:
+            self._items.pop(session_id, None)
+
+
+class PaymentGateway:
+    def __init__(
+        self,
+        api_key: Optional[str],
+        public_url: str,
+        price_amount: int,
+        currency: str = "usd",
+        api_base: Optional[str] = None,
+        timeout: float = 10.0,
+        max_network_retries: int = 2,
+    ):
+        self.api_key = api_key
+        self.public_url = public_url
+        self.price_amount = price_amount
+        self.currency = currency
+        self.api_base = api_base
+        self.timeout = timeout
+        self.max_network_retries = max_network_retries
+        self.cache = SessionCache()
+        self._stripe = None
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def stripe(self):
+        """The stripe SDK, imported and configured on first use (keeps app startup fast)."""
+        if self._stripe is None:
+            with self._lock:
+                if self._stripe is None:
+                    import stripe
+
+                    stripe.api_key = self.api_key
+                    if self.api_base:
+                        # Local fake Stripe (tools/fake_stripe.py) for tests and benchmarks
+                        stripe.api_base = self.api_base
+                    stripe.max_network_retries = self.max_network_retries
+                    # requests.Session underneath: keep-alive connections are reused
+                    stripe.default_http_client = stripe.RequestsClient(timeout=self.timeout)
+                    self._stripe = stripe
+        return self._stripe
+
+    def construct_webhook_event(self, payload: bytes, sig_header: str, secret: str):
+        return self.stripe.Webhook.construct_event(
+            payload=payload,
+            sig_header=sig_header,
+            secret=secret,
+        )
+
+    # -----------------------------
+    # Sessions
+    # -----------------------------
+    def remember(self, session) -> dict:
+        session = as_dict(session)
+        ttl = OPEN_TTL_SECONDS if session.get("status") == "open" else FINAL_TTL_SECONDS
+        self.cache.put(session, ttl)
+        return session
+
+    def get_session(self, session_id: str, fresh: bool = False):
+        """The session from the cache, or from Stripe when missing or `fresh`."""
+        session = None if fresh else self.cache.get(session_id)
+        if session is None:
+            session = self.remember(self.stripe.checkout.Session.retrieve(session_id))
+        return session
+
+    def _reusable(self, session) -> bool:
+        expires_at = session.get("expires_at") or 0
+        return (
+            session.get("status") == "open"
+            and bool(session.get("url"))
+            and expires_at > time.time() + REUSE_MARGIN_SECONDS
+        )
+
+    def checkout(self, event_id: str, existing_session_id: Optional[str] = None):
+        """
+        Returns (session_id, url) for the event, reusing its open session
+        when there is one instead of creating a new one on every POST.
+        """
+        if existing_session_id:
+            try:
+                session = self.get_session(existing_session_id)
+                if self._reusable(session):
+                    return session["id"], session["url"]
+            except self.stripe.StripeError:
+                pass
+
+        created = self.stripe.checkout.Session.create(
+            payment_method_types=["card"],
+            line_items=[{
+                "price_data": {
+                    "currency": self.currency,
+                    "product_data": {
+                        "name": f"AETERNA - Integrity Reference Certificate - ID: {event_id[:8]}",
+                    },
+                    "unit_amount": self.price_amount,
+                },
+                "quantity": 1,
+            }],
+            mode="payment",
+            metadata={
+                "event_id": event_id,
+            },
+            success_url=f"{self.public_url}/paid/{event_id}?session_id={{CHECKOUT_SESSION_ID}}",
+            cancel_url=f"{self.public_url}/",
+        )
+        session = self.remember(created)
+        return session["id"], session["url"]
+
+    # -----------------------------
+    # Verification
+    # -----------------------------
+    def verify_payment(self, event: dict, session_id: str) -> PaymentCheck:
+        """
+        Checks that the event's checkout session was paid in full.
+        Events already marked paid locally (e.g. by the webhook) never
+        reach Stripe.
+        """
+        if event.get("paid"):
+            return PaymentCheck(True, "paid", event.get("payment_intent"))
+
+        # Only a paid copy is final. An open one cached by /pay predates the
+        # payment when the buyer is back from Checkout within OPEN_TTL_SECONDS
+        session = self.cache.get(session_id)
+        if session is None or session.get("payment_status") != "paid":
+            session = self.get_session(session_id, fresh=True)
+        if session.get("payment_status") != "paid":
+            return PaymentCheck(False, "unpaid")
+        if session.get("amount_total") != self.price_amount or session.get("currency") != self.currency:
+            return PaymentCheck(False, "amount_mismatch")
+        return PaymentCheck(True, "paid", session.get("payment_intent"))
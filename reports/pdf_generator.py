@@ -3,6 +3,17 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from datetime import datetime
+import base64
+import json
+
+# The report payload travels in the PDF Keywords entry so the PDF can be
+# verified on its own (tools/verify_report.py) without the companion JSON.
+PAYLOAD_MARKER = "aeterna-report-v1:"
+
+
+def encode_payload(data: dict) -> str:
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return PAYLOAD_MARKER + base64.b64encode(raw.encode("utf-8")).decode("ascii")
 
 
 def generate_audit_report(output_path: str, data: dict):
@@ -17,7 +28,8 @@ def generate_audit_report(output_path: str, data: dict):
         rightMargin=40,
         leftMargin=40,
         topMargin=40,
-        bottomMargin=40
+        bottomMargin=40,
+        keywords=encode_payload(data)
     )
 
     styles = getSampleStyleSheet()
@@ -0,0 +1,138 @@
+"""
+Round trip of batched RFC 3161 anchoring against tools/fake_tsa.py:
+flush the vault in several batches, verify every event, and make sure a
+tampered inclusion path or token is rejected.
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import base64
+import copy
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from core.engine import AeternaEngine
+from core.tsp import TSAClient, parse_token
+from core.vault_manager import VaultManager
+from core.witness import AnchorService
+from tools.fake_tsa import start_server
+
+EVENTS = 50
+MAX_BATCH = 16
+
+
+def _flip(hex_digest: str) -> str:
+    return ("0" if hex_digest[0] != "0" else "1") + hex_digest[1:]
+
+
+class AnchoringRoundTrip(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.fake = start_server()
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.vault = VaultManager(os.path.join(cls.tmp.name, "vault.db"))
+        engine = AeternaEngine("ANCHOR-TEST", vault=cls.vault)
+        cls.hashes = [engine.record_event("TEST", {"i": i}) for i in range(EVENTS)]
+
+        cls.client = TSAClient(cls.fake.url, hash_name="sha256", backoff=0.01)
+        cls.db_path = os.path.join(cls.tmp.name, "witness.db")
+        cls.service = AnchorService(cls.client, cls.db_path, max_batch=MAX_BATCH).follow(cls.vault)
+        # The first requests fail: the client has to retry them
+        cls.fake.fail_next = 2
+        cls.anchor_ids = cls.service.flush()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.tmp.cleanup()
+
+    def test_batches(self):
+        expected = -(-EVENTS // MAX_BATCH)
+        self.assertEqual(len(self.anchor_ids), expected)
+        self.assertEqual(self.fake.stats["timestamp"], expected)
+        self.assertEqual(self.fake.stats["failed"], 2)
+        stats = self.service.stats()
+        self.assertEqual(stats["anchored_hashes"], EVENTS)
+        self.assertEqual(stats["pending"], 0)
+        # Nothing new: a second flush does not call the TSA
+        self.assertEqual(self.service.flush(), [])
+
+    def test_every_event_verifies(self):
+        for event_hash in self.hashes:
+            result = self.service.verify(event_hash)
+            self.assertTrue(result["ok"], (event_hash, result))
+            self.assertTrue(result["anchored"])
+            proof = self.service.proof(event_hash)
+            self.assertTrue(self.fake.verify_token(base64.b64decode(proof["token"])))
+
+    def test_unknown_hash_is_not_anchored(self):
+        result = self.service.verify(_flip(self.hashes[0]))
+        self.assertFalse(result["ok"])
+        self.assertFalse(result["anchored"])
+
+    def test_tampered_path_is_rejected(self):
+        proof = self.service.proof(self.hashes[3])
+        self.assertTrue(proof["path"])
+        for step in range(len(proof["path"])):
+            tampered = copy.deepcopy(proof)
+            tampered["path"][step]["hash"] = _flip(tampered["path"][step]["hash"])
+            result = AnchorService.verify_proof(tampered)
+            self.assertFalse(result["included"])
+            self.assertFalse(result["ok"])
+
+        tampered = copy.deepcopy(proof)
+        tampered["path"][0]["side"] = "L" if proof["path"][0]["side"] == "R" else "R"
+        self.assertFalse(AnchorService.verify_proof(tampered)["ok"])
+
+        tampered = copy.deepcopy(proof)
+        tampered["event_hash"] = _flip(proof["event_hash"])
+        self.assertFalse(AnchorService.verify_proof(tampered)["ok"])
+
+    def test_tampered_token_is_rejected(self):
+        proof = self.service.proof(self.hashes[0])
+        token = base64.b64decode(proof["token"])
+
+        # A valid token, but for another batch's root
+        other = self.service.proof(self.hashes[-1])
+        self.assertNotEqual(other["anchor_id"], proof["anchor_id"])
+        swapped = dict(proof, token=other["token"])
+        result = AnchorService.verify_proof(swapped)
+        self.assertTrue(result["included"])
+        self.assertFalse(result["token_matches_root"])
+        self.assertFalse(result["ok"])
+
+        # Rewriting the stamped imprint breaks the match and the TSA signature
+        digest = parse_token(token)["digest"]
+        forged_digest = bytes([digest[0] ^ 1]) + digest[1:]
+        forged = token.replace(digest, forged_digest, 1)
+        self.assertNotEqual(forged, token)
+        result = AnchorService.verify_proof(dict(proof, token=base64.b64encode(forged).decode("ascii")))
+        self.assertFalse(result["token_matches_root"])
+        self.assertFalse(self.fake.verify_token(forged))
+
+    def test_tampered_store_is_rejected(self):
+        event_hash = self.hashes[7]
+        with sqlite3.connect(self.db_path) as conn:
+            (path,) = conn.execute(
+                "SELECT path FROM anchor_leaves WHERE event_hash = ?", (bytes.fromhex(event_hash),)
+            ).fetchone()
+            tampered = path[:1] + bytes([path[1] ^ 1]) + path[2:]
+            conn.execute(
+                "UPDATE anchor_leaves SET path = ? WHERE event_hash = ?", (tampered, bytes.fromhex(event_hash))
+            )
+        try:
+            self.assertFalse(self.service.verify(event_hash)["ok"])
+        finally:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute(
+                    "UPDATE anchor_leaves SET path = ? WHERE event_hash = ?", (path, bytes.fromhex(event_hash))
+                )
+        self.assertTrue(self.service.verify(event_hash)["ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+app.setup() on a fresh vault directory: events recorded by the CLI ingest
+(vault/events.jsonl, or an older vault/events.json array) are imported into
+events.db and indexed for /verify; records whose hash is not a SHA3-512
+hex digest are kept but left out of the index.
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import hashlib
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import app
+from aeterna.event_store import EventStore
+
+
+def cli_event(n: int) -> dict:
+    """Shaped like aeterna.ingest_file.build_event()."""
+    return {
+        "id": str(n),
+        "timestamp": f"2024-01-01T00:00:{n:02d}Z",
+        "type": "FILE_INGEST",
+        "file": f"doc{n}.pdf",
+        "hash": hashlib.sha3_512(f"doc{n}".encode()).hexdigest(),
+        "status": "OK",
+        "declared_by": "cli",
+        "purpose": "test",
+    }
+
+
+class SetupMigration(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.vault = Path(tmp.name) / "vault"
+        self.vault.mkdir()
+        patcher = mock.patch.multiple(
+            app,
+            BASE_DIR=Path(tmp.name),
+            VAULT_DIR=self.vault,
+            INGEST_DIR=self.vault / "ingest",
+            REPORTS_DIR=self.vault / "reports",
+            EVENTS_JSON=self.vault / "events.json",
+            EVENTS_LOG=self.vault / "events.jsonl",
+            EVENTS_DB_PATH=self.vault / "events.db",
+            ARCHIVE_DIR=self.vault / "archive",
+            VAULT_DB_PATH=self.vault / "aeterna_vault.db",
+            LOCKS_DIR=self.vault / "locks",
+            job_queue=None,
+            archive_store=None,
+            vault_manager=None,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.events = [cli_event(n) for n in range(1, 6)]
+
+    def assert_imported(self):
+        for event in self.events:
+            stored = app.get_event_by_id(event["id"])
+            self.assertEqual(stored["hash"], event["hash"])
+            self.assertFalse(stored["paid"])
+            found = app.find_events_by_digest(bytes.fromhex(event["hash"]))
+            self.assertEqual([e["id"] for e in found], [event["id"]])
+
+    def test_imports_events_jsonl(self):
+        with EventStore(self.vault / "events.jsonl") as store:
+            store.append_many(self.events)
+        app.setup()
+        self.assert_imported()
+        # A second boot imports nothing twice
+        app.setup()
+        self.assertEqual(len(app.find_events_by_digest(bytes.fromhex(self.events[0]["hash"]))), 1)
+
+    def test_falls_back_to_events_json(self):
+        (self.vault / "events.json").write_text(json.dumps(self.events), encoding="utf-8")
+        app.setup()
+        self.assert_imported()
+
+    def test_imports_next_to_web_events(self):
+        # A database that already holds web events and was migrated before
+        app.setup()
+        web = dict(cli_event(99), id="web-event")
+        app.insert_event(web)
+        with app.get_conn() as conn:
+            conn.execute("DELETE FROM setup_markers WHERE name = 'events_log_migrated'")
+        with EventStore(self.vault / "events.jsonl") as store:
+            store.append_many(self.events)
+        app.setup()
+        self.assert_imported()
+        self.assertEqual(app.get_event_by_id("web-event")["hash"], web["hash"])
+
+    def test_malformed_hashes_are_skipped(self):
+        bad = [dict(cli_event(n), id=f"bad-{n}", hash=h)
+               for n, h in enumerate(["not-hex", "ab" * 63, "zz" * 64, "AB" * 65], start=10)]
+        with EventStore(self.vault / "events.jsonl") as store:
+            store.append_many(self.events + bad)
+        with self.assertLogs("aeterna", "WARNING") as logs:
+            app.setup()
+        self.assertEqual({r.args[0] for r in logs.records}, {e["id"] for e in bad})
+        self.assert_imported()
+        # Kept as records, left out of the /verify index
+        for event in bad:
+            self.assertEqual(app.get_event_by_id(event["id"])["hash"], event["hash"])
+        with app.get_conn() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(1) FROM event_digests").fetchone()[0], len(self.events))
+
+        # A later boot does not fail on them either
+        with app.get_conn() as conn:
+            conn.execute("DELETE FROM setup_markers")
+        app.setup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+FileConnector reads CSV and Parquet exports in chunks and hashes the file
+in the same pass. The Parquet cases need pyarrow and are skipped without it.
+
+    python -m pytest tests
+"""
+import hashlib
+import os
+import tempfile
+import unittest
+
+import pytest
+
+from connectors.file_connector import FileConnector
+
+ROWS = 1000
+CHUNK_ROWS = 64
+
+
+def _sha3_512(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha3_512(f.read()).hexdigest()
+
+
+class FileConnectorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.rows = [{"tx_id": f"T{i:05d}", "amount": float(i) * 1.5} for i in range(ROWS)]
+
+    def _connector(self, path: str) -> FileConnector:
+        connector = FileConnector({"path": path, "dtypes": {"amount": "float"}, "chunk_rows": CHUNK_ROWS})
+        self.assertTrue(connector.connect())
+        self.addCleanup(connector.close)
+        return connector
+
+    def _write_parquet(self) -> str:
+        pytest.importorskip("pyarrow")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = os.path.join(self.tmp.name, "ledger.parquet")
+        # Several row groups, so the file is hashed group by group
+        pq.write_table(pa.Table.from_pylist(self.rows), path, row_group_size=ROWS // 4)
+        return path
+
+    def test_csv_rows_and_hash(self):
+        path = os.path.join(self.tmp.name, "ledger.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("tx_id,amount\n")
+            f.writelines(f"{r['tx_id']},{r['amount']}\n" for r in self.rows)
+        connector = self._connector(path)
+        self.assertEqual(connector.extract_data(), self.rows)
+        self.assertEqual(connector.get_context()["source_sha3_512"], _sha3_512(path))
+
+    def test_parquet_rows_and_hash(self):
+        path = self._write_parquet()
+        connector = self._connector(path)
+        chunks = list(connector.iter_chunks())
+        self.assertTrue(all(len(chunk) <= CHUNK_ROWS for chunk in chunks))
+        self.assertEqual([row for chunk in chunks for row in chunk], self.rows)
+        self.assertEqual(connector.rows_read, ROWS)
+        # Hashed while reading: nothing left for source_hash() to read
+        self.assertEqual(connector._hashed, connector.size)
+        self.assertEqual(connector.source_hash(), _sha3_512(path))
+
+    def test_parquet_early_stop(self):
+        path = self._write_parquet()
+        connector = self._connector(path)
+        chunks = connector.iter_chunks()
+        self.assertEqual(next(chunks), self.rows[:CHUNK_ROWS])
+        # Closing the generator unmaps the file while pyarrow has read from it
+        chunks.close()
+        self.assertEqual(connector.source_hash(), _sha3_512(path))
+        # A new pass starts over
+        self.assertEqual(connector.extract_data(), self.rows)
+        connector.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Purchase flow against tools/fake_stripe.py: a buyer who pays and comes
+back to /paid while /pay's cached copy of the session is still fresh
+(within OPEN_TTL_SECONDS) is sent on to the download.
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import hashlib
+import tempfile
+import unittest
+import uuid
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlsplit
+
+import app
+from payments.gateway import PaymentGateway
+from tools.fake_stripe import start_server
+
+
+class PaidRedirect(unittest.TestCase):
+    def setUp(self):
+        self.server, self.fake = start_server()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+
+        vault = Path(tmp.name) / "vault"
+        gateway = PaymentGateway("sk_test_fake", "http://testserver", app.PRICE_AMOUNT, api_base=self.fake.base_url)
+        patcher = mock.patch.multiple(
+            app,
+            gateway=gateway,
+            BASE_DIR=Path(tmp.name),
+            VAULT_DIR=vault,
+            INGEST_DIR=vault / "ingest",
+            REPORTS_DIR=vault / "reports",
+            EVENTS_JSON=vault / "events.json",
+            EVENTS_LOG=vault / "events.jsonl",
+            EVENTS_DB_PATH=vault / "events.db",
+            ARCHIVE_DIR=vault / "archive",
+            VAULT_DB_PATH=vault / "aeterna_vault.db",
+            LOCKS_DIR=vault / "locks",
+            job_queue=None,
+            archive_store=None,
+            vault_manager=None,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        app.setup()
+
+        self.event_id = str(uuid.uuid4())
+        app.insert_event({
+            "id": self.event_id,
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "file": "contract.pdf",
+            "hash": hashlib.sha3_512(b"contract").hexdigest(),
+            "declared_by": "tester",
+            "purpose": "test",
+            "paid": False,
+        })
+
+    def test_paid_within_open_ttl_redirects_to_download(self):
+        response = app.pay(self.event_id)
+        self.assertEqual(response.status_code, 303)
+        session_id = urlsplit(response.headers["location"]).path.rsplit("/", 1)[-1]
+        self.assertEqual(app.get_event_by_id(self.event_id)["session_id"], session_id)
+        # /pay left the open session in the gateway's cache
+        self.assertEqual(app.gateway.cache.get(session_id)["payment_status"], "unpaid")
+
+        # The buyer pays on the hosted page and comes straight back
+        self.fake.complete(session_id)
+        response = app.paid(self.event_id, session_id)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.headers["location"], f"/download/{self.event_id}")
+        event = app.get_event_by_id(self.event_id)
+        self.assertTrue(event["paid"])
+        self.assertTrue(event["payment_intent"].startswith("pi_test_"))
+
+        # Paid is final: once cached, Stripe is not asked again
+        retrieved = self.fake.stats["retrieve_session"]
+        self.assertTrue(app.gateway.verify_payment({"paid": False}, session_id).ok)
+        self.assertEqual(self.fake.stats["retrieve_session"], retrieved)
+
+    def test_unpaid_session_is_refused(self):
+        response = app.pay(self.event_id)
+        session_id = urlsplit(response.headers["location"]).path.rsplit("/", 1)[-1]
+        self.assertEqual(app.paid(self.event_id, session_id).status_code, 402)
+        self.assertFalse(app.get_event_by_id(self.event_id)["paid"])
+
+
+if __name__ == "__main__":
+    unittest.main()
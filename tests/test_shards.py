@@ -0,0 +1,91 @@
+"""
+Global anchor chain of the sharded vault: concurrent anchor() calls from
+several processes' worth of ShardedVault instances must never commit a
+shard head below one that is already anchored.
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from core.engine import AeternaEngine
+from core.shards import ShardedVault
+
+TENANTS = ("acme", "globex")
+EVENTS = 40
+ANCHORERS = 3
+
+
+class ShardAnchoring(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "shards")
+        self.anchor_db = os.path.join(self.tmp.name, "anchor_chain.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _sharded(self) -> ShardedVault:
+        return ShardedVault(self.root, self.anchor_db)
+
+    def _anchored(self) -> dict:
+        heights = {}
+        with sqlite3.connect(self.anchor_db) as conn:
+            for shard, height in conn.execute("SELECT shard, shard_height FROM anchor_log ORDER BY id"):
+                heights.setdefault(shard, []).append(height)
+        return heights
+
+    def test_unchanged_shards_are_not_anchored_again(self):
+        sharded = self._sharded()
+        engine = AeternaEngine("acme", vault=sharded.vault_for("acme"))
+        engine.record_event("TEST", {"i": 0})
+        self.assertEqual(sharded.anchor(), 1)
+        self.assertEqual(sharded.anchor(), 0)
+        # Another instance over the same files sees the same anchors
+        self.assertEqual(self._sharded().anchor(), 0)
+        engine.record_event("TEST", {"i": 1})
+        self.assertEqual(sharded.anchor(), 1)
+        self.assertEqual(self._anchored(), {"acme": [1, 2]})
+
+    def test_concurrent_anchoring_never_goes_back(self):
+        writer = self._sharded()
+        engines = [AeternaEngine(t, vault=writer.vault_for(t)) for t in TENANTS]
+        anchorers = [self._sharded() for _ in range(ANCHORERS)]
+        done = threading.Event()
+        errors = []
+
+        def anchor_loop(sharded):
+            try:
+                while not done.is_set():
+                    sharded.anchor()
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=anchor_loop, args=(s,)) for s in anchorers]
+        for t in threads:
+            t.start()
+        try:
+            for i in range(EVENTS):
+                for engine in engines:
+                    engine.record_event("TEST", {"i": i})
+        finally:
+            done.set()
+            for t in threads:
+                t.join()
+        self.assertEqual(errors, [])
+        anchorers[0].anchor()
+
+        heights = self._anchored()
+        for tenant in TENANTS:
+            self.assertEqual(heights[tenant], sorted(set(heights[tenant])), tenant)
+            self.assertEqual(heights[tenant][-1], EVENTS)
+            result = writer.verify_anchors(tenant)
+            self.assertTrue(result["ok"], result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Migration of a legacy (all-TEXT audit_log) vault into the compact layout.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from core.engine import AeternaEngine
+from core.vault_manager import GENESIS_HASH, VaultManager
+
+SESSIONS = ("LEGACY-A", "LEGACY-B")
+ROWS = 300
+
+LEGACY_SCHEMA = """
+    CREATE TABLE audit_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        event_type TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        prev_hash TEXT,
+        curr_hash TEXT NOT NULL,
+        signature TEXT NOT NULL,
+        metadata TEXT
+    )
+"""
+
+
+def make_legacy_vault(path: str, rows: int = ROWS) -> list:
+    """A vault as the pre-compact VaultManager wrote it; returns its records in order."""
+    engines = {session: AeternaEngine.__new__(AeternaEngine) for session in SESSIONS}
+    for session, engine in engines.items():
+        engine.session_id = session
+        engine.hw_id = "ab" * 64
+        engine.instance_fingerprint = "0123456789ab"
+    records = []
+    prev_hash = GENESIS_HASH
+    for i in range(rows):
+        engine = engines[SESSIONS[i % len(SESSIONS)]]
+        meta = {"connector": "legacy", "row": i} if i % 3 else None
+        record = engine._prepare_event("LEGACY", {"i": i, "text": "Peña"}, meta)(prev_hash)
+        records.append(record)
+        prev_hash = record[5]
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.executemany("""
+        INSERT INTO audit_log
+        (session_id, timestamp, event_type, payload, prev_hash, curr_hash, signature, metadata)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, records)
+    conn.commit()
+    conn.close()
+    return records
+
+
+def tables(path: str) -> set:
+    with sqlite3.connect(path) as conn:
+        return {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+class LegacyMigration(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "vault.db")
+        self.records = make_legacy_vault(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_migration_keeps_chain_and_events(self):
+        vault = VaultManager(self.path)
+        self.assertNotIn("audit_log", tables(self.path))
+        self.assertEqual(vault.verify_chain(), {"ok": True, "checked": ROWS, "failed_id": None})
+        self.assertEqual(vault.get_head(), (ROWS, self.records[-1][5]))
+        for session in SESSIONS:
+            expected = [r for r in self.records if r[0] == session]
+            self.assertEqual(vault.get_events_by_session(session), expected)
+
+        # Appending continues the migrated chain
+        new_hash = AeternaEngine(SESSIONS[0], vault=vault).record_event("AFTER", {"ok": True})
+        self.assertEqual(vault.get_head(), (ROWS + 1, new_hash))
+        self.assertTrue(vault.verify_chain()["ok"])
+
+        vault.vacuum()
+        self.assertTrue(vault.verify_chain()["ok"])
+
+    def test_concurrent_open_migrates_once(self):
+        errors, vaults = [], []
+        start = threading.Barrier(4)
+
+        def open_vault():
+            start.wait()
+            try:
+                vaults.append(VaultManager(self.path))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=open_vault) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(vaults[0].verify_chain()["checked"], ROWS)
+        self.assertEqual(len(vaults[0].get_events_by_session(SESSIONS[0])), ROWS // 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Group-commit writer: concurrent producers keep their order and the chain,
+a failing builder only fails its own caller, and submit() racing close()
+never leaves a caller waiting.
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+
+from core.engine import AeternaEngine
+from core.vault_manager import VaultManager
+from core.vault_writer import VaultWriter
+
+PRODUCERS = 6
+EVENTS = 60
+
+
+class VaultWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.vault = VaultManager(os.path.join(self.tmp.name, "vault.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _assert_chain(self, count: int):
+        result = self.vault.verify_chain()
+        self.assertTrue(result["ok"], result)
+        self.assertEqual(result["checked"], count)
+
+    def test_concurrent_producers(self):
+        results = {}
+        start = threading.Barrier(PRODUCERS)
+
+        def produce(writer, n):
+            engine = AeternaEngine(f"producer-{n}", writer=writer)
+            start.wait()
+            futures = [engine.submit_event("TEST", {"producer": n, "i": i}) for i in range(EVENTS)]
+            results[n] = [f.result(timeout=30) for f in futures]
+
+        with VaultWriter(self.vault) as writer:
+            threads = [threading.Thread(target=produce, args=(writer, n)) for n in range(PRODUCERS)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self._assert_chain(PRODUCERS * EVENTS)
+        for n in range(PRODUCERS):
+            events = self.vault.get_events_by_session(f"producer-{n}")
+            # Each producer's events were sealed in the order it submitted them
+            self.assertEqual([json.loads(e[3])["i"] for e in events], list(range(EVENTS)))
+            self.assertEqual([e[5] for e in events], results[n])
+
+    def test_failing_builder_fails_only_its_future(self):
+        engine = AeternaEngine("builders", vault=self.vault)
+
+        def broken(prev_hash):
+            raise ValueError("broken builder")
+
+        # A long delay puts all three in the same group commit
+        with VaultWriter(self.vault, max_delay=0.2) as writer:
+            before = writer.submit(engine._prepare_event("TEST", {"i": 0}))
+            failing = writer.submit(broken)
+            after = writer.submit(engine._prepare_event("TEST", {"i": 1}))
+
+            self.assertRaises(ValueError, failing.result, 30)
+            sealed = [before.result(timeout=30), after.result(timeout=30)]
+
+        self._assert_chain(2)
+        events = self.vault.get_events_by_session("builders")
+        self.assertEqual([e[5] for e in events], sealed)
+
+    def test_submit_racing_close(self):
+        for _ in range(20):
+            writer = VaultWriter(self.vault).start()
+            engine = AeternaEngine("race", writer=writer)
+            futures, refused = [], []
+            start = threading.Barrier(4)
+
+            def produce():
+                start.wait()
+                for i in range(200):
+                    try:
+                        futures.append(engine.submit_event("TEST", {"i": i}))
+                    except RuntimeError:
+                        refused.append(i)
+                        return
+
+            threads = [threading.Thread(target=produce) for _ in range(3)]
+            for t in threads:
+                t.start()
+            start.wait()
+            time.sleep(random.random() * 0.001)
+            writer.close()
+            for t in threads:
+                t.join()
+
+            # Every accepted event is sealed: none is dropped or left pending
+            for future in futures:
+                self.assertIsNotNone(future.result(timeout=5))
+            self.assertRaises(RuntimeError, engine.submit_event, "TEST", {})
+
+        self._assert_chain(len(self.vault.get_events_by_session("race")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Batched RFC 3161 anchoring of the audit vault.
+
+Every event hash in the vault is committed to a Time-Stamp Authority
+through the Merkle root of its batch: one TSA request per batch, and a
+stored inclusion path per event.
+
+Usage:
+    AETERNA_TSA_URL=https://tsa.example/tsr python -m tools.anchor_vault run [--interval 60]
+    python -m tools.anchor_vault flush
+    python -m tools.anchor_vault proof <event_hash> [--token-out batch.tst]
+    python -m tools.anchor_vault verify <event_hash>
+    python -m tools.anchor_vault stats
+
+The token is the TSA's own DER and stamps the batch root, so it can be
+checked independently of this code:
+    openssl ts -verify -token_in -in batch.tst -digest <merkle_root> -CAfile tsa-chain.pem
+"""
+import argparse
+import base64
+import json
+import sys
+import threading
+
+from core.tsp import TSAClient
+from core.vault_manager import VaultManager
+from core.witness import ANCHOR_DB, ANCHOR_INTERVAL, ANCHOR_MAX_BATCH, TSA_HASH, TSA_URL, AnchorService
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tools.anchor_vault")
+    parser.add_argument("--tsa-url", default=TSA_URL, help="RFC 3161 endpoint (AETERNA_TSA_URL)")
+    parser.add_argument("--hash", default=TSA_HASH, choices=["sha3_512", "sha512", "sha256"],
+                        help="Imprint hash the TSA accepts")
+    parser.add_argument("--vault", default="vault/aeterna_vault.db")
+    parser.add_argument("--db", default=ANCHOR_DB, help="Anchor store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Anchor new events until interrupted")
+    run.add_argument("--interval", type=float, default=ANCHOR_INTERVAL)
+    run.add_argument("--max-batch", type=int, default=ANCHOR_MAX_BATCH)
+    flush = sub.add_parser("flush", help="Anchor every event not anchored yet, then exit")
+    flush.add_argument("--max-batch", type=int, default=ANCHOR_MAX_BATCH)
+    proof = sub.add_parser("proof")
+    proof.add_argument("event_hash")
+    proof.add_argument("--token-out", help="Also write the DER token, for openssl ts -verify -token_in")
+    sub.add_parser("verify").add_argument("event_hash")
+    sub.add_parser("stats")
+
+    args = parser.parse_args()
+    if args.command in ("run", "flush") and not args.tsa_url:
+        parser.error("--tsa-url or AETERNA_TSA_URL is required")
+    # Reading proofs does not talk to the TSA
+    client = TSAClient(args.tsa_url, hash_name=args.hash) if args.tsa_url else None
+    service = AnchorService(client, args.db, max_batch=getattr(args, "max_batch", ANCHOR_MAX_BATCH))
+
+    if args.command == "run":
+        service.interval = args.interval
+        service.follow(VaultManager(args.vault)).start()
+        print(f"Anchoring {args.vault} to {args.tsa_url} every {args.interval:g}s")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            service.stop()
+        result = service.stats()
+    elif args.command == "flush":
+        anchors = service.follow(VaultManager(args.vault)).flush()
+        result = dict(service.stats(), new_anchors=anchors)
+    elif args.command == "proof":
+        result = service.proof(args.event_hash)
+        if result is None:
+            print(json.dumps({"error": "not anchored"}))
+            sys.exit(1)
+        if args.token_out:
+            with open(args.token_out, "wb") as f:
+                f.write(base64.b64decode(result["token"]))
+    elif args.command == "verify":
+        result = service.verify(args.event_hash)
+    else:
+        result = service.stats()
+
+    print(json.dumps(result, indent=2))
+    if args.command == "verify" and not result["ok"]:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Retention for vault/ingest and vault/reports.
+
+Files untouched for longer than the policy age move into compressed,
+content-addressed packs under vault/archive; /download and
+tools.verify_report restore them on demand, evidence packages read them
+straight from the packs.
+
+Usage:
+    python -m tools.archive_vault run [--older-than 90d] [--dry-run] [dir ...]
+    python -m tools.archive_vault restore <path>... | --all
+    python -m tools.archive_vault stats
+    python -m tools.archive_vault verify
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from core.archive import DEFAULT_ROOT, ArchiveStore
+
+VAULT_DIR = Path(__file__).parent.parent / "vault"
+DEFAULT_DIRS = [VAULT_DIR / "ingest", VAULT_DIR / "reports"]
+DEFAULT_AGE = os.getenv("AETERNA_RETENTION_AGE", "90d")
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_age(value: str) -> float:
+    """'90d', '12h', '30m', '45s', '2w' or plain seconds."""
+    value = value.strip().lower()
+    try:
+        if value and value[-1] in UNITS:
+            return float(value[:-1]) * UNITS[value[-1]]
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid age: {value!r}") from None
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tools.archive_vault")
+    parser.add_argument("--root", default=str(DEFAULT_ROOT), help="Archive directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Archive files older than the policy age")
+    run.add_argument("dirs", nargs="*", default=[str(d) for d in DEFAULT_DIRS])
+    run.add_argument("--older-than", type=parse_age, default=parse_age(DEFAULT_AGE))
+    run.add_argument("--dry-run", action="store_true")
+
+    restore = sub.add_parser("restore", help="Put archived files back in place")
+    restore.add_argument("paths", nargs="*")
+    restore.add_argument("--all", action="store_true", help="Every archived file not on disk")
+
+    sub.add_parser("stats")
+    sub.add_parser("verify", help="Check every archived blob against its digest")
+
+    args = parser.parse_args()
+    store = ArchiveStore(args.root)
+
+    if args.command == "run":
+        dirs = [d for d in args.dirs if os.path.isdir(d)]
+        result = store.archive_older_than(dirs, args.older_than, dry_run=args.dry_run)
+        result["dry_run"] = args.dry_run
+    elif args.command == "restore":
+        if not args.paths and not args.all:
+            parser.error("restore needs paths or --all")
+        paths = list(store.archived_paths(missing_only=True)) if args.all else args.paths
+        result = store.restore_many(paths)
+    elif args.command == "stats":
+        result = store.stats()
+    else:
+        result = store.verify()
+
+    print(json.dumps(result, indent=2))
+    if args.command == "verify" and not result["ok"]:
+        sys.exit(2)
+    if args.command == "restore" and result["missing"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Startup benchmark: how long a fresh interpreter takes to import the app.
+
+Each run is a new process (what a uvicorn worker or a Railway restart pays).
+Also lists the slowest modules from `python -X importtime` and flags any
+module that should stay lazy but was imported eagerly.
+
+Usage:
+    python -m tools.bench_startup [--runs 10] [--module app] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+
+# Must not be imported until first use
+LAZY_MODULES = ["stripe", "reportlab", "reports.pdf_generator"]
+
+
+def time_import(module: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", f"import {module}"],
+        cwd=BASE_DIR, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def import_profile(module: str) -> list:
+    """(cumulative_us, module) for every module imported, from -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, check=True, capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tools.bench_startup")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # Warm the filesystem cache and .pyc files first
+    time_import(args.module)
+    samples = [time_import(args.module) for _ in range(args.runs)]
+    print(f"import {args.module}: {args.runs} runs (fresh interpreter, includes ~{os.path.basename(sys.executable)} boot)")
+    print(f"  median {statistics.median(samples) * 1000:.1f} ms   "
+          f"min {min(samples) * 1000:.1f} ms   max {max(samples) * 1000:.1f} ms")
+
+    rows = import_profile(args.module)
+    print(f"\nSlowest imports (cumulative):")
+    for cumulative, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    imported = {name for _, name in rows}
+    eager = [m for m in LAZY_MODULES if m in imported]
+    if eager:
+        print(f"\n[!] Imported eagerly, should be lazy: {', '.join(eager)}")
+        sys.exit(2)
+    print("\nLazy modules not loaded at import time: " + ", ".join(LAZY_MODULES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Reclaims free space in the audit vault, e.g. the pages the legacy
+audit_log table left behind once it was migrated to the compact layout.
+
+Usage:
+    python -m tools.compact_vault [vault/aeterna_vault.db]
+
+VACUUM rewrites the whole file and blocks writers while it runs: stop the
+web workers (or run it in a maintenance window) first.
+"""
+import json
+import os
+import sys
+
+from core.vault_manager import VaultManager
+
+DEFAULT_VAULT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vault", "aeterna_vault.db")
+
+
+def main():
+    if len(sys.argv) > 2:
+        print("Usage: python -m tools.compact_vault [vault.db]")
+        sys.exit(1)
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_VAULT
+    if not os.path.exists(path):
+        print(f"{path} does not exist")
+        sys.exit(1)
+
+    before = os.path.getsize(path)
+    # Opening it also applies a pending legacy migration
+    vault = VaultManager(path)
+    vault.vacuum()
+    print(json.dumps({"vault": path, "bytes_before": before, "bytes_after": os.path.getsize(path)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Evidence package for one case: a ZIP with the certificate, the ingested
+file, the event record, the vault rows of the session, its reports and
+connector sources, plus manifest.json with the SHA3-512 of every member.
+
+Usage:
+    python -m tools.evidence_package <case_id> [-o package.zip]
+    python -m tools.evidence_package <case_id> -o - | ssh counsel 'cat > case.zip'
+
+The case id is a web event id (vault/events.db) or an audit session id
+(vault/aeterna_vault.db); both are looked up. Archived files are read
+straight from their packs. A certificate that was never rendered is listed
+as missing; GET /admin/evidence/<id>.zip renders it first.
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+from core.archive import DEFAULT_ROOT, ArchiveStore
+from core.evidence import MANIFEST_NAME, case_members, stream_package
+from core.files import atomic_output
+from core.vault_manager import VaultManager
+
+BASE_DIR = Path(__file__).parent.parent
+VAULT_DIR = BASE_DIR / "vault"
+
+
+def load_event(db_path: Path, event_id: str):
+    """The web event with that id, as app.row_to_event returns it, or None."""
+    if not db_path.exists():
+        return None
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute("SELECT * FROM events WHERE id = ?", (event_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    event = dict(row)
+    event["paid"] = bool(event["paid"])
+    return event
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tools.evidence_package")
+    parser.add_argument("case_id")
+    parser.add_argument("-o", "--output", help="Output file, or - for stdout (default: aeterna_evidence_<case_id>.zip)")
+    parser.add_argument("--events-db", default=str(VAULT_DIR / "events.db"))
+    parser.add_argument("--vault", default=str(VAULT_DIR / "aeterna_vault.db"))
+    parser.add_argument("--archive", default=str(DEFAULT_ROOT))
+    args = parser.parse_args()
+
+    members = case_members(
+        args.case_id,
+        VaultManager(args.vault),
+        base=BASE_DIR,
+        archive=ArchiveStore.open_existing(args.archive, BASE_DIR),
+        event=load_event(Path(args.events_db), args.case_id),
+    )
+    if not members:
+        print(f"Unknown case: {args.case_id}", file=sys.stderr)
+        sys.exit(1)
+
+    chunks = stream_package(members, {"case_id": args.case_id})
+    if args.output == "-":
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
+        return
+
+    output = Path(args.output or f"aeterna_evidence_{Path(args.case_id).name}.zip")
+    written = 0
+    with atomic_output(output) as tmp_path, open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+    missing = sum(1 for m in members if m.chunks is None)
+    print(json.dumps({"output": str(output), "bytes": written, "members": len(members) - missing,
+                      "missing": missing, "manifest": MANIFEST_NAME}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
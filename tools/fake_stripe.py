@@ -0,0 +1,209 @@
+"""
+Local stand-in for the Stripe Checkout API, for tests and benchmarks.
+
+Implements just what AETERNA-FS uses:
+    POST /v1/checkout/sessions            create a session
+    GET  /v1/checkout/sessions/{id}       retrieve a session
+    GET  /checkout/{id}                   "hosted page": pays and redirects to success_url
+    POST /_fake/sessions/{id}/complete    marks paid and delivers a signed webhook
+    GET  /_fake/stats                     request counters per route
+
+Usage:
+    python -m tools.fake_stripe --port 12111 \\
+        --webhook-url http://localhost:8000/stripe/webhook --webhook-secret whsec_test
+    STRIPE_API_BASE=http://localhost:12111 STRIPE_SECRET_KEY=sk_test_fake uvicorn app:app
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import threading
+import time
+import urllib.request
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+def sign_webhook(payload: bytes, secret: str, timestamp: int = None) -> str:
+    """Stripe-Signature header value for a webhook payload."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signed = f"{timestamp}.".encode() + payload
+    v1 = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={v1}"
+
+
+def parse_form(body: str) -> dict:
+    """Decodes Stripe's bracketed form encoding (a[b][0][c]=v) into nested dicts."""
+    root = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        parts = key.replace("]", "").split("[")
+        node = root
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return root
+
+
+class FakeStripe:
+    def __init__(self, base_url: str, webhook_url: str = None, webhook_secret: str = None):
+        self.base_url = base_url
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.sessions = {}
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def create_session(self, params: dict) -> dict:
+        items = params.get("line_items", {})
+        amount = 0
+        currency = "usd"
+        for item in items.values():
+            price = item.get("price_data", {})
+            amount += int(price.get("unit_amount", 0)) * int(item.get("quantity", 1))
+            currency = price.get("currency", currency)
+        session_id = f"cs_test_{uuid.uuid4().hex}"
+        session = {
+            "id": session_id,
+            "object": "checkout.session",
+            "mode": params.get("mode", "payment"),
+            "status": "open",
+            "payment_status": "unpaid",
+            "amount_total": amount,
+            "currency": currency,
+            "metadata": params.get("metadata", {}),
+            "payment_intent": None,
+            "success_url": params.get("success_url"),
+            "cancel_url": params.get("cancel_url"),
+            "url": f"{self.base_url}/checkout/{session_id}",
+            "created": int(time.time()),
+            "expires_at": int(time.time()) + 24 * 3600,
+        }
+        with self.lock:
+            self.sessions[session_id] = session
+        return session
+
+    def complete(self, session_id: str) -> dict:
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            if session["payment_status"] != "paid":
+                session.update({
+                    "status": "complete",
+                    "payment_status": "paid",
+                    "payment_intent": f"pi_test_{uuid.uuid4().hex[:24]}",
+                })
+            session = dict(session)
+        if self.webhook_url and self.webhook_secret:
+            self.deliver_webhook(session)
+        return session
+
+    def deliver_webhook(self, session: dict):
+        payload = json.dumps({
+            "id": f"evt_test_{uuid.uuid4().hex}",
+            "object": "event",
+            "type": "checkout.session.completed",
+            "created": int(time.time()),
+            "data": {"object": session},
+        }).encode()
+        req = urllib.request.Request(
+            self.webhook_url,
+            data=payload,
+            headers={
+                "Content-Type": "application/json",
+                "Stripe-Signature": sign_webhook(payload, self.webhook_secret),
+            },
+        )
+        try:
+            urllib.request.urlopen(req, timeout=10).read()
+        except Exception as e:
+            print(f"[fake-stripe] webhook delivery failed: {e}")
+
+
+def make_handler(fake: FakeStripe):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status: int, body: dict = None, headers: dict = None):
+            data = json.dumps(body).encode() if body is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Request-Id", f"req_{uuid.uuid4().hex[:14]}")
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _not_found(self):
+            self._send(404, {"error": {"type": "invalid_request_error", "message": "No such resource"}})
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            parts = path.strip("/").split("/")
+            if path.startswith("/v1/checkout/sessions/") and len(parts) == 4:
+                fake.stats["retrieve_session"] += 1
+                session = fake.sessions.get(parts[3])
+                return self._send(200, session) if session else self._not_found()
+            if path.startswith("/checkout/") and len(parts) == 2:
+                fake.stats["hosted_checkout"] += 1
+                session = fake.complete(parts[1])
+                if not session:
+                    return self._not_found()
+                location = session["success_url"].replace("{CHECKOUT_SESSION_ID}", session["id"])
+                return self._send(303, None, {"Location": location})
+            if path == "/_fake/stats":
+                return self._send(200, dict(fake.stats))
+            self._not_found()
+
+        def do_POST(self):
+            path = urlsplit(self.path).path
+            parts = path.strip("/").split("/")
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode() if length else ""
+            if path == "/v1/checkout/sessions":
+                fake.stats["create_session"] += 1
+                return self._send(200, fake.create_session(parse_form(body)))
+            if path.startswith("/_fake/sessions/") and parts[-1] == "complete" and len(parts) == 4:
+                fake.stats["complete_session"] += 1
+                session = fake.complete(parts[2])
+                return self._send(200, session) if session else self._not_found()
+            self._not_found()
+
+    return Handler
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0,
+                 webhook_url: str = None, webhook_secret: str = None):
+    """Starts the fake in a daemon thread; returns (server, fake). Port 0 picks a free one."""
+    server = ThreadingHTTPServer((host, port), None)
+    fake = FakeStripe(f"http://{host}:{server.server_address[1]}", webhook_url, webhook_secret)
+    server.RequestHandlerClass = make_handler(fake)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-stripe", daemon=True).start()
+    return server, fake
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tools.fake_stripe")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--webhook-url", default=None)
+    parser.add_argument("--webhook-secret", default=None)
+    args = parser.parse_args()
+
+    server, fake = start_server(args.host, args.port, args.webhook_url, args.webhook_secret)
+    print(f"Fake Stripe listening on {fake.base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Local stand-in for an RFC 3161 Time-Stamp Authority, for tests and benchmarks.
+
+Answers TimeStampReq messages POSTed to any path with a DER TimeStampResp.
+The token has the real CMS SignedData / TSTInfo layout, but its signature
+is an HMAC-SHA256 over the TSTInfo under a local key instead of an X.509
+signature: enough to exercise the client, not a trusted timestamp.
+
+    POST /                       timestamp a request
+    POST /_fake/fail?count=N     answer the next N requests with 503
+    GET  /_fake/stats            request counters
+
+Usage:
+    python -m tools.fake_tsa --port 13180
+    AETERNA_TSA_URL=http://localhost:13180/ python -m tools.anchor_vault run
+"""
+import argparse
+import hashlib
+import hmac
+import itertools
+import json
+import secrets
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from core.tsp import (
+    CONTENT_TYPE_QUERY, CONTENT_TYPE_REPLY, HASH_OIDS, OID_HASHES, OID_SIGNED_DATA, OID_TST_INFO,
+    TAG_CONTEXT_0, TAG_UTF8_STRING, TSAError, algorithm_identifier, children, der_generalized_time,
+    der_integer, der_octets, der_oid, der_sequence, der_set, parse_request, parse_token, read_tlv, tlv,
+)
+
+# Test policy arc and the HMAC signature algorithm OID
+DEFAULT_POLICY = "1.3.6.1.4.1.99999.3161.1"
+OID_HMAC_SHA256 = "1.2.840.113549.2.9"
+
+
+def status_info(status: int, text: str = None) -> bytes:
+    fields = [der_integer(status)]
+    if text:
+        fields.append(der_sequence(tlv(TAG_UTF8_STRING, text.encode("utf-8"))))
+    return der_sequence(*fields)
+
+
+class FakeTSA:
+    def __init__(self, key: bytes = None, policy: str = DEFAULT_POLICY):
+        self.key = key or secrets.token_bytes(32)
+        self.policy = policy
+        self.url = None
+        self.stats = Counter()
+        self.fail_next = 0
+        self.lock = threading.Lock()
+        self._serials = itertools.count(1)
+
+    def tst_info(self, request: dict, hash_name: str) -> bytes:
+        fields = [
+            der_integer(1),
+            der_oid(request["policy"] or self.policy),
+            der_sequence(algorithm_identifier(hash_name), der_octets(request["digest"])),
+            der_integer(next(self._serials)),
+            der_generalized_time(datetime.now(timezone.utc)),
+        ]
+        if request["nonce"] is not None:
+            fields.append(der_integer(request["nonce"]))
+        return der_sequence(*fields)
+
+    def token(self, tst: bytes) -> bytes:
+        signer = der_sequence(
+            der_integer(1),
+            der_sequence(der_sequence(), der_integer(1)),   # issuerAndSerialNumber
+            algorithm_identifier("sha256"),
+            der_sequence(der_oid(OID_HMAC_SHA256)),
+            der_octets(hmac.new(self.key, tst, hashlib.sha256).digest()),
+        )
+        signed_data = der_sequence(
+            der_integer(3),
+            der_set(algorithm_identifier("sha256")),
+            der_sequence(der_oid(OID_TST_INFO), tlv(TAG_CONTEXT_0, der_octets(tst))),
+            der_set(signer),
+        )
+        return der_sequence(der_oid(OID_SIGNED_DATA), tlv(TAG_CONTEXT_0, signed_data))
+
+    def respond(self, body: bytes) -> bytes:
+        try:
+            request = parse_request(body)
+        except (TSAError, IndexError, ValueError):
+            return der_sequence(status_info(2, "badDataFormat"))
+        hash_name = OID_HASHES.get(request["hash_oid"])
+        if hash_name is None:
+            return der_sequence(status_info(2, "badAlg"))
+        if len(request["digest"]) != hashlib.new(hash_name).digest_size:
+            return der_sequence(status_info(2, "badDataFormat"))
+        with self.lock:
+            tst = self.tst_info(request, hash_name)
+        return der_sequence(status_info(0), self.token(tst))
+
+    def verify_token(self, token: bytes) -> bool:
+        """Checks the HMAC this fake put on a token."""
+        parse_token(token)
+        _, info, _ = read_tlv(token)
+        _, signed_data, _ = read_tlv(children(info)[1][1])
+        signed = children(signed_data)
+        _, tst, _ = read_tlv(children(signed[2][1])[1][1])
+        signer = children(children(signed[-1][1])[0][1])
+        expected = hmac.new(self.key, tst, hashlib.sha256).digest()
+        return hmac.compare_digest(signer[-1][1], expected)
+
+
+def make_handler(fake: FakeTSA):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status: int, data: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if urlsplit(self.path).path == "/_fake/stats":
+                return self._send(200, json.dumps(dict(fake.stats)).encode(), "application/json")
+            self._send(404, b"", "text/plain")
+
+        def do_POST(self):
+            parts = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            if parts.path == "/_fake/fail":
+                count = int(parse_qs(parts.query).get("count", ["1"])[0])
+                with fake.lock:
+                    fake.fail_next = count
+                return self._send(200, b"", "text/plain")
+            with fake.lock:
+                failing = fake.fail_next > 0
+                if failing:
+                    fake.fail_next -= 1
+            if failing:
+                fake.stats["failed"] += 1
+                return self._send(503, b"", "text/plain")
+            if self.headers.get("Content-Type") != CONTENT_TYPE_QUERY:
+                fake.stats["bad_request"] += 1
+                return self._send(415, b"", "text/plain")
+            fake.stats["timestamp"] += 1
+            self._send(200, fake.respond(body), CONTENT_TYPE_REPLY)
+
+    return Handler
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, key: bytes = None):
+    """Starts the fake in a daemon thread; returns (server, fake). Port 0 picks a free one."""
+    fake = FakeTSA(key)
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    fake.url = f"http://{host}:{server.server_address[1]}/"
+    threading.Thread(target=server.serve_forever, name="fake-tsa", daemon=True).start()
+    return server, fake
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tools.fake_tsa")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=13180)
+    args = parser.parse_args()
+
+    server, fake = start_server(args.host, args.port)
+    print(f"Fake TSA listening on {fake.url} (hashes: {', '.join(sorted(HASH_OIDS))})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
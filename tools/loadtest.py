@@ -0,0 +1,526 @@
+"""
+End-to-end load test of the purchase flow, with Stripe replaced by
+tools/fake_stripe.py so no network is needed.
+
+Virtual users (threads, one keep-alive connection each) pick routes from a
+weighted mix, following the state a real buyer would have:
+
+    preview    upload a file (size drawn from --sizes)     -> event
+    pay        POST /pay/{id}, Checkout Session created     -> session
+    paid       complete the session, GET /paid/{id}        -> paid event
+    webhook    complete the session, POST a signed
+               checkout.session.completed to /stripe/webhook
+    download   GET /download/{id} of a paid event
+
+Reports throughput, p50/p95/p99 latency, status codes and error rate per
+route, plus CPU, RSS, threads and open files of the server process (and
+its worker children) sampled from /proc.
+
+Usage:
+    # spawn a server wired to an in-process fake Stripe
+    python -m tools.loadtest --spawn --workers 2 --duration 30 --concurrency 16
+
+    # or drive a running one started with
+    #   STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_load \\
+    #   STRIPE_WEBHOOK_SECRET=whsec_load uvicorn app:app --port 8000
+    python -m tools.loadtest --url http://127.0.0.1:8000 --pid <uvicorn pid>
+
+A spawned server writes to vault/ like any local run.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from tools.fake_stripe import sign_webhook, start_server
+
+BASE_DIR = Path(__file__).parent.parent
+
+ROUTES = ["preview", "pay", "paid", "webhook", "download"]
+DEFAULT_MIX = "preview=30,pay=20,paid=15,webhook=10,download=25"
+DEFAULT_SIZES = "1k=50,64k=30,1m=15,8m=5"
+EXPECTED_STATUS = {
+    "preview": {200},
+    "pay": {303},
+    "paid": {302},
+    "webhook": {200},
+    "download": {200, 304},
+}
+SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 * 1024}
+PAY_LINK = re.compile(r'/pay/([0-9a-f-]{36})')
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def parse_weights(spec: str, convert=str) -> list:
+    """'a=3,b=1' -> [(convert('a'), 3.0), (convert('b'), 1.0)]."""
+    weights = []
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition("=")
+        weights.append((convert(name.strip()), float(weight or 1)))
+    if not weights or sum(w for _, w in weights) <= 0:
+        raise argparse.ArgumentTypeError(f"Empty weights: {spec!r}")
+    return weights
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower().rstrip("b")
+    unit = value[-1] if value and value[-1] in SIZE_UNITS else ""
+    return int(float(value[:len(value) - len(unit)]) * SIZE_UNITS[unit])
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+# -----------------------------
+# Shared state
+# -----------------------------
+class Pools:
+    """Events at each step of the flow, shared by all virtual users."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.unpaid = []        # event ids without a session
+        self.with_session = []  # (event_id, session_id)
+        self.paid = []          # (event_id, via_webhook)
+
+    def take(self, name: str):
+        with self.lock:
+            pool = getattr(self, name)
+            if not pool:
+                return None
+            return pool.pop(random.randrange(len(pool)))
+
+    def put(self, name: str, item):
+        with self.lock:
+            getattr(self, name).append(item)
+
+    def pick_paid(self):
+        with self.lock:
+            return random.choice(self.paid) if self.paid else None
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+        self.not_ready = Counter()
+        self.sent = Counter()
+        self.received = Counter()
+
+    def record(self, route: str, elapsed: float, status, sent: int = 0, received: int = 0,
+               error: bool = False, not_ready: bool = False):
+        with self.lock:
+            self.latencies[route].append(elapsed)
+            self.statuses[route][status] += 1
+            self.sent[route] += sent
+            self.received[route] += received
+            if error:
+                self.errors[route] += 1
+            if not_ready:
+                self.not_ready[route] += 1
+
+    def report(self, duration: float) -> dict:
+        routes = {}
+        for route in ROUTES:
+            samples = sorted(self.latencies.get(route, []))
+            if not samples:
+                continue
+            count = len(samples)
+            routes[route] = {
+                "requests": count,
+                "rps": round(count / duration, 2),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+                "error_rate": round(self.errors[route] / count, 4),
+                "not_ready": self.not_ready[route],
+                "statuses": {str(k): v for k, v in sorted(self.statuses[route].items(), key=str)},
+                "sent_bytes": self.sent[route],
+                "received_bytes": self.received[route],
+            }
+        total = sum(r["requests"] for r in routes.values())
+        errors = sum(self.errors.values())
+        return {
+            "duration_s": round(duration, 2),
+            "requests": total,
+            "rps": round(total / duration, 2) if duration else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "routes": routes,
+        }
+
+
+# -----------------------------
+# Server resources
+# -----------------------------
+def process_tree(pid: int) -> list:
+    """pid and its descendants (uvicorn --workers forks children)."""
+    pids = [pid]
+    i = 0
+    while i < len(pids):
+        try:
+            for task in os.listdir(f"/proc/{pids[i]}/task"):
+                with open(f"/proc/{pids[i]}/task/{task}/children") as f:
+                    pids.extend(int(p) for p in f.read().split())
+        except OSError:
+            pass
+        i += 1
+    return pids
+
+
+def read_proc(pid: int):
+    """(cpu_seconds, rss_bytes, threads, open_fds) or None if the process is gone."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the parenthesised command name
+            fields = f.read().rsplit(")", 1)[1].split()
+        fds = len(os.listdir(f"/proc/{pid}/fd"))
+    except OSError:
+        return None
+    cpu = (int(fields[11]) + int(fields[12])) / CLK_TCK
+    return cpu, int(fields[21]) * PAGE_SIZE, int(fields[17]), fds
+
+
+class ResourceSampler:
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []   # (time, cpu_seconds, rss, threads, fds, processes)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loadtest-sampler", daemon=True)
+
+    def sample(self):
+        totals = [0.0, 0, 0, 0]
+        procs = 0
+        for pid in process_tree(self.pid):
+            usage = read_proc(pid)
+            if usage is None:
+                continue
+            procs += 1
+            for i, value in enumerate(usage):
+                totals[i] += value
+        if procs:
+            self.samples.append((time.monotonic(), *totals, procs))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self._thread.start()
+        return self
+
+    def stop(self) -> dict:
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+        if len(self.samples) < 2:
+            return {}
+        first, last = self.samples[0], self.samples[-1]
+        cpu_pct = [
+            100 * (b[1] - a[1]) / (b[0] - a[0])
+            for a, b in zip(self.samples, self.samples[1:]) if b[0] > a[0]
+        ]
+        return {
+            "pid": self.pid,
+            "processes": max(s[5] for s in self.samples),
+            "cpu_seconds": round(last[1] - first[1], 2),
+            "cpu_pct_avg": round(100 * (last[1] - first[1]) / (last[0] - first[0]), 1),
+            "cpu_pct_max": round(max(cpu_pct), 1),
+            "rss_mb_start": round(first[2] / 2 ** 20, 1),
+            "rss_mb_max": round(max(s[2] for s in self.samples) / 2 ** 20, 1),
+            "threads_max": max(s[3] for s in self.samples),
+            "open_fds_max": max(s[4] for s in self.samples),
+        }
+
+
+# -----------------------------
+# Virtual users
+# -----------------------------
+class VirtualUser(threading.Thread):
+    def __init__(self, target, fake, secret, pools, stats, mix, sizes, deadline, budget):
+        super().__init__(daemon=True)
+        self.host, self.port = target
+        self.fake = fake
+        self.secret = secret
+        self.pools = pools
+        self.stats = stats
+        self.routes, self.route_weights = zip(*mix)
+        self.sizes, self.size_weights = zip(*sizes)
+        self.deadline = deadline
+        self.budget = budget
+        self.conn = None
+
+    def request(self, route, method, path, body=b"", headers=None):
+        """(status, response, body, elapsed, sent), or None after recording a connection error."""
+        sent = len(body)
+        start = time.perf_counter()
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.conn.request(method, path, body, headers or {})
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException):
+                self.conn.close()
+                self.conn = None
+                # A keep-alive connection the server already closed: retry once on a fresh one
+                if attempt:
+                    self.stats.record(route, time.perf_counter() - start, "conn_error", sent, error=True)
+                    return None
+        elapsed = time.perf_counter() - start
+        if response.will_close:
+            self.conn.close()
+            self.conn = None
+        return response.status, response, data, elapsed, sent
+
+    def finish(self, route, result, not_ready=False):
+        status, response, data, elapsed, sent = result
+        error = status not in EXPECTED_STATUS[route] and not not_ready
+        self.stats.record(route, elapsed, status, sent, len(data), error=error, not_ready=not_ready)
+
+    def run(self):
+        while time.monotonic() < self.deadline and self.budget.acquire(blocking=False):
+            route = random.choices(self.routes, self.route_weights)[0]
+            getattr(self, route)()
+        if self.conn is not None:
+            self.conn.close()
+
+    # Each step falls back to the one before it when its pool is empty
+    def preview(self):
+        size = random.choices(self.sizes, self.size_weights)[0]
+        boundary = uuid.uuid4().hex
+        head = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="declared_by"\r\n\r\nloadtest\r\n'
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="purpose"\r\n\r\nload test\r\n'
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="load_{size}.bin"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        body = head + os.urandom(size) + f"\r\n--{boundary}--\r\n".encode()
+        result = self.request("preview", "POST", "/preview", body, {
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+        })
+        if result is None:
+            return
+        self.finish("preview", result)
+        match = PAY_LINK.search(result[2].decode("utf-8", "replace"))
+        if result[0] == 200 and match:
+            self.pools.put("unpaid", match.group(1))
+
+    def pay(self):
+        event_id = self.pools.take("unpaid")
+        if event_id is None:
+            return self.preview()
+        result = self.request("pay", "POST", f"/pay/{event_id}")
+        if result is None:
+            return
+        self.finish("pay", result)
+        location = result[1].getheader("Location") or ""
+        if result[0] == 303 and "/checkout/" in location:
+            self.pools.put("with_session", (event_id, location.rsplit("/", 1)[1]))
+
+    def paid(self):
+        item = self.pools.take("with_session")
+        if item is None:
+            return self.pay()
+        event_id, session_id = item
+        self.fake.complete(session_id)
+        result = self.request("paid", "GET", f"/paid/{event_id}?session_id={session_id}")
+        if result is None:
+            return
+        self.finish("paid", result)
+        if result[0] == 302:
+            self.pools.put("paid", (event_id, False))
+
+    def webhook(self):
+        item = self.pools.take("with_session")
+        if item is None:
+            return self.pay()
+        event_id, session_id = item
+        session = self.fake.complete(session_id)
+        payload = json.dumps({
+            "id": f"evt_load_{uuid.uuid4().hex}",
+            "object": "event",
+            "type": "checkout.session.completed",
+            "created": int(time.time()),
+            "data": {"object": session},
+        }).encode()
+        result = self.request("webhook", "POST", "/stripe/webhook", payload, {
+            "Content-Type": "application/json",
+            "Stripe-Signature": sign_webhook(payload, self.secret),
+        })
+        if result is None:
+            return
+        self.finish("webhook", result)
+        if result[0] == 200:
+            self.pools.put("paid", (event_id, True))
+
+    def download(self):
+        item = self.pools.pick_paid()
+        if item is None:
+            return self.paid()
+        event_id, via_webhook = item
+        result = self.request("download", "GET", f"/download/{event_id}")
+        if result is None:
+            return
+        # A webhook payment is applied by a background job; 402 until it runs
+        self.finish("download", result, not_ready=via_webhook and result[0] == 402)
+
+
+# -----------------------------
+# Server
+# -----------------------------
+def wait_ready(host: str, port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", "/ready")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server on {host}:{port} not ready after {timeout:g}s")
+
+
+def spawn_server(port: int, workers: int, fake_url: str, secret: str, log_path: str):
+    env = dict(
+        os.environ,
+        STRIPE_API_BASE=fake_url,
+        STRIPE_SECRET_KEY="sk_test_load",
+        STRIPE_WEBHOOK_SECRET=secret,
+        PUBLIC_URL=f"http://127.0.0.1:{port}",
+    )
+    with open(log_path, "ab") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1",
+             "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+            cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+
+
+def print_report(report: dict):
+    print(f"\n{report['requests']} requests in {report['duration_s']}s "
+          f"({report['rps']} req/s), error rate {report['error_rate']:.2%}")
+    print(f"{'route':<10}{'reqs':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'max ms':>9}{'errors':>8}  statuses")
+    for route, r in report["routes"].items():
+        statuses = " ".join(f"{k}:{v}" for k, v in r["statuses"].items())
+        print(f"{route:<10}{r['requests']:>8}{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+              f"{r['p99_ms']:>9}{r['max_ms']:>9}{r['error_rate']:>8.2%}  {statuses}")
+    server = report.get("server")
+    if server:
+        print(f"\nserver pid {server['pid']} ({server['processes']} processes): "
+              f"cpu avg {server['cpu_pct_avg']}% max {server['cpu_pct_max']}%, "
+              f"rss {server['rss_mb_start']} -> max {server['rss_mb_max']} MB, "
+              f"threads max {server['threads_max']}, open fds max {server['open_fds_max']}")
+    print(f"fake stripe: {report['stripe']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tools.loadtest")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server to drive (ignored with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="Start uvicorn wired to the fake Stripe")
+    parser.add_argument("--port", type=int, default=8050, help="Port for --spawn")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --spawn")
+    parser.add_argument("--server-log", default=os.path.join(tempfile.gettempdir(), "aeterna-loadtest-server.log"),
+                        help="Output of the --spawn server")
+    parser.add_argument("--pid", type=int, help="Server pid to sample (automatic with --spawn)")
+    parser.add_argument("--stripe-port", type=int, default=12111, help="Fake Stripe port (0 with --spawn)")
+    parser.add_argument("--webhook-secret", default="whsec_load")
+    parser.add_argument("--concurrency", type=int, default=8, help="Virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many flow steps")
+    parser.add_argument("--mix", type=parse_weights, default=parse_weights(DEFAULT_MIX),
+                        help=f"Route weights (default {DEFAULT_MIX})")
+    parser.add_argument("--sizes", type=lambda s: parse_weights(s, parse_size),
+                        default=parse_weights(DEFAULT_SIZES, parse_size),
+                        help=f"Upload size weights (default {DEFAULT_SIZES})")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="Also write the report here")
+    args = parser.parse_args()
+
+    unknown = [name for name, _ in args.mix if name not in ROUTES]
+    if unknown:
+        parser.error(f"Unknown routes in --mix: {', '.join(unknown)} (expected {', '.join(ROUTES)})")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    stripe_server, fake = start_server(port=0 if args.spawn else args.stripe_port)
+    process = None
+    if args.spawn:
+        process = spawn_server(args.port, args.workers, fake.base_url, args.webhook_secret, args.server_log)
+        host, port, pid = "127.0.0.1", args.port, process.pid
+    else:
+        parts = urlsplit(args.url)
+        host, port, pid = parts.hostname, parts.port or 80, args.pid
+
+    try:
+        wait_ready(host, port)
+        sampler = ResourceSampler(pid).start() if pid else None
+        pools = Pools()
+        stats = Stats()
+        budget = threading.Semaphore(args.requests or 2 ** 31 - 1)
+        start = time.monotonic()
+        users = [
+            VirtualUser((host, port), fake, args.webhook_secret, pools, stats,
+                        args.mix, args.sizes, start + args.duration, budget)
+            for _ in range(args.concurrency)
+        ]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        report = stats.report(time.monotonic() - start)
+        if sampler:
+            report["server"] = sampler.stop()
+        report["stripe"] = dict(fake.stats)
+        report["config"] = {
+            "concurrency": args.concurrency,
+            "mix": dict(args.mix),
+            "sizes": {str(size): weight for size, weight in args.sizes},
+            "workers": args.workers if args.spawn else None,
+        }
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(30)
+        stripe_server.shutdown()
+
+    print_report(report)
+    if args.spawn:
+        print(f"server log: {args.server_log}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if report["error_rate"] > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
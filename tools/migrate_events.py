@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+from aeterna.event_store import migrate_json_array
+
+VAULT_DIR = Path(__file__).parent.parent / "vault"
+DEFAULT_SRC = VAULT_DIR / "events.json"
+DEFAULT_DEST = VAULT_DIR / "events.jsonl"
+
+
+def main():
+    """
+    Migra un events.json (array completo) al registro append-only events.jsonl
+    leyendo y escribiendo en streaming: la memoria no depende del tamaño del historial.
+    """
+    if len(sys.argv) > 3:
+        print("Usage: python -m tools.migrate_events [events.json] [events.jsonl]")
+        sys.exit(1)
+
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SRC
+    dest = Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_DEST
+
+    if not src.exists():
+        print(f"❌ {src} no existe.")
+        sys.exit(1)
+    if dest.exists():
+        print(f"❌ {dest} ya existe; no se sobrescribe.")
+        sys.exit(1)
+
+    try:
+        count = migrate_json_array(src, dest)
+    except ValueError as e:
+        print(f"❌ JSON inválido: {e}")
+        sys.exit(2)
+
+    print(f"✅ {count} eventos migrados a {dest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
+import argparse
+import base64
+import csv
+import glob
 import json
+import mmap
+import os
+import re
 import sys
 import hashlib
 import hmac
-import os
-from typing import Dict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator
 
+from core.archive import ArchiveStore
 from core.crypto import HASH_ALGO, SECRET_KEY
+from reports.pdf_generator import PAYLOAD_MARKER
 
 # ---- CONFIG ----
 REPORT_CANONICAL_FIELDS = [
@@ -20,34 +30,117 @@ REPORT_CANONICAL_FIELDS = [
     "scope_status",
 ]
 
-def load_report_payload_from_pdf(pdf_path: str) -> Dict:
+RESULT_FIELDS = ["path", "valid", "hash_ok", "hmac_ok", "source", "error"]
+
+# Keyed once per process; every report only pays for a copy()
+_KEY = SECRET_KEY.encode() if isinstance(SECRET_KEY, str) else SECRET_KEY
+_HMAC_BASE = hmac.new(_KEY, digestmod=HASH_ALGO)
+
+_EMBEDDED_RE = re.compile(
+    rb"/Keywords\s*\(" + re.escape(PAYLOAD_MARKER.encode()) + rb"([A-Za-z0-9+/=\s\\]*)\)"
+)
+
+_archive = None
+
+def restore_if_archived(path: str) -> bool:
+    """Restores a report moved to vault/archive by retention; True if it is on disk."""
+    global _archive
+    if os.path.exists(path):
+        return True
+    if _archive is None:
+        _archive = ArchiveStore.open_existing() or False
+    return bool(_archive) and _archive.restore(path) is not None
+
+def load_embedded_payload(pdf_path: str) -> Dict:
+    """Reads the report payload embedded in the PDF Keywords metadata."""
+    with open(pdf_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            match = _EMBEDDED_RE.search(mm)
+            if not match:
+                return None
+            encoded = re.sub(rb"[\s\\]", b"", match.group(1))
+    return json.loads(base64.b64decode(encoded))
+
+def load_report_payload_from_pdf(pdf_path: str, with_source: bool = False):
     """
-    Implementación mínima:
-    En v1 asumimos que el PDF incluye un JSON embebido o
-    que el verificador recibe también un .json exportado.
+    Companion .json next to the PDF when present (v1 contract),
+    otherwise the canonical payload embedded in the PDF metadata.
     """
-    json_path = pdf_path.replace(".pdf", ".json")
-    if not os.path.exists(json_path):
-        raise FileNotFoundError("Missing companion JSON for verification")
-
-    with open(json_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    json_path = pdf_path[:-4] + ".json" if pdf_path.endswith(".pdf") else pdf_path + ".json"
+    if restore_if_archived(json_path):
+        with open(json_path, "r", encoding="utf-8") as f:
+            data, source = json.load(f), "json"
+    else:
+        restore_if_archived(pdf_path)
+        data, source = load_embedded_payload(pdf_path), "embedded"
+        if data is None:
+            raise FileNotFoundError("Missing companion JSON or embedded payload for verification")
+    return (data, source) if with_source else data
 
 def canonicalize_report(data: Dict) -> str:
     canonical = {k: data[k] for k in REPORT_CANONICAL_FIELDS}
     return json.dumps(canonical, sort_keys=True, separators=(",", ":"))
 
 def compute_hmac(data_hash: str) -> str:
-    key = SECRET_KEY.encode() if isinstance(SECRET_KEY, str) else SECRET_KEY
-    return hmac.new(key, data_hash.encode(), HASH_ALGO).hexdigest()
+    mac = _HMAC_BASE.copy()
+    mac.update(data_hash.encode())
+    return mac.hexdigest()
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python -m tools.verify_report <report.pdf>")
-        sys.exit(1)
+def verify_report(pdf_path: str) -> Dict:
+    result = {"path": pdf_path, "valid": False, "hash_ok": False,
+              "hmac_ok": False, "source": None, "error": None}
+    try:
+        data, result["source"] = load_report_payload_from_pdf(pdf_path, with_source=True)
+        canonical_json = canonicalize_report(data)
+    except KeyError as e:
+        result["error"] = f"Missing canonical field {e}"
+        return result
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+        return result
+
+    computed_hash = hashlib.sha3_512(canonical_json.encode()).hexdigest()
+    result["hash_ok"] = hmac.compare_digest(computed_hash, str(data.get("report_hash")))
+    result["hmac_ok"] = hmac.compare_digest(compute_hmac(computed_hash), str(data.get("report_signature")))
+    result["valid"] = result["hash_ok"] and result["hmac_ok"]
+    return result
+
+def expand_targets(targets) -> Iterator[str]:
+    """Directories (recursive), glob patterns and plain files; each PDF once."""
+    seen = set()
+    for target in targets:
+        if os.path.isdir(target):
+            paths = (str(p) for p in sorted(Path(target).rglob("*.pdf")))
+        elif glob.has_magic(target):
+            paths = sorted(glob.iglob(target, recursive=True))
+        else:
+            paths = [target]
+        for path in paths:
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+def run_batch(targets, fmt: str, workers: int, out) -> bool:
+    """Verifies reports across a process pool, streaming one record per report."""
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        emit = writer.writerow
+    else:
+        def emit(result):
+            out.write(json.dumps(result) + "\n")
 
-    pdf_path = sys.argv[1]
+    all_valid = True
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(verify_report, expand_targets(targets), chunksize=32):
+            all_valid = all_valid and result["valid"]
+            emit(result)
+            out.flush()
+    return all_valid
 
+def verify_single(pdf_path: str):
     data = load_report_payload_from_pdf(pdf_path)
 
     canonical_json = canonicalize_report(data)
@@ -68,5 +161,34 @@ def main():
         print("RESULT: INVALID")
         sys.exit(2)
 
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.verify_report",
+        usage="python -m tools.verify_report <report.pdf> | [--format jsonl|csv] <dir|glob|pdf>...",
+    )
+    parser.add_argument("targets", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None,
+                        help="Batch mode output format (default jsonl)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Write the summary here instead of stdout")
+    args = parser.parse_args()
+
+    single = (
+        args.format is None
+        and len(args.targets) == 1
+        and restore_if_archived(args.targets[0])
+        and os.path.isfile(args.targets[0])
+    )
+    if single:
+        verify_single(args.targets[0])
+
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        all_valid = run_batch(args.targets, args.format or "jsonl", args.workers, out)
+    finally:
+        if args.output:
+            out.close()
+    sys.exit(0 if all_valid else 2)
+
 if __name__ == "__main__":
     main()